@@ -0,0 +1,108 @@
+"""
+Холодный старт воркера: задержка первых запросов после старта с прогревом
+(utils.warmup) и без него (DB_WARMUP_CONNECTIONS=0).
+
+Каждый прогон — новый процесс: импорт main, lifespan целиком, затем сразу
+пачка из --concurrency параллельных запросов к горячим маршрутам (так приходит
+трафик, когда балансировщик ставит воркер в ротацию), и ещё одна такая же пачка
+уже на прогретом процессе для сравнения. Запросы идут в приложение через
+httpx.ASGITransport; нужна база из .env с хотя бы одним пользователем.
+Запуск из каталога MemoriaServer:
+
+    python -m benchmarks.bench_cold_start --runs 5 --concurrency 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+async def child(concurrency: int) -> dict:
+    started = time.perf_counter()
+    import httpx
+    from sqlalchemy import select
+
+    from database.models import User
+    from database.session_maker import sessionmaker
+    from main import app
+    from routers.user import generate_token_for_user
+    imported = time.perf_counter()
+
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        # Пользователь берётся отдельным соединением уже после старта; пул он тоже греет,
+        # но одно соединение в обоих режимах
+        async with sessionmaker() as session:
+            user = (await session.scalars(select(User).limit(1))).first()
+        if user is None:
+            raise SystemExit("users is empty")
+        token = await generate_token_for_user(user)
+        urls = [
+            f"/api/user/get/{user.id}",
+            f"/api/user/{user.id}/stats",
+            f"/api/user/{user.id}/achievements",
+            f"/api/user/{user.id}/profile",
+        ]
+
+        transport = httpx.ASGITransport(app=app)
+        headers = {"Authorization": f"Bearer {token.access_token}"}
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+            async def timed(url: str) -> float:
+                request_started = time.perf_counter()
+                (await client.get(url)).raise_for_status()
+                return time.perf_counter() - request_started
+
+            async def burst() -> list[float]:
+                return sorted(await asyncio.gather(*(timed(urls[i % len(urls)]) for i in range(concurrency))))
+
+            first = await burst()
+            warm = await burst()
+
+    return {
+        "import_ms": (imported - started) * 1000,
+        "startup_ms": (ready - imported) * 1000,
+        "first": [t * 1000 for t in first],
+        "warm": [t * 1000 for t in warm],
+    }
+
+
+def run_child(warmup: bool, concurrency: int) -> dict:
+    env = dict(os.environ)
+    if not warmup:
+        env["DB_WARMUP_CONNECTIONS"] = "0"
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_cold_start", "--child", "--concurrency", str(concurrency)],
+        env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(child(args.concurrency))))
+        return
+
+    for warmup in (False, True):
+        results = [run_child(warmup, args.concurrency) for _ in range(args.runs)]
+        first = sorted(t for r in results for t in r["first"])
+        warm = sorted(t for r in results for t in r["warm"])
+        print(
+            f"{'warmup' if warmup else 'no warmup':>10}: "
+            f"startup={statistics.median(r['startup_ms'] for r in results):.0f}ms  "
+            f"first burst p50={statistics.median(first):.2f}ms max={first[-1]:.2f}ms  "
+            f"warm burst p50={statistics.median(warm):.2f}ms max={warm[-1]:.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Бенчмарк bcrypt: синхронный вызов в event loop против пула hashing_pool.
+
+Параллельно с потоком "логинов" крутятся лёгкие "посторонние запросы"
+(asyncio-задачи, которые ничего не ждут), и для них меряется задержка.
+
+С --db то же через приложение и базу из .env: пачка POST /api/user/login
+(HASHING_WORKERS + HASHING_QUEUE_LIMIT одновременно) и параллельно
+последовательные GET /api/user/get/{id}, которым нужно соединение пула.
+"held" — прежний обработчик логина, который держал соединение на время bcrypt,
+"released" — маршрут /login, отдающий соединение до проверки пароля.
+Запуск из каталога MemoriaServer:
+
+    python -m benchmarks.bench_hashing --logins 64 --concurrency 16
+    python -m benchmarks.bench_hashing --db --logins 300
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from utils.password_utils import (
+    hash_password,
+    verify_password,
+    verify_password_async
+)
+
+
+async def ping_latencies(stop: asyncio.Event, interval: float) -> list[float]:
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        latencies.append(time.perf_counter() - started - interval)
+    return latencies
+
+
+async def run(mode: str, logins: int, concurrency: int, hashed: str) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login() -> None:
+        async with semaphore:
+            if mode == "inline":
+                verify_password("secret", hashed)
+            else:
+                await verify_password_async("secret", hashed)
+
+    stop = asyncio.Event()
+    pinger = asyncio.create_task(ping_latencies(stop, 0.001))
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    latencies = sorted(await pinger)
+
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else float("nan")
+    print(
+        f"{mode:>6}: {logins / elapsed:7.1f} logins/s, "
+        f"other requests p50={statistics.median(latencies) * 1000:.2f}ms "
+        f"p99={p99 * 1000:.2f}ms (samples={len(latencies)})"
+    )
+
+
+def percentile(values: list[float], share: float) -> float:
+    return values[min(int(len(values) * share), len(values) - 1)] if values else float("nan")
+
+
+async def run_db(logins: int) -> None:
+    import uuid
+
+    import httpx
+    from sqlalchemy import delete, select
+
+    from config import config
+    from database.models import User, UserAchievement
+    from database.session_maker import sessionmaker
+    from main import app
+
+    email = f"{uuid.uuid4()}@example.com"
+    concurrency = config.hashing.workers + config.hashing.queue_limit
+
+    async def held_login(client: httpx.AsyncClient) -> None:
+        async with sessionmaker() as session:
+            user = (await session.scalars(select(User).where(User.email == email))).first()
+            await verify_password_async("secret123", user.password)
+
+    async def released_login(client: httpx.AsyncClient) -> None:
+        response = await client.post("/api/user/login", data={"username": email, "password": "secret123"})
+        response.raise_for_status()
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            token = (await client.post(
+                "/api/user/add", json={"name": "bench", "email": email, "password": "secret123"}
+            )).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            async with sessionmaker() as session:
+                user_id = await session.scalar(select(User.id).where(User.email == email))
+            try:
+                for mode, login in (("held", held_login), ("released", released_login)):
+                    semaphore = asyncio.Semaphore(concurrency)
+                    stop = asyncio.Event()
+
+                    async def one() -> None:
+                        async with semaphore:
+                            await login(client)
+
+                    async def probe() -> list[float]:
+                        latencies = []
+                        while not stop.is_set():
+                            started = time.perf_counter()
+                            (await client.get(f"/api/user/get/{user_id}", headers=headers)).raise_for_status()
+                            latencies.append(time.perf_counter() - started)
+                        return latencies
+
+                    prober = asyncio.create_task(probe())
+                    started = time.perf_counter()
+                    await asyncio.gather(*(one() for _ in range(logins)))
+                    elapsed = time.perf_counter() - started
+                    stop.set()
+                    latencies = sorted(await prober)
+                    print(
+                        f"{mode:>8}: {logins / elapsed:7.1f} logins/s, "
+                        f"GET /user/get p50={statistics.median(latencies) * 1000:.1f}ms "
+                        f"p99={percentile(latencies, 0.99) * 1000:.1f}ms "
+                        f"max={latencies[-1] * 1000:.1f}ms (samples={len(latencies)})"
+                    )
+            finally:
+                async with sessionmaker() as session:
+                    await session.execute(delete(UserAchievement).where(UserAchievement.user_id == user_id))
+                    await session.execute(delete(User).where(User.id == user_id))
+                    await session.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--db", action="store_true")
+    args = parser.parse_args()
+
+    if args.db:
+        asyncio.run(run_db(args.logins))
+        return
+
+    hashed = hash_password("secret")
+    for mode in ("inline", "pool"):
+        asyncio.run(run(mode, args.logins, args.concurrency, hashed))
+
+
+if __name__ == "__main__":
+    main()
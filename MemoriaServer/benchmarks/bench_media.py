@@ -0,0 +1,116 @@
+"""
+Конкурентная раздача аватаров: прежний StaticFiles против utils.media.MediaFiles.
+
+Во временном каталоге раскладываются аватары как после загрузки: оригинал
+<sha256>.jpg и превью <sha256>-<size>.webp. Клиенты (httpx через ASGITransport,
+без сети — меряется только стоимость на стороне сервера) параллельно запрашивают
+случайные файлы; доля запросов идёт к оригиналам, остальные — к превью 80px,
+как в списках и профилях приложения. Запуск из каталога MemoriaServer:
+
+    python -m benchmarks.bench_media --requests 5000 --concurrency 64
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI
+from fastapi.staticfiles import StaticFiles
+
+from config import config
+from utils.media import MediaFiles
+
+
+def make_avatars(directory: str, users: int, original_size: int, thumb_size: int) -> list[str]:
+    avatars = os.path.join(directory, "avatars")
+    os.makedirs(avatars)
+    paths = []
+    for user in range(users):
+        original = os.urandom(original_size)
+        digest = hashlib.sha256(original).hexdigest()
+        with open(os.path.join(avatars, f"{digest}.jpg"), "wb") as file:
+            file.write(original)
+        with open(os.path.join(avatars, f"{digest}-80.webp"), "wb") as file:
+            file.write(os.urandom(thumb_size))
+        paths.append(f"/media/avatars/{digest}")
+    return paths
+
+
+def make_app(kind: str, directory: str) -> FastAPI:
+    app = FastAPI()
+    if kind == "static_files":
+        app.mount("/media", StaticFiles(directory=directory), name="media")
+    else:
+        settings = config.media
+        app.mount("/media", MediaFiles(
+            directory=directory,
+            max_age=settings.max_age,
+            cache_entries=settings.cache_entries,
+            cache_ttl=settings.cache_ttl,
+            inline_max=settings.inline_max,
+            chunk_size=settings.chunk_size
+        ), name="media")
+    return app
+
+
+async def run(kind: str, directory: str, avatars: list[str], requests: int, concurrency: int, originals: float) -> None:
+    transport = httpx.ASGITransport(app=make_app(kind, directory))
+    rng = random.Random(0)
+    urls = [
+        f"{rng.choice(avatars)}.jpg" if rng.random() < originals else f"{rng.choice(avatars)}-80.webp"
+        for _ in range(requests)
+    ]
+    latencies = []
+    queue = iter(urls)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker() -> None:
+            for url in queue:
+                started = time.perf_counter()
+                response = await client.get(url)
+                latencies.append(time.perf_counter() - started)
+                assert response.status_code == 200, response.status_code
+
+        # Прогрев: по одному запросу на файл (кэш stat у MediaFiles, page cache ОС у обоих)
+        for avatar in avatars:
+            await client.get(f"{avatar}.jpg")
+            await client.get(f"{avatar}-80.webp")
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(
+        f"{kind:>12}: {requests / elapsed:7.0f} req/s, "
+        f"p50={statistics.median(latencies) * 1000:.2f}ms "
+        f"p99={latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--originals", type=float, default=0.1, help="доля запросов к оригиналам")
+    parser.add_argument("--original-size", type=int, default=300_000)
+    parser.add_argument("--thumb-size", type=int, default=4_000)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="media-")
+    try:
+        avatars = make_avatars(directory, args.users, args.original_size, args.thumb_size)
+        for kind in ("static_files", "media_files"):
+            asyncio.run(run(kind, directory, avatars, args.requests, args.concurrency, args.originals))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
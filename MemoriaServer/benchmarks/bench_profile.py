@@ -0,0 +1,88 @@
+"""
+Задержка открытия экрана профиля: три запроса приложения (пользователь, статистика,
+достижения) против одного GET /user/{id}/profile.
+
+Запросы идут в приложение main.app через httpx.ASGITransport (без сети, но со
+всеми зависимостями маршрутов: токен, сессия, сериализация). Работает с базой из
+.env и берёт пользователя с наибольшим числом строк статистики — первый попавшийся
+мог бы оказаться с пустым профилем. Три запроса меряются и последовательно, и
+параллельно — приложение может делать и так, и так.
+Запуск из каталога MemoriaServer:
+
+    python -m benchmarks.bench_profile --iterations 300
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from sqlalchemy import func, select
+
+from database.models import User, UserGameStat
+from database.session_maker import engine, sessionmaker
+from main import app
+from routers.user import generate_token_for_user
+
+
+async def three_sequential(client: httpx.AsyncClient, user_id) -> None:
+    for url in (f"/api/user/get/{user_id}", f"/api/user/{user_id}/stats", f"/api/user/{user_id}/achievements"):
+        (await client.get(url)).raise_for_status()
+
+
+async def three_parallel(client: httpx.AsyncClient, user_id) -> None:
+    responses = await asyncio.gather(
+        client.get(f"/api/user/get/{user_id}"),
+        client.get(f"/api/user/{user_id}/stats"),
+        client.get(f"/api/user/{user_id}/achievements"),
+    )
+    for response in responses:
+        response.raise_for_status()
+
+
+async def profile(client: httpx.AsyncClient, user_id) -> None:
+    (await client.get(f"/api/user/{user_id}/profile")).raise_for_status()
+
+
+async def measure(name: str, func, client: httpx.AsyncClient, user_id, iterations: int) -> None:
+    await func(client, user_id)  # прогрев: соединения пула, подготовленные выражения
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await func(client, user_id)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    print(
+        f"{name:>15}: p50={statistics.median(timings) * 1000:.2f}ms "
+        f"p99={timings[int(len(timings) * 0.99) - 1] * 1000:.2f}ms"
+    )
+
+
+async def main(iterations: int) -> None:
+    async with sessionmaker() as session:
+        user = (await session.scalars(
+            select(User)
+            .outerjoin(UserGameStat, UserGameStat.user_id == User.id)
+            .group_by(User.id)
+            .order_by(func.count(UserGameStat.game_id).desc())
+            .limit(1)
+        )).first()
+    if user is None:
+        raise SystemExit("users is empty")
+    token = await generate_token_for_user(user)
+
+    transport = httpx.ASGITransport(app=app)
+    headers = {"Authorization": f"Bearer {token.access_token}"}
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+            await measure("three requests", three_sequential, client, user.id, iterations)
+            await measure("three parallel", three_parallel, client, user.id, iterations)
+            await measure("profile", profile, client, user.id, iterations)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=300)
+    asyncio.run(main(parser.parse_args().iterations))
@@ -0,0 +1,93 @@
+"""
+Стоимость сериализации списочного ответа на 1000 строк: прежний путь FastAPI
+против utils.serialization.
+
+- response_model: маршрут строит DTO через from_orm, FastAPI валидирует результат
+  по response_model (serialize_response) и рендерит JSONResponse — как было раньше.
+- fast_path: компилированный serializer + orjson (fast_response).
+
+Строки — несохранённые ORM-объекты, БД не нужна. Запуск из каталога MemoriaServer:
+
+    python -m benchmarks.bench_serialization --rows 1000 --repeat 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from database.models import User, UserGameStat
+from schemas.game_schemas import UserGameStatDTO
+from schemas.user_schemas import UserDTO
+from utils.serialization import fast_response
+
+
+def make_users(rows: int) -> list[User]:
+    return [
+        User(id=uuid.uuid4(), name=f"player {i}", experience=1000 + i,
+             email=f"player{i}@example.com", avatar_url=f"/media/avatars/{i}.png")
+        for i in range(rows)
+    ]
+
+
+def make_stats(rows: int) -> list[UserGameStat]:
+    user_id = uuid.uuid4()
+    return [
+        UserGameStat(user_id=user_id, game_id=i, high_score=i * 10, games_played=i, stats={"moves": i})
+        for i in range(rows)
+    ]
+
+
+LOOP = asyncio.new_event_loop()
+
+
+def response_model_path(field, dto, objs) -> bytes:
+    # from_orm в маршруте == model_validate(from_attributes)
+    content = [dto.model_validate(obj) for obj in objs]
+    value = LOOP.run_until_complete(serialize_response(field=field, response_content=content))
+    return JSONResponse(value).body
+
+
+def fast_path(dto, objs) -> bytes:
+    return fast_response(objs, dto, many=True).body
+
+
+def measure(fn, repeat: int) -> list[float]:
+    fn()  # прогрев: компиляция serializer, кэши pydantic
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    for dto, objs in ((UserDTO, make_users(args.rows)), (UserGameStatDTO, make_stats(args.rows))):
+        field = create_model_field(name="Response", type_=List[dto], mode="serialization")
+        results = {
+            "response_model": measure(lambda: response_model_path(field, dto, objs), args.repeat),
+            "fast_path": measure(lambda: fast_path(dto, objs), args.repeat),
+        }
+        baseline = statistics.median(results["response_model"])
+        for name, timings in results.items():
+            median = statistics.median(timings)
+            per_1k = median / args.rows * 1000
+            print(
+                f"{dto.__name__:>16} {name:>14}: {per_1k * 1000:7.2f} ms / 1k rows "
+                f"(x{baseline / median:.1f})"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Пропускная способность регистрации: прежняя последовательность запросов против onboard_user.
+
+Работает с базой из .env, bcrypt не участвует (пароль хэшируется один раз заранее).
+Созданные пользователи удаляются после прогона.
+Запуск из каталога MemoriaServer:
+
+    python -m benchmarks.bench_signup --users 200 --concurrency 20
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+from sqlalchemy import delete, select
+
+from database.models import Achievement, User, UserAchievement, UserGameStat
+from database.onboarding import onboard_user
+from database.session_maker import engine, sessionmaker
+from utils.password_utils import hash_password
+
+EMAIL_DOMAIN = "bench.memoria.invalid"
+
+
+async def legacy_signup(email: str, password: str) -> None:
+    async with sessionmaker() as session:
+        existing = (await session.scalars(select(User).where(User.email == email))).first()
+        assert existing is None
+        user = User(name="bench", email=email, password=password)
+        session.add(user)
+        await session.commit()
+        await session.refresh(user)
+        for game_id in range(1, 10):
+            session.add(UserGameStat(user_id=user.id, game_id=game_id, high_score=0, games_played=0, stats={}))
+        for achievement in (await session.scalars(select(Achievement))).all():
+            session.add(UserAchievement(user_id=user.id, achievement_id=achievement.id, achieved=False, progress=0))
+        await session.commit()
+
+
+async def onboarding_signup(email: str, password: str) -> None:
+    async with sessionmaker() as session:
+        await onboard_user(session, name="bench", email=email, password=password)
+
+
+async def measure(name: str, func, users: int, concurrency: int, password: str) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> None:
+        async with semaphore:
+            await func(f"{uuid.uuid4()}@{EMAIL_DOMAIN}", password)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(users)))
+    elapsed = time.perf_counter() - started
+    print(f"{name:>10}: {users / elapsed:7.1f} signups/s")
+
+
+async def cleanup() -> None:
+    async with sessionmaker() as session:
+        bench_users = select(User.id).where(User.email.like(f"%@{EMAIL_DOMAIN}"))
+        await session.execute(delete(UserAchievement).where(UserAchievement.user_id.in_(bench_users)))
+        await session.execute(delete(User).where(User.email.like(f"%@{EMAIL_DOMAIN}")))
+        await session.commit()
+
+
+async def main(users: int, concurrency: int) -> None:
+    password = hash_password("bench")
+    try:
+        await measure("legacy", legacy_signup, users, concurrency, password)
+        await measure("onboarding", onboarding_signup, users, concurrency, password)
+    finally:
+        await cleanup()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.concurrency))
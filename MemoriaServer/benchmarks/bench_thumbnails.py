@@ -0,0 +1,105 @@
+"""
+Пропускная способность превью аватаров: рендер прямо в event loop против пула
+процессов ThumbnailPool с разным числом процессов.
+
+Исходник — синтетическое "фото с телефона" (JPEG 4032x3024 с шумом), для каждой
+задачи копируется под своим именем, чтобы превью не брались из уже готовых.
+Параллельно, как в bench_hashing, меряется задержка лёгких "посторонних запросов".
+Запуск из каталога MemoriaServer:
+
+    python -m benchmarks.bench_thumbnails --images 32 --workers 1,2,4
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from PIL import Image
+
+from config import config
+from utils.thumbnails import ThumbnailPool, render_variants
+
+
+def make_photo(path: str, width: int, height: int) -> None:
+    noise = Image.effect_noise((width, height), 64).convert("RGB")
+    gradient = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    Image.blend(noise, gradient, 0.5).save(path, "JPEG", quality=92)
+
+
+async def ping_latencies(stop: asyncio.Event, interval: float) -> list[float]:
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        latencies.append(time.perf_counter() - started - interval)
+    return latencies
+
+
+async def run(label: str, sources: list[str], concurrency: int, pool: ThumbnailPool | None) -> None:
+    settings = config.thumbnails
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def render(source: str) -> None:
+        args = (source, os.path.splitext(os.path.basename(source))[0],
+                settings.sizes, settings.formats, settings.quality, settings.max_pixels)
+        async with semaphore:
+            if pool is None:
+                render_variants(*args)
+            else:
+                await pool.run(render_variants, *args)
+
+    if pool is not None:
+        # Прогрев: старт процессов и импорт Pillow в них не входят в замер
+        await asyncio.gather(*(pool.run(os.getpid) for _ in range(concurrency)))
+
+    stop = asyncio.Event()
+    pinger = asyncio.create_task(ping_latencies(stop, 0.001))
+    started = time.perf_counter()
+    await asyncio.gather(*(render(source) for source in sources))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    latencies = sorted(await pinger)
+    if pool is not None:
+        pool.shutdown()
+
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else float("nan")
+    print(
+        f"{label:>9}: {len(sources) / elapsed:6.1f} images/s, "
+        f"other requests p50={statistics.median(latencies) * 1000:.2f}ms "
+        f"p99={p99 * 1000:.2f}ms (samples={len(latencies)})"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=32)
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--size", default="4032x3024")
+    args = parser.parse_args()
+
+    width, height = (int(side) for side in args.size.split("x"))
+    workdir = tempfile.mkdtemp(prefix="thumbs-")
+    try:
+        original = os.path.join(workdir, "original.jpg")
+        make_photo(original, width, height)
+        print(f"source {args.size}, {os.path.getsize(original) / 1024:.0f} KiB, "
+              f"sizes {config.thumbnails.sizes}, formats {config.thumbnails.formats}, cpus {os.cpu_count()}")
+
+        runs = [("inline", 0)] + [(f"pool x{workers}", int(workers)) for workers in args.workers.split(",")]
+        for number, (label, workers) in enumerate(runs):
+            sources = []
+            for index in range(args.images):
+                source = os.path.join(workdir, f"run{number}-{index}.jpg")
+                shutil.copyfile(original, source)
+                sources.append(source)
+            pool = ThumbnailPool(workers=workers, queue_limit=args.images) if workers else None
+            asyncio.run(run(label, sources, max(workers, 1), pool))
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Задержка PATCH user_game_stats: SELECT + commit + refresh против одного UPDATE ... RETURNING.
+
+Работает с базой из .env и берёт первую строку user_game_stats.
+Значения high_score/games_played меняются на время прогона и затем восстанавливаются.
+Запуск из каталога MemoriaServer:
+
+    python -m benchmarks.bench_writes --iterations 500
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import select
+
+from database.models import UserGameStat
+from database.session_maker import engine, sessionmaker
+from database.writes import update_returning
+
+
+async def old_pattern(user_id, game_id, value: int) -> None:
+    async with sessionmaker() as session:
+        stmt = select(UserGameStat).where(
+            UserGameStat.user_id == user_id,
+            UserGameStat.game_id == game_id
+        )
+        record = (await session.scalars(stmt)).first()
+        record.games_played = value
+        await session.commit()
+        await session.refresh(record)
+
+
+async def returning_pattern(user_id, game_id, value: int) -> None:
+    async with sessionmaker() as session:
+        await update_returning(
+            session,
+            UserGameStat,
+            UserGameStat.user_id == user_id,
+            UserGameStat.game_id == game_id,
+            values={"games_played": value},
+            detail="UserGameStat not found"
+        )
+
+
+async def measure(name: str, func, user_id, game_id, iterations: int) -> None:
+    timings = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        await func(user_id, game_id, i)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    print(
+        f"{name:>10}: p50={statistics.median(timings) * 1000:.2f}ms "
+        f"p99={timings[int(len(timings) * 0.99) - 1] * 1000:.2f}ms"
+    )
+
+
+async def main(iterations: int) -> None:
+    async with sessionmaker() as session:
+        row = (await session.scalars(select(UserGameStat).limit(1))).first()
+    if row is None:
+        raise SystemExit("user_game_stats is empty")
+
+    try:
+        await measure("select+orm", old_pattern, row.user_id, row.game_id, iterations)
+        await measure("returning", returning_pattern, row.user_id, row.game_id, iterations)
+    finally:
+        await returning_pattern(row.user_id, row.game_id, row.games_played)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=500)
+    asyncio.run(main(parser.parse_args().iterations))
@@ -19,10 +19,198 @@ class DatabaseConfig:
     PG_URI: str = f"postgresql+asyncpg://{user}:{passwd}@{host}/{name}"
 
 
+@dataclass
+class EngineConfig:
+    """SQLAlchemy engine and connection pool variables"""
+
+    echo: bool = getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
+    pool_size: int = int(getenv("DB_POOL_SIZE", 10))
+    max_overflow: int = int(getenv("DB_MAX_OVERFLOW", 10))
+    pool_timeout: float = float(getenv("DB_POOL_TIMEOUT", 30))
+    pool_recycle: int = int(getenv("DB_POOL_RECYCLE", 1800))
+    pool_pre_ping: bool = getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+    # Размер кэша подготовленных выражений asyncpg на соединение
+    statement_cache_size: int = int(getenv("DB_STATEMENT_CACHE_SIZE", 100))
+    # Режим для PgBouncer в transaction pooling: без именованных prepared statements
+    pgbouncer: bool = getenv("DB_PGBOUNCER", "false").lower() in ("1", "true", "yes")
+    # Сколько соединений открыть и прогреть при старте воркера (0 — без прогрева)
+    warmup_connections: int = int(getenv("DB_WARMUP_CONNECTIONS", pool_size))
+    # Дольше прогрев старт не задерживает
+    warmup_timeout: float = float(getenv("DB_WARMUP_TIMEOUT", 10))
+
+
+@dataclass
+class ReplicaConfig:
+    """Read replica routing variables"""
+
+    # SQLAlchemy URI реплик через запятую; пусто — все запросы идут в primary
+    uris: tuple = tuple(uri.strip() for uri in getenv("DB_REPLICA_URIS", "").split(",") if uri.strip())
+    # Сколько секунд после своей записи клиент читает из primary
+    read_your_writes: float = float(getenv("DB_READ_YOUR_WRITES", 5))
+    health_interval: float = float(getenv("DB_REPLICA_HEALTH_INTERVAL", 5))
+    health_timeout: float = float(getenv("DB_REPLICA_HEALTH_TIMEOUT", 2))
+    # Таймаут подключения к реплике в запросе; не подключилась — чтение идёт в primary
+    connect_timeout: float = float(getenv("DB_REPLICA_CONNECT_TIMEOUT", 1))
+    # Реплика с большим отставанием (секунды) считается нездоровой
+    max_lag: float = float(getenv("DB_REPLICA_MAX_LAG", 10))
+
+
+@dataclass
+class AuthConfig:
+    """Authentication and principal cache variables"""
+
+    principal_cache_size: int = int(getenv("PRINCIPAL_CACHE_SIZE", 10_000))
+    # Кэш у каждого воркера свой, сброс после изменения пользователя — только в своём:
+    # TTL — предел, сколько другие воркеры видят удалённого или изменённого пользователя
+    principal_cache_ttl: float = float(getenv("PRINCIPAL_CACHE_TTL", 60))
+    # Доверять подписанному claim "user" на read-only маршрутах без запроса в БД
+    trust_token_claims: bool = getenv("TRUST_TOKEN_CLAIMS", "false").lower() in ("1", "true", "yes")
+
+
+@dataclass
+class HashingConfig:
+    """Password hashing worker pool variables"""
+
+    workers: int = int(getenv("HASHING_WORKERS", os.cpu_count() or 1))
+    # Сколько задач может ждать свободного воркера, прежде чем отвечать 503
+    queue_limit: int = int(getenv("HASHING_QUEUE_LIMIT", 64))
+
+
+@dataclass
+class LeaderboardConfig:
+    """In-memory leaderboard variables"""
+
+    top_k: int = int(getenv("LEADERBOARD_TOP_K", 100))
+    # Через сколько секунд доска перечитывается из БД (изменения других воркеров)
+    ttl: float = float(getenv("LEADERBOARD_TTL", 30))
+    # Период пересборки гистограмм счёта для перцентилей
+    histogram_ttl: float = float(getenv("HISTOGRAM_TTL", 300))
+
+
+@dataclass
+class CatalogConfig:
+    """Games and achievements catalog cache variables"""
+
+    # Как часто воркер сверяет версию каталога с БД (изменения из других воркеров)
+    poll_interval: float = float(getenv("CATALOG_POLL_INTERVAL", 5))
+
+
+@dataclass
+class AvatarConfig:
+    """Avatar upload variables"""
+
+    directory: str = getenv("AVATAR_DIR", "media/avatars")
+    # Предел размера файла аватара в байтах; больше — 413 без дочитывания тела
+    max_bytes: int = int(getenv("AVATAR_MAX_BYTES", 5 * 1024 * 1024))
+    # Сколько байт копится в памяти перед записью на диск в потоке
+    chunk_size: int = int(getenv("AVATAR_CHUNK_SIZE", 256 * 1024))
+
+
+@dataclass
+class ThumbnailConfig:
+    """Avatar thumbnail process pool variables"""
+
+    # Стороны квадратных превью в пикселях
+    sizes: tuple = tuple(int(size) for size in getenv("AVATAR_SIZES", "80,160,320").split(",") if size.strip())
+    # Форматы превью: webp, jpeg
+    formats: tuple = tuple(fmt.strip() for fmt in getenv("AVATAR_FORMATS", "webp,jpeg").split(",") if fmt.strip())
+    quality: int = int(getenv("AVATAR_QUALITY", 82))
+    # Картинки больше этого числа пикселей не декодируются (защита от "бомб")
+    max_pixels: int = int(getenv("AVATAR_MAX_PIXELS", 40_000_000))
+    workers: int = int(getenv("THUMBNAIL_WORKERS", os.cpu_count() or 1))
+    # Сколько задач может ждать свободного процесса, прежде чем отвечать 503
+    queue_limit: int = int(getenv("THUMBNAIL_QUEUE_LIMIT", 32))
+
+
+@dataclass
+class MediaConfig:
+    """/media serving variables"""
+
+    directory: str = getenv("MEDIA_DIR", "media")
+    # max-age для файлов без хэша в имени; файлы по хэшу кэшируются навсегда (immutable)
+    max_age: int = int(getenv("MEDIA_MAX_AGE", 3600))
+    cache_entries: int = int(getenv("MEDIA_CACHE_ENTRIES", 1024))
+    # Сколько секунд воркер верит закэшированному stat (и телу маленького файла)
+    cache_ttl: float = float(getenv("MEDIA_CACHE_TTL", 60))
+    # Файлы не больше этого размера держатся в памяти целиком
+    inline_max: int = int(getenv("MEDIA_INLINE_MAX", 32 * 1024))
+    chunk_size: int = int(getenv("MEDIA_CHUNK_SIZE", 256 * 1024))
+
+
+@dataclass
+class StatBufferConfig:
+    """Write-behind buffer for user_game_stats counters"""
+
+    # Копить результаты партий в памяти воркера и писать их пачками
+    enabled: bool = getenv("STAT_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+    flush_interval: float = float(getenv("STAT_FLUSH_INTERVAL_MS", 200)) / 1000
+    # Пачка такого размера сбрасывается, не дожидаясь интервала
+    flush_entries: int = int(getenv("STAT_FLUSH_ENTRIES", 500))
+    # Предел потерь при падении воркера: больше строк в буфере не бывает,
+    # запрос сверх него ждёт сброса
+    max_unflushed: int = int(getenv("STAT_MAX_UNFLUSHED", 5000))
+
+
+@dataclass
+class ResultKeysConfig:
+    """Game result idempotency keys retention variables"""
+
+    # Сколько часов хранится ключ; повтор пакета позже этого срока применится заново,
+    # поэтому срок должен быть больше окна повторных отправок клиента
+    retention_hours: float = float(getenv("RESULT_KEY_RETENTION_HOURS", 72))
+    # Как часто воркер удаляет устаревшие ключи, секунды; 0 — не удалять
+    prune_interval: float = float(getenv("RESULT_KEY_PRUNE_INTERVAL", 600))
+    # Сколько строк удаляется одной командой: короткие транзакции и блокировки
+    prune_batch: int = int(getenv("RESULT_KEY_PRUNE_BATCH", 5000))
+
+
+@dataclass
+class ServerConfig:
+    """Production launcher variables (serve.py)"""
+
+    host: str = getenv("SERVER_HOST", "0.0.0.0")
+    port: int = int(getenv("SERVER_PORT", 8000))
+    workers: int = int(getenv("SERVER_WORKERS", os.cpu_count() or 1))
+    # Импортировать приложение в мастере до fork: воркеры стартуют быстрее и делят память
+    preload: bool = getenv("SERVER_PRELOAD", "true").lower() in ("1", "true", "yes")
+    backlog: int = int(getenv("SERVER_BACKLOG", 2048))
+    keepalive: int = int(getenv("SERVER_KEEPALIVE", 5))
+    # Сколько секунд после SIGTERM readiness отвечает 503, а воркер ещё принимает
+    # запросы: балансировщик успевает вывести его из ротации
+    drain_delay: float = float(getenv("SERVER_DRAIN_DELAY", 5))
+    # Сколько ждать завершения начатых запросов, прежде чем закрыть их принудительно
+    graceful_timeout: int = int(getenv("SERVER_GRACEFUL_TIMEOUT", 30))
+    # Таймаут проверки БД в readiness
+    health_timeout: float = float(getenv("HEALTH_DB_TIMEOUT", 1))
+
+
+@dataclass
+class MetricsConfig:
+    """Prometheus metrics variables"""
+
+    # Middleware и события SQLAlchemy; /metrics без них отдаёт только пулы и буфер
+    enabled: bool = getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
 class Configuration:
     """All in one configuration's class"""
     SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key")
+    # Токен для служебных эндпоинтов (/api/internal); пока не задан, они закрыты
+    INTERNAL_TOKEN = os.getenv("INTERNAL_TOKEN")
     db = DatabaseConfig()
+    engine = EngineConfig()
+    replicas = ReplicaConfig()
+    auth = AuthConfig()
+    hashing = HashingConfig()
+    leaderboard = LeaderboardConfig()
+    catalog = CatalogConfig()
+    avatars = AvatarConfig()
+    thumbnails = ThumbnailConfig()
+    media = MediaConfig()
+    stat_buffer = StatBufferConfig()
+    result_keys = ResultKeysConfig()
+    server = ServerConfig()
+    metrics = MetricsConfig()
 
 
 config = Configuration()
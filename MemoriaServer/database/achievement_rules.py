@@ -0,0 +1,56 @@
+from sqlalchemy import and_, case, func, literal, select
+from sqlalchemy.dialects.postgresql import insert
+
+from database.models import Achievement, UserAchievement
+
+# metric -> колонка строки user_game_stats
+RULE_METRICS = ("games_played", "high_score")
+
+
+def achievement_progress(changed):
+    """
+    Data-modifying CTE, который пересчитывает достижения по правилам (Achievement.game_id
+    + metric) для строк user_game_stats из changed — RETURNING записи статистики в том
+    же запросе. Все затронутые достижения всех строк обновляются одним
+    INSERT ... ON CONFLICT DO UPDATE: прогресс = min(значение metric, max_progress),
+    achieved при достижении цели. Прогресс только растёт, а полученное достижение
+    не снимается, поэтому ручные PATCH клиента правило не откатывает.
+    Отсутствующая строка user_achievements (достижение добавлено после регистрации)
+    создаётся.
+    """
+    value = case(
+        *((Achievement.metric == metric, changed.c[metric]) for metric in RULE_METRICS),
+        else_=None
+    )
+    progress = func.least(value, Achievement.max_progress)
+    candidates = (
+        select(
+            changed.c.user_id,
+            Achievement.id,
+            value >= Achievement.max_progress,
+            progress
+        )
+        .select_from(changed)
+        .join(Achievement, Achievement.game_id == changed.c.game_id)
+        .where(Achievement.metric.in_(RULE_METRICS), progress > literal(0))
+    )
+    stmt = insert(UserAchievement).from_select(
+        ["user_id", "achievement_id", "achieved", "progress"],
+        candidates
+    )
+    excluded = stmt.excluded
+    return (
+        stmt.on_conflict_do_update(
+            index_elements=[UserAchievement.user_id, UserAchievement.achievement_id],
+            set_={
+                "progress": func.greatest(UserAchievement.progress, excluded.progress),
+                "achieved": UserAchievement.achieved | excluded.achieved,
+                # onupdate колонки не применяется к ON CONFLICT DO UPDATE
+                "updated_at": func.now(),
+            },
+            # Строки без изменений не трогаем: ни записи, ни сдвига updated_at (ETag)
+            where=(UserAchievement.progress < excluded.progress)
+            | and_(~UserAchievement.achieved, excluded.achieved)
+        )
+        .cte("achievement_progress")
+    )
@@ -0,0 +1,106 @@
+import time
+from dataclasses import dataclass
+from typing import Optional
+from uuid import uuid4
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from config import EngineConfig
+
+
+@dataclass
+class PoolStats:
+    """Накопительные счётчики выдачи соединений из пула."""
+
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_total: float = 0.0
+    wait_max: float = 0.0
+
+    def record(self, waited: float) -> None:
+        self.checkouts += 1
+        self.wait_total += waited
+        if waited > self.wait_max:
+            self.wait_max = waited
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool, который меряет время ожидания соединения (stats — свои у каждого движка)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def recreate(self):
+        # dispose() заменяет пул новым: счётчики движка должны сохраняться
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.stats.timeouts += 1
+            raise
+        finally:
+            self.stats.record(time.perf_counter() - started)
+
+
+def build_engine(url: str, profile: EngineConfig, connect_timeout: Optional[float] = None) -> AsyncEngine:
+    """
+    Создаёт AsyncEngine по профилю из config.Configuration.engine.
+    connect_timeout — таймаут подключения asyncpg (по умолчанию у него 60 с).
+    """
+    if profile.pgbouncer:
+        # PgBouncer в transaction pooling не сохраняет prepared statements между
+        # транзакциями: отключаем оба кэша и делаем имена выражений уникальными
+        url = make_url(url).update_query_dict({"prepared_statement_cache_size": "0"})
+        connect_args = {
+            "statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+        }
+    else:
+        url = make_url(url).update_query_dict(
+            {"prepared_statement_cache_size": str(profile.statement_cache_size)}
+        )
+        connect_args = {"statement_cache_size": profile.statement_cache_size}
+    if connect_timeout is not None:
+        connect_args["timeout"] = connect_timeout
+
+    return create_async_engine(
+        url,
+        echo=profile.echo,
+        poolclass=InstrumentedAsyncQueuePool,
+        pool_size=profile.pool_size,
+        max_overflow=profile.max_overflow,
+        pool_timeout=profile.pool_timeout,
+        pool_recycle=profile.pool_recycle,
+        pool_pre_ping=profile.pool_pre_ping,
+        connect_args=connect_args,
+    )
+
+
+def pool_stats(engine: AsyncEngine) -> PoolStats:
+    """Накопленная статистика ожидания пула движка."""
+    return engine.sync_engine.pool.stats
+
+
+def pool_status(engine: AsyncEngine) -> dict:
+    """Текущее состояние пула и накопленная статистика ожидания."""
+    pool = engine.sync_engine.pool
+    stats = pool.stats
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "checkouts": stats.checkouts,
+        "timeouts": stats.timeouts,
+        "wait_avg_ms": stats.wait_total / stats.checkouts * 1000 if stats.checkouts else 0.0,
+        "wait_max_ms": stats.wait_max * 1000,
+    }
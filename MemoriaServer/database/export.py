@@ -0,0 +1,120 @@
+"""
+Потоковая выгрузка пользователей со статистикой и достижениями для аналитики.
+
+Запрос выполняется через COPY (...) TO STDOUT драйвера asyncpg: Postgres сам
+сериализует строки в CSV или NDJSON (row_to_json), а куски ответа сразу уходят
+клиенту через ограниченную очередь. ORM-объекты не создаются, память не зависит
+от размера таблиц.
+"""
+import asyncio
+from datetime import datetime
+from typing import AsyncIterator, Literal, Optional
+
+from sqlalchemy import Select, select
+from sqlalchemy.dialects import postgresql
+
+from database.models import User, UserAchievement, UserGameStat
+from database.session_maker import engine
+
+ExportDataset = Literal["stats", "achievements"]
+ExportFormat = Literal["ndjson", "csv"]
+
+# Сколько кусков COPY может ждать отправки, пока клиент читает медленнее БД
+EXPORT_QUEUE_SIZE = 64
+
+
+def export_query(dataset: ExportDataset, since: Optional[datetime] = None) -> Select:
+    """
+    users JOIN user_game_stats или users JOIN user_achievements.
+    since отбирает строки статистики/достижений, изменённые не раньше этого момента.
+    """
+    user_columns = (User.id.label("user_id"), User.name, User.email, User.experience)
+    if dataset == "stats":
+        stmt = (
+            select(
+                *user_columns,
+                UserGameStat.game_id,
+                UserGameStat.high_score,
+                UserGameStat.games_played,
+                UserGameStat.stats,
+                UserGameStat.updated_at
+            )
+            .join(UserGameStat, UserGameStat.user_id == User.id)
+            .order_by(UserGameStat.user_id, UserGameStat.game_id)
+        )
+        updated_at = UserGameStat.updated_at
+    else:
+        stmt = (
+            select(
+                *user_columns,
+                UserAchievement.achievement_id,
+                UserAchievement.achieved,
+                UserAchievement.progress,
+                UserAchievement.updated_at
+            )
+            .join(UserAchievement, UserAchievement.user_id == User.id)
+            .order_by(UserAchievement.user_id, UserAchievement.achievement_id)
+        )
+        updated_at = UserAchievement.updated_at
+
+    if since is not None:
+        stmt = stmt.where(updated_at >= since)
+    return stmt
+
+
+def compile_for_copy(stmt: Select) -> tuple[str, list]:
+    """SQL с плейсхолдерами $n для asyncpg и позиционные параметры к нему."""
+    compiled = stmt.compile(dialect=postgresql.asyncpg.dialect())
+    return str(compiled), [compiled.params[name] for name in compiled.positiontup or ()]
+
+
+async def copy_export(
+        dataset: ExportDataset,
+        fmt: ExportFormat,
+        since: Optional[datetime] = None
+) -> AsyncIterator[bytes]:
+    """
+    Отдаёт выгрузку кусками в том виде, в каком их присылает COPY.
+    Соединение берётся из общего пула и возвращается, когда поток дочитан
+    или клиент отключился.
+    """
+    sql, args = compile_for_copy(export_query(dataset, since))
+    if fmt == "ndjson":
+        sql = f"SELECT row_to_json(export) FROM ({sql}) AS export"
+        # JSON без переводов строк и управляющих символов, поэтому в CSV с такими
+        # разделителем и кавычкой каждая строка выходит как есть, без экранирования
+        options = {"format": "csv", "delimiter": "\x02", "quote": "\x01"}
+    else:
+        options = {"format": "csv", "header": True}
+
+    queue: asyncio.Queue = asyncio.Queue(maxsize=EXPORT_QUEUE_SIZE)
+
+    async with engine.connect() as conn:
+        raw = (await conn.get_raw_connection()).driver_connection
+
+        async def run_copy() -> None:
+            try:
+                await raw.copy_from_query(sql, *args, output=queue.put, **options)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                await queue.put(None)
+                raise
+            await queue.put(None)
+
+        task = asyncio.create_task(run_copy())
+        try:
+            while (chunk := await queue.get()) is not None:
+                yield chunk
+            # Пробрасываем ошибку COPY, если она была
+            await task
+        finally:
+            if not task.done():
+                # Клиент отключился посреди COPY: протокол соединения в неизвестном
+                # состоянии, поэтому в пул оно не возвращается
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+                await conn.invalidate()
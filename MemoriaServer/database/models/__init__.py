@@ -4,3 +4,5 @@ from .games import Game
 from .user_achievement import UserAchievement
 from .user_game_stats import UserGameStat
 from .users import User
+from .game_result_keys import GameResultKey
+from .catalog_version import CatalogVersion
@@ -1,4 +1,6 @@
-from sqlalchemy import String
+from typing import Optional
+
+from sqlalchemy import CheckConstraint, ForeignKey, String
 from sqlalchemy.orm import Mapped, mapped_column
 
 from database.models import Base
@@ -6,8 +8,17 @@ from database.models import Base
 
 class Achievement(Base):
     __tablename__ = "achievements"
+    __table_args__ = (
+        CheckConstraint("metric IN ('games_played', 'high_score')", name="ck_achievements_rule"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String(100))
     description: Mapped[str] = mapped_column(String(255))
-    max_progress: Mapped[int]
\ No newline at end of file
+    max_progress: Mapped[int]
+    # Правило для сервера (database/achievement_rules.py): прогресс — значение metric
+    # статистики игры game_id, цель — max_progress. Без правила прогресс ведёт клиент.
+    game_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("games.id", ondelete="SET NULL"), nullable=True, index=True
+    )
+    metric: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
@@ -0,0 +1,12 @@
+from sqlalchemy import BigInteger, SmallInteger
+from sqlalchemy.orm import Mapped, mapped_column
+
+from database.models.base import Base
+
+
+class CatalogVersion(Base):
+    """Версия каталога игр и достижений: одна строка, растёт при каждом изменении."""
+    __tablename__ = "catalog_version"
+
+    id: Mapped[int] = mapped_column(SmallInteger, primary_key=True, default=1)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False)
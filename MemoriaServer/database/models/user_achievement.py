@@ -1,11 +1,13 @@
+from datetime import datetime
 from typing import TYPE_CHECKING
 from uuid import UUID
 
-from sqlalchemy import UUID as PG_UUID, ForeignKey
+from sqlalchemy import UUID as PG_UUID, DateTime, ForeignKey, Index, func
 from sqlalchemy.orm import Mapped, relationship
 from sqlalchemy.orm import mapped_column
 
 from database.models import Base
+from database.partitioning import hash_partitioned
 
 if TYPE_CHECKING:
     from .users import User
@@ -14,11 +16,20 @@ if TYPE_CHECKING:
 
 class UserAchievement(Base):
     __tablename__ = "user_achievements"
+    __table_args__ = (
+        # Инкрементальная выгрузка (since)
+        Index("ix_user_achievements_updated_at", "updated_at"),
+        # Строк users × достижения: секции по user_id, как у user_game_stats
+        hash_partitioned("user_id"),
+    )
 
     user_id: Mapped[UUID] = mapped_column(PG_UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
     achievement_id: Mapped[int] = mapped_column(ForeignKey("achievements.id"), primary_key=True)
     achieved: Mapped[bool] = mapped_column(server_default="0")
     progress: Mapped[int] = mapped_column(server_default="0")
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
 
     user: Mapped["User"] = relationship(back_populates="achievements")
     achievement: Mapped["Achievement"] = relationship()
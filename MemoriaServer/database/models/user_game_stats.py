@@ -1,10 +1,12 @@
+from datetime import datetime
 from typing import TYPE_CHECKING
 from uuid import UUID
 
-from sqlalchemy import ForeignKey, Integer, JSON
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, JSON, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from database.models.base import Base
+from database.partitioning import hash_partitioned
 
 if TYPE_CHECKING:
     from .games import Game
@@ -13,6 +15,14 @@ if TYPE_CHECKING:
 
 class UserGameStat(Base):
     __tablename__ = "user_game_stats"
+    __table_args__ = (
+        # Лидерборд игры: ORDER BY high_score DESC, user_id DESC читается обратным сканом
+        Index("ix_user_game_stats_leaderboard", "game_id", "high_score", "user_id"),
+        # Инкрементальная выгрузка (since)
+        Index("ix_user_game_stats_updated_at", "updated_at"),
+        # Строк users × игры: секции по user_id, запросы одного пользователя идут в одну секцию
+        hash_partitioned("user_id"),
+    )
 
     user_id: Mapped[UUID] = mapped_column(
         ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
@@ -24,6 +34,9 @@ class UserGameStat(Base):
     high_score: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     games_played: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     stats: Mapped[dict] = mapped_column(JSON, default=dict)  # дополнительные поля
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
 
     user: Mapped["User"] = relationship(back_populates="game_stats")
     game: Mapped["Game"] = relationship(back_populates="stats")
@@ -1,7 +1,7 @@
 from typing import TYPE_CHECKING
 from uuid import UUID
 
-from sqlalchemy import UUID as PG_UUID, text, String
+from sqlalchemy import UUID as PG_UUID, Index, JSON, text, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from database.models.base import Base
@@ -14,6 +14,10 @@ if TYPE_CHECKING:
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Глобальный лидерборд по опыту
+        Index("ix_users_experience", "experience", "id"),
+    )
 
     id: Mapped[UUID] = mapped_column(PG_UUID(as_uuid=True), primary_key=True, server_default=text("uuid_generate_v4()"))
     name: Mapped[str] = mapped_column(String(100))
@@ -23,6 +27,8 @@ class User(Base):
     password: Mapped[str] = mapped_column(String(255), nullable=False)
 
     avatar_url: Mapped[str | None] = mapped_column(String, nullable=True)
+    # Превью аватара: {"80": {"webp": url, "jpeg": url}, ...}
+    avatar_variants: Mapped[dict | None] = mapped_column(JSON, nullable=True)
 
     achievements: Mapped[list["UserAchievement"]] = relationship(back_populates="user")
     game_stats: Mapped[list["UserGameStat"]] = relationship(back_populates="user", cascade="all, delete-orphan")
\ No newline at end of file
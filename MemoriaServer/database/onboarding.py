@@ -0,0 +1,51 @@
+from sqlalchemy import JSON, insert, literal, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Achievement, Game, User, UserAchievement, UserGameStat
+
+# Уникальное ограничение users.email (имя по умолчанию PostgreSQL)
+EMAIL_CONSTRAINT = "users_email_key"
+
+
+def onboarding_statement(name: str, email: str, password: str):
+    """
+    Один INSERT пользователя с CTE, которые заводят ему статистику по каждой игре
+    из каталога games и запись по каждому достижению из achievements.
+    """
+    new_user = (
+        insert(User)
+        .values(name=name, email=email, password=password)
+        .returning(User.id, User.name, User.experience, User.email, User.avatar_url, User.avatar_variants)
+        .cte("new_user")
+    )
+    new_stats = (
+        insert(UserGameStat)
+        .from_select(
+            ["user_id", "game_id", "high_score", "games_played", "stats"],
+            select(new_user.c.id, Game.id, literal(0), literal(0), literal({}, JSON))
+            .select_from(new_user)
+            .join(Game, true())
+        )
+        .cte("new_stats")
+    )
+    new_achievements = (
+        insert(UserAchievement)
+        .from_select(
+            ["user_id", "achievement_id", "achieved", "progress"],
+            select(new_user.c.id, Achievement.id, literal(False), literal(0))
+            .select_from(new_user)
+            .join(Achievement, true())
+        )
+        .cte("new_achievements")
+    )
+    return select(new_user).add_cte(new_stats, new_achievements)
+
+
+async def onboard_user(session: AsyncSession, name: str, email: str, password: str) -> User:
+    """
+    Создаёт пользователя со всеми связанными записями за один запрос и одну транзакцию.
+    Повтор email приводит к IntegrityError на EMAIL_CONSTRAINT.
+    """
+    row = (await session.execute(onboarding_statement(name, email, password))).one()
+    await session.commit()
+    return User(**row._mapping)
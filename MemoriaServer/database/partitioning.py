@@ -0,0 +1,49 @@
+"""
+Декларативное hash-секционирование таблиц по ключу.
+
+hash_partitioned() подставляется в __table_args__ модели: таблица создаётся
+как PARTITION BY HASH, а при metadata.create_all (init_models) сразу же
+создаются секции <таблица>_p0 .. <таблица>_p{N-1}. В рабочей БД секции
+создаёт миграция, число секций там должно совпадать с HASH_PARTITIONS.
+"""
+import re
+
+from sqlalchemy import DDL, Table, event
+
+# Смена числа секций требует переноса данных, поэтому это константа, а не настройка
+HASH_PARTITIONS = 16
+
+PARTITION_NAME = re.compile(r"^(?P<table>.+)_p\d+$")
+
+
+def hash_partitioned(column: str, partitions: int = HASH_PARTITIONS) -> dict:
+    """Аргументы Table для секционирования по HASH (column) на partitions секций."""
+    return {
+        "postgresql_partition_by": f"HASH ({column})",
+        "info": {"hash_partitions": partitions},
+    }
+
+
+def partition_names(table_name: str, partitions: int = HASH_PARTITIONS) -> list[str]:
+    return [f"{table_name}_p{remainder}" for remainder in range(partitions)]
+
+
+def is_partition(name: str, metadata_tables) -> bool:
+    """Отражённая таблица — секция одной из секционированных таблиц метаданных."""
+    match = PARTITION_NAME.match(name)
+    if match is None:
+        return False
+    parent = metadata_tables.get(match["table"])
+    return parent is not None and "hash_partitions" in parent.info
+
+
+@event.listens_for(Table, "after_create")
+def create_hash_partitions(table: Table, connection, **kw) -> None:
+    partitions = table.info.get("hash_partitions")
+    if not partitions:
+        return
+    for remainder, name in enumerate(partition_names(table.name, partitions)):
+        connection.execute(DDL(
+            f"CREATE TABLE {name} PARTITION OF {table.name} "
+            f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})"
+        ))
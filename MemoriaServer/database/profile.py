@@ -0,0 +1,100 @@
+from uuid import UUID
+
+from sqlalchemy import Text, cast, func, literal_column, select, true
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
+from database.models import Achievement, CatalogVersion, Game, User, UserAchievement, UserGameStat
+from database.row_versions import rows_version
+
+EMPTY_ARRAY = literal_column("'[]'::json")
+
+
+def _object(**fields):
+    """json_build_object с ключами в порядке полей DTO."""
+    args = []
+    for key, value in fields.items():
+        args.extend((key, value))
+    return func.json_build_object(*args)
+
+
+def _rows(model, user_id: UUID, item, order_by, *joins):
+    """
+    LATERAL-подзапрос по строкам пользователя: массив JSON (data) и версия строк
+    (database.row_versions, как в routers.user.user_rows_version).
+    """
+    stmt = select(
+        func.coalesce(func.json_agg(aggregate_order_by(item, order_by)), EMPTY_ARRAY).label("data"),
+        rows_version(model, order_by).label("version"),
+    ).where(model.user_id == user_id)
+    for target, onclause in joins:
+        stmt = stmt.join(target, onclause)
+    return stmt.lateral()
+
+
+def profile_statement(user_id: UUID):
+    """
+    Профиль одним запросом: документ JSON по ProfileDTO, собранный в Postgres
+    (пользователь, статистика с кодом и названием игры, достижения с данными
+    каталога), и версия для ETag: xmin пользователя, версии его строк
+    статистики и достижений и версия каталога — из того же снимка, что и
+    встроенные в документ строки игр и достижений (переименование игры меняет
+    ETag). Строки статистики и достижений читаются по user_id — по одной
+    секции каждой таблицы.
+    """
+    stats = _rows(
+        UserGameStat,
+        user_id,
+        _object(
+            user_id=UserGameStat.user_id,
+            game_id=UserGameStat.game_id,
+            high_score=UserGameStat.high_score,
+            games_played=UserGameStat.games_played,
+            game_code=Game.code,
+            game_name=Game.name,
+        ),
+        UserGameStat.game_id,
+        (Game, Game.id == UserGameStat.game_id),
+    )
+    achievements = _rows(
+        UserAchievement,
+        user_id,
+        _object(
+            user_id=UserAchievement.user_id,
+            achievement_id=UserAchievement.achievement_id,
+            achieved=UserAchievement.achieved,
+            progress=UserAchievement.progress,
+            name=Achievement.name,
+            description=Achievement.description,
+            max_progress=Achievement.max_progress,
+            game_id=Achievement.game_id,
+            metric=Achievement.metric,
+        ),
+        UserAchievement.achievement_id,
+        (Achievement, Achievement.id == UserAchievement.achievement_id),
+    )
+    document = _object(
+        user=_object(
+            id=User.id,
+            name=User.name,
+            experience=User.experience,
+            email=User.email,
+            avatar_url=User.avatar_url,
+            avatar_variants=User.avatar_variants,
+        ),
+        stats=stats.c.data,
+        achievements=achievements.c.data,
+    )
+    return (
+        select(
+            # Текстом: документ уходит клиенту как есть, без разбора и сериализации в Python
+            cast(document, Text).label("document"),
+            literal_column("users.xmin").label("row_version"),
+            stats.c.version,
+            achievements.c.version,
+            select(CatalogVersion.version).where(CatalogVersion.id == 1).scalar_subquery().label("catalog_version"),
+        )
+        .select_from(User)
+        .join(stats, true())
+        .join(achievements, true())
+        .where(User.id == user_id)
+    )
@@ -0,0 +1,263 @@
+"""
+Маршрутизация чтений на реплики.
+
+GET-маршруты берут сессию из get_read_session: при первом запросе она
+выбирает здоровую реплику (по кругу), а если реплик нет, все упали или клиент
+недавно писал — primary. Маршруты, ответившие из памяти или 304, соединение
+не берут вовсе. Здоровье проверяется фоновой задачей раз в DB_REPLICA_HEALTH_INTERVAL
+секунд: реплика должна подключиться и ответить за DB_REPLICA_HEALTH_TIMEOUT и
+отставать не больше DB_REPLICA_MAX_LAG. Подключение к реплике в запросе
+ограничено DB_REPLICA_CONNECT_TIMEOUT; если оно не удалось, реплика выходит из
+ротации до следующей успешной проверки, а чтение идёт в primary (до первого
+выражения сессии ничего не выполнено, повтор безопасен). Ошибки выражений
+(отмена запроса из-за конфликта с восстановлением на hot standby и т. п.)
+реплику из ротации не выводят.
+
+Read-your-writes: после успешного небезопасного запроса (POST/PATCH/DELETE...)
+клиент DB_READ_YOUR_WRITES секунд читает из primary. Метка хранится в cookie
+(работает между воркерами) и в памяти процесса по заголовку Authorization
+(для клиентов без cookie).
+
+Локальная проверка на двух экземплярах Postgres: DB_REPLICA_URIS указывает на
+второй экземпляр (репликация не обязательна — отставание у не-реплики 0),
+состояние видно в GET /api/internal/replicas; после остановки второго
+экземпляра чтения переходят на primary.
+"""
+import asyncio
+import itertools
+import time
+from typing import Optional
+
+from sqlalchemy import exc, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import EngineConfig, ReplicaConfig
+from database.engine_profile import build_engine
+from utils.cache import TTLCache
+
+PIN_COOKIE = "memoria_primary_until"
+PIN_CACHE_SIZE = 100_000
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+# Отставание в секундах; 0 для primary и для реплики, проигравшей весь полученный WAL
+LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+# Ошибки подключения: asyncpg бросает их без обёртки DBAPIError
+CONNECT_ERRORS = (OSError, asyncio.TimeoutError)
+
+
+def is_connect_error(error: BaseException) -> bool:
+    """Реплика недоступна (нет соединения или оно оборвалось), а не ошибка выражения."""
+    if isinstance(error, exc.DBAPIError):
+        return error.connection_invalidated
+    return isinstance(error, CONNECT_ERRORS)
+
+
+class Replica:
+    """Движок одной реплики и результат последней проверки."""
+
+    def __init__(self, uri: str, profile: EngineConfig, connect_timeout: float):
+        self.name = make_url(uri).render_as_string(hide_password=True)
+        self.engine = build_engine(uri, profile, connect_timeout=connect_timeout)
+        # До первой проверки реплика в ротации
+        self.healthy = True
+        self.lag: Optional[float] = None
+        self.error: Optional[str] = None
+        self.checked_at: Optional[float] = None
+
+
+class ReplicaSet:
+    """Реплики процесса с фоновой проверкой здоровья."""
+
+    def __init__(self, profile: EngineConfig, config: ReplicaConfig):
+        self.config = config
+        self.replicas = [Replica(uri, profile, config.connect_timeout) for uri in config.uris]
+        self._cycle = itertools.cycle(self.replicas)
+        self._monitor: Optional[asyncio.Task] = None
+
+    def pick(self) -> Optional[Replica]:
+        """Следующая здоровая реплика по кругу или None."""
+        for _ in range(len(self.replicas)):
+            replica = next(self._cycle)
+            if replica.healthy:
+                return replica
+        return None
+
+    @staticmethod
+    def mark_down(replica: Replica, error: BaseException) -> None:
+        replica.healthy = False
+        replica.error = repr(error)
+
+    async def check(self, replica: Replica) -> None:
+        try:
+            # Таймаут и на подключение: недоступная по сети реплика иначе держала
+            # бы проверку до таймаута подключения asyncpg
+            async with asyncio.timeout(self.config.health_timeout):
+                async with replica.engine.connect() as conn:
+                    lag = await conn.scalar(LAG_QUERY)
+        except (exc.DBAPIError, *CONNECT_ERRORS) as error:
+            # Проверка строже запроса: реплика, не ответившая на LAG_QUERY, нездорова
+            self.mark_down(replica, error)
+        else:
+            replica.lag = float(lag)
+            replica.healthy = replica.lag <= self.config.max_lag
+            replica.error = None if replica.healthy else "replication lag"
+        replica.checked_at = time.time()
+
+    async def check_all(self) -> None:
+        await asyncio.gather(*(self.check(replica) for replica in self.replicas))
+
+    async def _run_monitor(self) -> None:
+        while True:
+            await asyncio.sleep(self.config.health_interval)
+            await self.check_all()
+
+    async def start(self) -> None:
+        if not self.replicas:
+            return
+        await self.check_all()
+        self._monitor = asyncio.create_task(self._run_monitor())
+
+    async def stop(self) -> None:
+        if self._monitor is not None:
+            self._monitor.cancel()
+            try:
+                await self._monitor
+            except asyncio.CancelledError:
+                pass
+            self._monitor = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def status(self) -> list[dict]:
+        return [
+            {
+                "name": replica.name,
+                "healthy": replica.healthy,
+                "lag_s": replica.lag,
+                "error": replica.error,
+                "checked_at": replica.checked_at,
+            }
+            for replica in self.replicas
+        ]
+
+
+class ReadSession(Session):
+    """
+    Sync-часть сессии чтения: движок выбирается при первом запросе (get_bind),
+    а не при создании сессии.
+    """
+
+    def __init__(self, *args, replicas: ReplicaSet, pinned: bool, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replica_set = replicas
+        self.pinned = pinned
+        self.replica: Optional[Replica] = None
+        self._read_engine: Optional[AsyncEngine] = None
+
+    def read_engine(self) -> AsyncEngine:
+        if self._read_engine is None:
+            self.replica = None if self.pinned else self.replica_set.pick()
+            # bind сессии — primary (async_sessionmaker(engine, ...))
+            self._read_engine = self.replica.engine if self.replica is not None else self.primary
+        return self._read_engine
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        return self.read_engine().sync_engine
+
+    def _connection_for_bind(self, engine, execution_options=None, **kw):
+        try:
+            return super()._connection_for_bind(engine, execution_options, **kw)
+        except Exception as error:
+            # Соединение берётся до первого выражения: запрос ещё ничего не прочитал
+            if self.replica is None or not is_connect_error(error):
+                raise
+            self.replica_set.mark_down(self.replica, error)
+            self.replica = None
+            self._read_engine = self.primary
+        return super()._connection_for_bind(self.primary.sync_engine, execution_options, **kw)
+
+
+class ReadAsyncSession(AsyncSession):
+    """AsyncSession над ReadSession; bind — выбранный движок (для stream_response)."""
+
+    def __init__(self, bind: AsyncEngine, **kwargs):
+        super().__init__(bind, **kwargs)
+        self.sync_session.primary = bind
+
+    @property
+    def bind(self) -> AsyncEngine:
+        return self.sync_session.read_engine()
+
+    @bind.setter
+    def bind(self, value) -> None:
+        # AsyncSession.__init__ присваивает bind; primary хранит ReadSession
+        pass
+
+
+class ReadYourWrites:
+    """Кто недавно писал и поэтому должен читать из primary."""
+
+    def __init__(self, window: float):
+        self.window = window
+        self._tokens = TTLCache(maxsize=PIN_CACHE_SIZE, ttl=window)
+
+    def pin(self, authorization: Optional[str]) -> None:
+        if authorization:
+            self._tokens.set(authorization, True)
+
+    def is_pinned(self, request: Request) -> bool:
+        until = request.cookies.get(PIN_COOKIE)
+        if until is not None:
+            try:
+                if float(until) > time.time():
+                    return True
+            except ValueError:
+                pass
+        authorization = request.headers.get("authorization")
+        return bool(authorization) and self._tokens.get(authorization) is not None
+
+    def cookie(self) -> bytes:
+        until = time.time() + self.window
+        return (
+            f"{PIN_COOKIE}={until:.3f}; Max-Age={int(self.window) + 1}; Path=/; HttpOnly; SameSite=Lax"
+        ).encode("latin-1")
+
+
+class ReadYourWritesMiddleware:
+    """
+    ASGI-middleware: на успешный ответ небезопасного запроса ставит cookie
+    PIN_COOKIE и запоминает заголовок Authorization в ReadYourWrites.
+    """
+
+    def __init__(self, app: ASGIApp, pins: ReadYourWrites):
+        self.app = app
+        self.pins = pins
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or self.pins.window <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_pin(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                authorization = None
+                for name, value in scope["headers"]:
+                    if name == b"authorization":
+                        authorization = value.decode("latin-1")
+                        break
+                self.pins.pin(authorization)
+                message["headers"] = [*message.get("headers", []), (b"set-cookie", self.pins.cookie())]
+            await send(message)
+
+        await self.app(scope, receive, send_with_pin)
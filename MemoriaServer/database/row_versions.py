@@ -0,0 +1,19 @@
+from sqlalchemy import Text, cast, func, literal, literal_column
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
+
+def rows_version(model, key):
+    """
+    Версия набора строк для ETag: md5 от пар (key, xmin) в порядке key.
+
+    count + max(updated_at) не годится: updated_at = now() — время начала
+    транзакции, и строка транзакции, начатой раньше, но зафиксированной позже
+    чужой, не сдвигает максимум — клиент получал бы 304 на устаревшие данные.
+    xmin строки меняется при каждой вставке и изменении и виден только после
+    commit, удаление убирает пару из списка — версия меняется при любом изменении
+    набора, в каком бы порядке ни фиксировались транзакции. Строк пользователя
+    немного и они в одной секции, поэтому агрегат не дороже прежнего.
+    """
+    table = model.__table__.name
+    pair = cast(key, Text) + literal(":") + cast(literal_column(f"{table}.xmin"), Text)
+    return func.md5(func.string_agg(pair, aggregate_order_by(literal(","), key)))
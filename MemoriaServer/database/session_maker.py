@@ -1,17 +1,48 @@
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine, AsyncSession, AsyncConnection
+from fastapi import Request
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession, AsyncConnection
 
 from config import config
+from database.engine_profile import build_engine
 from database.models.base import Base
+from database.replicas import ReadAsyncSession, ReadSession, ReadYourWrites, ReplicaSet, is_connect_error
 
-engine = create_async_engine(url=config.db.PG_URI, echo=True)
+engine = build_engine(config.db.PG_URI, config.engine)
 sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
 
+replicas = ReplicaSet(config.engine, config.replicas)
+pins = ReadYourWrites(config.replicas.read_your_writes)
+read_sessionmaker = async_sessionmaker(
+    engine,
+    class_=ReadAsyncSession,
+    sync_session_class=ReadSession,
+    expire_on_commit=False
+)
+
 
 async def get_session() -> AsyncSession:
     async with sessionmaker() as session:
         yield session
 
 
+async def get_read_session(request: Request) -> AsyncSession:
+    """
+    Сессия для read-only маршрутов: реплика, если клиент не писал в последние
+    DB_READ_YOUR_WRITES секунд и есть здоровая реплика, иначе primary.
+    Движок выбирается при первом запросе сессии; маршрут, не дошедший до БД,
+    соединение не берёт. Если реплика не подключилась, сессия сама уходит в
+    primary (ReadSession); обрыв соединения посреди запроса выводит реплику из
+    ротации, а запрос завершается ошибкой.
+    """
+    session = read_sessionmaker(replicas=replicas, pinned=pins.is_pinned(request))
+    async with session:
+        try:
+            yield session
+        except Exception as error:
+            if session.sync_session.replica is not None and is_connect_error(error):
+                replicas.mark_down(session.sync_session.replica, error)
+            raise
+
+
 async def init_models() -> None:
     async with engine.begin() as conn:
         conn: AsyncConnection
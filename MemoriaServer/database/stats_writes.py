@@ -0,0 +1,129 @@
+from datetime import timedelta
+from typing import Iterable
+from uuid import UUID
+
+from sqlalchemy import JSON, and_, cast, delete, func, select, tuple_
+from sqlalchemy.dialects.postgresql import JSONB, insert
+from sqlalchemy.orm import aliased
+
+from database.achievement_rules import achievement_progress
+from database.models import GameResultKey, UserGameStat
+
+
+def result_upsert(rows: list[dict]):
+    """
+    Многострочный INSERT ... ON CONFLICT DO UPDATE для user_game_stats.
+    Каждая строка — свёрнутые результаты по (user_id, game_id):
+    games_played — число партий, high_score — лучший счёт, stats — метрики.
+    На конфликте счётчики складываются на стороне БД, high_score = GREATEST,
+    stats сливается поверх прежних, поэтому параллельные сессии не теряют обновлений.
+    Обычно оборачивается в with_previous_high_score.
+    """
+    stmt = insert(UserGameStat).values(rows)
+    excluded = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=[UserGameStat.user_id, UserGameStat.game_id],
+        set_={
+            "games_played": UserGameStat.games_played + excluded.games_played,
+            "high_score": func.greatest(UserGameStat.high_score, excluded.high_score),
+            # Колонка хранится как json, слияние делаем через jsonb
+            "stats": cast(
+                cast(UserGameStat.stats, JSONB).op("||")(cast(excluded.stats, JSONB)),
+                JSON
+            ),
+            # onupdate колонки не применяется к ON CONFLICT DO UPDATE
+            "updated_at": func.now(),
+        },
+    )
+
+
+def with_previous_high_score(stmt, keys: Iterable[tuple[UUID, int]], achievements: bool = False):
+    """
+    Оборачивает INSERT/UPDATE/DELETE над user_game_stats в один запрос, который
+    возвращает строки (UserGameStat, previous_high_score). Прежнее значение читается
+    CTE из снимка начала запроса, None — строки не было. Нужно для инкрементального
+    обновления гистограмм счёта.
+    achievements=True — тем же запросом пересчитать достижения с правилами по
+    изменённым строкам (database.achievement_rules).
+    """
+    keys = list(keys)
+    previous = (
+        select(UserGameStat.user_id, UserGameStat.game_id, UserGameStat.high_score)
+        .where(
+            # Отдельное условие по user_id нужно для отсечения секций:
+            # по строковому IN (user_id, game_id) планировщик их не отсекает
+            UserGameStat.user_id.in_(list(dict.fromkeys(user_id for user_id, _ in keys))),
+            tuple_(UserGameStat.user_id, UserGameStat.game_id).in_(keys)
+        )
+        .cte("previous")
+    )
+    changed = stmt.returning(*UserGameStat.__table__.c).cte("changed")
+    stat = aliased(UserGameStat, changed)
+    result = (
+        select(stat, previous.c.high_score.label("previous_high_score"))
+        .outerjoin(previous, and_(
+            previous.c.user_id == stat.user_id,
+            previous.c.game_id == stat.game_id
+        ))
+        .execution_options(populate_existing=True)
+    )
+    if achievements:
+        # Data-modifying CTE выполняется, даже если основной SELECT его не читает
+        result = result.add_cte(achievement_progress(changed))
+    return result
+
+
+def fold_results(user_id: UUID, results: Iterable) -> list[dict]:
+    """
+    Сворачивает результаты партий (объекты с game_id, score, stats) в одну строку
+    на игру для result_upsert. Поздние метрики перекрывают ранние.
+    Строки упорядочены по game_id, чтобы параллельные пакеты брали блокировки в одном порядке.
+    """
+    folded: dict[int, dict] = {}
+    for result in results:
+        row = folded.get(result.game_id)
+        if row is None:
+            folded[result.game_id] = {
+                "user_id": user_id,
+                "game_id": result.game_id,
+                "high_score": result.score,
+                "games_played": 1,
+                "stats": dict(result.stats)
+            }
+        else:
+            row["games_played"] += 1
+            row["high_score"] = max(row["high_score"], result.score)
+            row["stats"].update(result.stats)
+    return [folded[game_id] for game_id in sorted(folded)]
+
+
+def claim_result_keys(user_id: UUID, keys: Iterable[str]):
+    """
+    INSERT ключей идемпотентности с ON CONFLICT DO NOTHING.
+    RETURNING отдаёт только новые ключи — результаты с остальными уже применены.
+    """
+    return (
+        insert(GameResultKey)
+        .values([{"user_id": user_id, "key": key} for key in keys])
+        .on_conflict_do_nothing()
+        .returning(GameResultKey.key)
+    )
+
+
+def prune_result_keys(retention: timedelta, batch: int):
+    """
+    DELETE не больше batch ключей идемпотентности старше retention (по индексу
+    created_at). Строки, которые сейчас удаляет другой воркер, пропускаются
+    (SKIP LOCKED). RETURNING — чтобы знать, сколько удалено.
+    """
+    expired = (
+        select(GameResultKey.user_id, GameResultKey.key)
+        .where(GameResultKey.created_at < func.now() - retention)
+        .limit(batch)
+        .with_for_update(skip_locked=True)
+    )
+    return (
+        delete(GameResultKey)
+        .where(tuple_(GameResultKey.user_id, GameResultKey.key).in_(expired))
+        .returning(GameResultKey.key)
+    )
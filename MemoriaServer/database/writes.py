@@ -0,0 +1,87 @@
+from typing import Any, Optional, Type, TypeVar
+
+from fastapi import HTTPException, status
+from sqlalchemy import Delete, Row, delete, select, update
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Base
+
+ModelT = TypeVar("ModelT", bound=Base)
+
+# SQLSTATE PostgreSQL
+UNIQUE_VIOLATION = "23505"
+FOREIGN_KEY_VIOLATION = "23503"
+
+
+def is_violation(error: DBAPIError, sqlstate: str, constraint: Optional[str] = None) -> bool:
+    """
+    Ошибка БД с этим SQLSTATE (и, если задано, на этом ограничении или индексе).
+    Диалект asyncpg кладёт sqlstate в error.orig, а исходное исключение asyncpg
+    с constraint_name — в его __cause__.
+    """
+    orig = error.orig
+    if getattr(orig, "sqlstate", None) != sqlstate:
+        return False
+    return constraint is None or getattr(orig.__cause__, "constraint_name", None) == constraint
+
+
+async def update_returning(
+        session: AsyncSession,
+        model: Type[ModelT],
+        *where: Any,
+        values: dict,
+        detail: str,
+        conflict_detail: Optional[str] = None
+) -> ModelT:
+    """
+    Обновляет строку одной командой UPDATE ... RETURNING и фиксирует транзакцию.
+    Если строка не найдена — 404 с detail; нарушение уникальности — 400 с conflict_detail.
+    Пустой values сводится к обычному SELECT.
+    """
+    if values:
+        stmt = (
+            update(model)
+            .where(*where)
+            .values(**values)
+            .returning(model)
+            .execution_options(synchronize_session=False)
+        )
+    else:
+        stmt = select(model).where(*where)
+
+    try:
+        record = (await session.scalars(stmt)).first()
+    except IntegrityError as error:
+        # FK и check — ошибки данных запроса, а не конфликт с другой строкой
+        if conflict_detail is None or not is_violation(error, UNIQUE_VIOLATION):
+            raise
+        await session.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=conflict_detail)
+
+    if record is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
+    await session.commit()
+    return record
+
+
+async def delete_returning(
+        session: AsyncSession,
+        model: Type[ModelT],
+        *where: Any,
+        detail: str,
+        stmt: Optional[Delete] = None
+) -> Row:
+    """
+    Удаляет строку одной командой DELETE ... RETURNING и фиксирует транзакцию.
+    Вместо where можно передать готовый stmt (например, с CTE), он должен иметь RETURNING.
+    Если ничего не удалено — 404 с detail. Возвращает строку RETURNING.
+    """
+    if stmt is None:
+        stmt = delete(model).where(*where).returning(*model.__table__.primary_key.columns)
+
+    deleted = (await session.execute(stmt)).first()
+    if deleted is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
+    await session.commit()
+    return deleted
@@ -1,14 +1,75 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
 
+from config import config
 # Импортируем модель User
 # Функция для получения сессии (зависимость)
-from routers import all_routers
+from database.replicas import ReadYourWritesMiddleware
+from database.session_maker import engine, pins, replicas
+from routers import all_routers, metrics as metrics_router
+from utils.catalog import catalog
+from utils.health import worker_state
+from utils.media import MediaFiles
+from utils.metrics import MetricsMiddleware, instrument_engine
+from utils.result_keys import result_key_pruner
+from utils.score_histogram import histograms
+from utils.stat_buffer import stat_buffer
+from utils.thumbnails import thumbnail_pool
+from utils.warmup import warm_up
 
 # Импорт функций для хеширования пароля
 
-app = FastAPI()
 
-app.include_router(all_routers)
-app.mount("/media", StaticFiles(directory="media"), name="media")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Первая проверка реплик до приёма запросов, дальше — фоновая задача
+    await replicas.start()
+    # Соединения пулов, подготовленные выражения и кэш компиляции — до первого запроса;
+    # реплики, не прошедшие первую проверку, не прогреваются
+    worker_state.warmup = await warm_up(
+        [
+            ("primary", engine),
+            *((replica.name, replica.engine) for replica in replicas.replicas if replica.healthy)
+        ],
+        config.engine
+    )
+    # Каталог игр и достижений — в память до первого запроса
+    await catalog.start()
+    # Фоновый сброс результатов партий (STAT_WRITE_BEHIND)
+    stat_buffer.start()
+    # Удаление устаревших ключей идемпотентности пакетов результатов
+    result_key_pruner.start()
+    # Только теперь readiness отвечает 200
+    worker_state.mark_ready()
+    yield
+    # Остаток буфера пишется до закрытия пула
+    await stat_buffer.stop()
+    await result_key_pruner.stop()
+    await catalog.stop()
+    await histograms.stop()
+    await replicas.stop()
+    thumbnail_pool.shutdown()
+    # Соединения закрываются штатно, а не обрываются вместе с процессом
+    await engine.dispose()
+
 
+app = FastAPI(lifespan=lifespan)
+
+app.add_middleware(ReadYourWritesMiddleware, pins=pins)
+if config.metrics.enabled:
+    # Внешний слой: время ответа включает остальные middleware
+    app.add_middleware(MetricsMiddleware)
+    instrument_engine(engine, "primary")
+    for replica in replicas.replicas:
+        instrument_engine(replica.engine, "replica")
+app.include_router(all_routers)
+app.include_router(metrics_router.router)
+app.mount("/media", MediaFiles(
+    directory=config.media.directory,
+    max_age=config.media.max_age,
+    cache_entries=config.media.cache_entries,
+    cache_ttl=config.media.cache_ttl,
+    inline_max=config.media.inline_max,
+    chunk_size=config.media.chunk_size
+), name="media")
@@ -0,0 +1,25 @@
+"""avatar variants
+
+Revision ID: 1b7e5d2c9a40
+Revises: f0a6d3b9c215
+Create Date: 2026-10-18 16:02:41.318274
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '1b7e5d2c9a40'
+down_revision: Union[str, None] = 'f0a6d3b9c215'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('avatar_variants', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'avatar_variants')
@@ -0,0 +1,39 @@
+"""achievement rules
+
+Revision ID: 5d9a3e71c4b8
+Revises: 1b7e5d2c9a40
+Create Date: 2026-10-18 17:24:55.910463
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '5d9a3e71c4b8'
+down_revision: Union[str, None] = '1b7e5d2c9a40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('achievements', sa.Column('game_id', sa.Integer(), nullable=True))
+    op.add_column('achievements', sa.Column('metric', sa.String(length=32), nullable=True))
+    op.create_foreign_key(
+        'achievements_game_id_fkey', 'achievements', 'games', ['game_id'], ['id'], ondelete='SET NULL'
+    )
+    op.create_index(op.f('ix_achievements_game_id'), 'achievements', ['game_id'], unique=False)
+    op.create_check_constraint(
+        'ck_achievements_rule',
+        'achievements',
+        "metric IN ('games_played', 'high_score')"
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('ck_achievements_rule', 'achievements', type_='check')
+    op.drop_index(op.f('ix_achievements_game_id'), table_name='achievements')
+    op.drop_constraint('achievements_game_id_fkey', 'achievements', type_='foreignkey')
+    op.drop_column('achievements', 'metric')
+    op.drop_column('achievements', 'game_id')
@@ -0,0 +1,24 @@
+"""game result keys created_at index
+
+Revision ID: 8e3b6f0a2d71
+Revises: 5d9a3e71c4b8
+Create Date: 2026-10-18 21:40:12.482931
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '8e3b6f0a2d71'
+down_revision: Union[str, None] = '5d9a3e71c4b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f('ix_game_result_keys_created_at'), 'game_result_keys', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_game_result_keys_created_at'), table_name='game_result_keys')
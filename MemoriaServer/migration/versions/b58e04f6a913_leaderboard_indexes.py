@@ -0,0 +1,26 @@
+"""leaderboard indexes
+
+Revision ID: b58e04f6a913
+Revises: 3a7c1e9d2b4f
+Create Date: 2026-10-18 11:03:27.604118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'b58e04f6a913'
+down_revision: Union[str, None] = '3a7c1e9d2b4f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_user_game_stats_leaderboard', 'user_game_stats', ['game_id', 'high_score', 'user_id'], unique=False)
+    op.create_index('ix_users_experience', 'users', ['experience', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_experience', table_name='users')
+    op.drop_index('ix_user_game_stats_leaderboard', table_name='user_game_stats')
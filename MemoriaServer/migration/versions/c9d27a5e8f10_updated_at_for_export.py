@@ -0,0 +1,31 @@
+"""updated_at for export
+
+Revision ID: c9d27a5e8f10
+Revises: b58e04f6a913
+Create Date: 2026-10-18 12:26:53.771940
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9d27a5e8f10'
+down_revision: Union[str, None] = 'b58e04f6a913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('user_game_stats', sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+    op.add_column('user_achievements', sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+    op.create_index('ix_user_game_stats_updated_at', 'user_game_stats', ['updated_at'], unique=False)
+    op.create_index('ix_user_achievements_updated_at', 'user_achievements', ['updated_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_achievements_updated_at', table_name='user_achievements')
+    op.drop_index('ix_user_game_stats_updated_at', table_name='user_game_stats')
+    op.drop_column('user_achievements', 'updated_at')
+    op.drop_column('user_game_stats', 'updated_at')
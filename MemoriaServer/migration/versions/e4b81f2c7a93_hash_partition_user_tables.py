@@ -0,0 +1,168 @@
+"""hash partition user tables
+
+Revision ID: e4b81f2c7a93
+Revises: c9d27a5e8f10
+Create Date: 2026-10-18 14:02:37.418306
+
+Онлайн-перенос user_game_stats и user_achievements в таблицы, секционированные
+по HASH (user_id):
+
+1. Рядом создаются <таблица>_part с секциями, ключами и индексами, а на старые
+   таблицы вешается триггер, который повторяет в новых каждый INSERT/UPDATE/DELETE.
+2. Существующие строки копируются пачками по BATCH_SIZE, каждая пачка — своя
+   короткая транзакция (autocommit). Строки пачки берутся FOR KEY SHARE, поэтому
+   параллельный DELETE дождётся копии и его триггер удалит уже скопированную строку.
+3. В финальной транзакции старые таблицы блокируются (не дольше lock_timeout),
+   удаляются, а новые получают их имена, имена ключей и индексов.
+
+Приложение всё это время работает со старыми таблицами; блокировка записи
+нужна только на шаг 3. Downgrade переносит данные обратно одной транзакцией.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import text
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b81f2c7a93'
+down_revision: Union[str, None] = 'c9d27a5e8f10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Должно совпадать с database.partitioning.HASH_PARTITIONS
+PARTITIONS = 16
+BATCH_SIZE = 5000
+LOCK_TIMEOUT = "10s"
+
+TABLES = {
+    'user_game_stats': {
+        'key': 'game_id',
+        'columns': ['high_score', 'games_played', 'stats', 'updated_at'],
+        'foreign_keys': [
+            ('user_id', 'users(id) ON DELETE CASCADE'),
+            ('game_id', 'games(id) ON DELETE CASCADE'),
+        ],
+        'indexes': {
+            'ix_user_game_stats_leaderboard': 'game_id, high_score, user_id',
+            'ix_user_game_stats_updated_at': 'updated_at',
+        },
+    },
+    'user_achievements': {
+        'key': 'achievement_id',
+        'columns': ['achieved', 'progress', 'updated_at'],
+        'foreign_keys': [
+            ('user_id', 'users(id)'),
+            ('achievement_id', 'achievements(id)'),
+        ],
+        'indexes': {
+            'ix_user_achievements_updated_at': 'updated_at',
+        },
+    },
+}
+
+
+def create_copy(table: str, spec: dict, target: str, partitioned: bool) -> None:
+    """Пустая копия table с именем target; имена ключей и индексов с суффиксом target."""
+    key = spec['key']
+    partition_by = ' PARTITION BY HASH (user_id)' if partitioned else ''
+    op.execute(f'CREATE TABLE {target} (LIKE {table} INCLUDING DEFAULTS){partition_by}')
+    if partitioned:
+        for remainder in range(PARTITIONS):
+            op.execute(
+                f'CREATE TABLE {table}_p{remainder} PARTITION OF {target} '
+                f'FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {remainder})'
+            )
+    op.execute(f'ALTER TABLE {target} ADD CONSTRAINT {target}_pkey PRIMARY KEY (user_id, {key})')
+    for column, reference in spec['foreign_keys']:
+        op.execute(
+            f'ALTER TABLE {target} ADD CONSTRAINT {target}_{column}_fkey '
+            f'FOREIGN KEY ({column}) REFERENCES {reference}'
+        )
+    for name, columns in spec['indexes'].items():
+        op.execute(f'CREATE INDEX {name}_{target} ON {target} ({columns})')
+
+
+def take_names(table: str, spec: dict, source: str) -> None:
+    """Переименовывает source в table вместе с ключами и индексами."""
+    op.execute(f'ALTER TABLE {source} RENAME TO {table}')
+    op.execute(f'ALTER TABLE {table} RENAME CONSTRAINT {source}_pkey TO {table}_pkey')
+    for column, _ in spec['foreign_keys']:
+        op.execute(f'ALTER TABLE {table} RENAME CONSTRAINT {source}_{column}_fkey TO {table}_{column}_fkey')
+    for name in spec['indexes']:
+        op.execute(f'ALTER INDEX {name}_{source} RENAME TO {name}')
+
+
+def install_mirror(table: str, spec: dict) -> None:
+    key = spec['key']
+    columns = spec['columns']
+    target_columns = ', '.join(columns)
+    excluded_columns = ', '.join(f'EXCLUDED.{column}' for column in columns)
+    op.execute(f'''
+        CREATE FUNCTION {table}_mirror() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                DELETE FROM {table}_part WHERE user_id = OLD.user_id AND {key} = OLD.{key};
+                RETURN OLD;
+            END IF;
+            IF TG_OP = 'UPDATE' AND (OLD.user_id, OLD.{key}) IS DISTINCT FROM (NEW.user_id, NEW.{key}) THEN
+                DELETE FROM {table}_part WHERE user_id = OLD.user_id AND {key} = OLD.{key};
+            END IF;
+            INSERT INTO {table}_part VALUES (NEW.*)
+            ON CONFLICT (user_id, {key}) DO UPDATE SET ({target_columns}) = ROW({excluded_columns});
+            RETURN NEW;
+        END
+        $$
+    ''')
+    op.execute(
+        f'CREATE TRIGGER {table}_mirror AFTER INSERT OR UPDATE OR DELETE ON {table} '
+        f'FOR EACH ROW EXECUTE FUNCTION {table}_mirror()'
+    )
+
+
+def copy_batches(table: str, spec: dict) -> None:
+    """Копирует строки пачками в порядке (user_id, key); каждая пачка — отдельная транзакция."""
+    key = spec['key']
+    connection = op.get_bind()
+    first = f'SELECT * FROM {table} ORDER BY user_id, {key} LIMIT :size FOR KEY SHARE'
+    rest = (
+        f'SELECT * FROM {table} WHERE (user_id, {key}) > (:user_id, :key) '
+        f'ORDER BY user_id, {key} LIMIT :size FOR KEY SHARE'
+    )
+    params = {'size': BATCH_SIZE}
+    query = first
+    while True:
+        last = connection.execute(text(f'''
+            WITH batch AS ({query}),
+            copied AS (INSERT INTO {table}_part SELECT * FROM batch ON CONFLICT DO NOTHING)
+            SELECT user_id, {key} FROM batch ORDER BY user_id DESC, {key} DESC LIMIT 1
+        '''), params).first()
+        if last is None:
+            return
+        query = rest
+        params = {'size': BATCH_SIZE, 'user_id': last[0], 'key': last[1]}
+
+
+def upgrade() -> None:
+    for table, spec in TABLES.items():
+        create_copy(table, spec, f'{table}_part', partitioned=True)
+        install_mirror(table, spec)
+
+    # Триггеры зафиксированы: все новые записи уже попадают в обе таблицы
+    with op.get_context().autocommit_block():
+        for table, spec in TABLES.items():
+            copy_batches(table, spec)
+
+    op.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+    op.execute(f'LOCK TABLE {", ".join(TABLES)} IN ACCESS EXCLUSIVE MODE')
+    for table, spec in TABLES.items():
+        op.execute(f'DROP TABLE {table}')
+        op.execute(f'DROP FUNCTION {table}_mirror()')
+        take_names(table, spec, f'{table}_part')
+
+
+def downgrade() -> None:
+    for table, spec in TABLES.items():
+        create_copy(table, spec, f'{table}_plain', partitioned=False)
+        op.execute(f'INSERT INTO {table}_plain SELECT * FROM {table}')
+        op.execute(f'DROP TABLE {table}')
+        take_names(table, spec, f'{table}_plain')
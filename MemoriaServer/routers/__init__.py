@@ -1,9 +1,12 @@
 from fastapi import APIRouter
 
-from . import user, achievements, game_stats
+from . import user, achievements, game_stats, health, internal, leaderboard
 
 all_routers = APIRouter(prefix="/api")
 
 all_routers.include_router(user.router)
 all_routers.include_router(achievements.router)
 all_routers.include_router(game_stats.router)
+all_routers.include_router(leaderboard.router)
+all_routers.include_router(internal.router)
+all_routers.include_router(health.router)
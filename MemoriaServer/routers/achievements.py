@@ -1,17 +1,22 @@
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.models import Achievement, User
-from database.session_maker import get_session
+from database.session_maker import get_read_session, get_session
+from database.writes import delete_returning, update_returning
 from schemas.achievements_schemas import (
     AchievementDTO,
     AddAchievementDTO,
     UpdateAchievementDTO
 )
-from utils.auth import get_current_user
+from utils.auth import get_current_user, get_token_user
+from utils.catalog import catalog
+from utils.etag import ConditionalGet
+from utils.pagination import ListParams
+from utils.serialization import fast_response
+from utils.streaming import items_response
 
 router = APIRouter(prefix="/achievement", tags=["Achievements"])
 
@@ -28,41 +33,56 @@ async def create_achievement(
     new_ach = Achievement(
         name=data.name,
         description=data.description,
-        max_progress=data.max_progress
+        max_progress=data.max_progress,
+        game_id=data.game_id,
+        metric=data.metric
     )
     session.add(new_ach)
+    await catalog.bump(session)
     await session.commit()
     await session.refresh(new_ach)
-    return new_ach
+    catalog.invalidate()
+    return fast_response(new_ach, AchievementDTO, status_code=status.HTTP_201_CREATED)
 
 
 @router.get("", response_model=List[AchievementDTO])
 async def list_achievements(
-    session: AsyncSession = Depends(get_session),
-    current_user: User = Depends(get_current_user)  # защита токеном
+    response: Response,
+    params: ListParams = Depends(),
+    conditional: ConditionalGet = Depends(),
+    current_user: User = Depends(get_token_user)  # защита токеном
 ) -> List[AchievementDTO]:
     """
-    Возвращает список всех достижений.
+    Возвращает список достижений в порядке id (из каталога в памяти).
     """
-    stmt = select(Achievement)
-    results = (await session.scalars(stmt)).all()
-    return results
+    snapshot = await catalog.snapshot()
+    # ETag — версия каталога: 304 без обращения к БД
+    not_modified = conditional.check(snapshot.version)
+    if not_modified is not None:
+        return not_modified
+    results = params.slice(snapshot.achievements, Achievement.id)
+    if params.stream:
+        return conditional.apply(items_response(results, AchievementDTO, params.stream))
+    params.set_next_cursor(response, results, Achievement.id)
+    return fast_response(results, AchievementDTO, many=True, response=response)
 
 
 @router.get("/{achievement_id}", response_model=AchievementDTO)
 async def get_achievement(
     achievement_id: int,
-    session: AsyncSession = Depends(get_session),
-    current_user: User = Depends(get_current_user)  # защита токеном
+    session: AsyncSession = Depends(get_read_session),
+    current_user: User = Depends(get_token_user)  # защита токеном
 ) -> AchievementDTO:
     """
     Возвращает достижение по ID или 404, если не найдено.
+    Достижения нет в каталоге процесса — проверяем БД: его могли добавить в другом воркере.
     """
-    stmt = select(Achievement).where(Achievement.id == achievement_id)
-    ach = (await session.scalars(stmt)).first()
+    ach = await catalog.achievement(achievement_id)
+    if ach is None:
+        ach = await session.get(Achievement, achievement_id)
     if not ach:
         raise HTTPException(status_code=404, detail="Achievement not found")
-    return ach
+    return fast_response(ach, AchievementDTO)
 
 
 @router.patch("/{achievement_id}", response_model=AchievementDTO)
@@ -73,23 +93,19 @@ async def update_achievement(
     current_user: User = Depends(get_current_user)  # защита токеном
 ) -> AchievementDTO:
     """
-    Частичное обновление данных достижения (name, description, max_progress).
+    Частичное обновление данных достижения (name, description, max_progress,
+    правило game_id / metric).
     """
-    stmt = select(Achievement).where(Achievement.id == achievement_id)
-    ach = (await session.scalars(stmt)).first()
-    if not ach:
-        raise HTTPException(status_code=404, detail="Achievement not found")
-
-    if update_data.name is not None:
-        ach.name = update_data.name
-    if update_data.description is not None:
-        ach.description = update_data.description
-    if update_data.max_progress is not None:
-        ach.max_progress = update_data.max_progress
-
-    await session.commit()
-    await session.refresh(ach)
-    return ach
+    await catalog.bump(session)
+    ach = await update_returning(
+        session,
+        Achievement,
+        Achievement.id == achievement_id,
+        values=update_data.model_dump(exclude_none=True),
+        detail="Achievement not found"
+    )
+    catalog.invalidate()
+    return fast_response(ach, AchievementDTO)
 
 
 @router.delete("/{achievement_id}")
@@ -101,11 +117,7 @@ async def delete_achievement(
     """
     Удаляет достижение по ID.
     """
-    stmt = select(Achievement).where(Achievement.id == achievement_id)
-    ach = (await session.scalars(stmt)).first()
-    if not ach:
-        raise HTTPException(status_code=404, detail="Achievement not found")
-
-    await session.delete(ach)
-    await session.commit()
+    await catalog.bump(session)
+    await delete_returning(session, Achievement, Achievement.id == achievement_id, detail="Achievement not found")
+    catalog.invalidate()
     return {"detail": "Achievement deleted"}
@@ -1,13 +1,21 @@
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.models import Game, User
-from database.session_maker import get_session
+from database.session_maker import get_read_session, get_session
+from database.writes import delete_returning, update_returning
 from schemas.game_schemas import GameDTO, AddGameDTO, UpdateGameDTO
-from utils.auth import get_current_user
+from utils.auth import get_current_user, get_token_user
+from utils.catalog import catalog
+from utils.etag import ConditionalGet
+from utils.leaderboard import leaderboards
+from utils.pagination import ListParams
+from utils.serialization import fast_response
+from utils.score_histogram import histograms
+from utils.streaming import items_response
 
 router = APIRouter(prefix="/game", tags=["Games"])
 
@@ -31,38 +39,51 @@ async def create_game(
 
     new_game = Game(code=data.code, name=data.name)
     session.add(new_game)
+    await catalog.bump(session)
     await session.commit()
     await session.refresh(new_game)
-    return new_game
+    catalog.invalidate()
+    return fast_response(new_game, GameDTO, status_code=status.HTTP_201_CREATED)
 
 
 @router.get("", response_model=List[GameDTO])
 async def list_games(
-    session: AsyncSession = Depends(get_session),
-    current_user: User = Depends(get_current_user)  # защита токеном
+    response: Response,
+    params: ListParams = Depends(),
+    conditional: ConditionalGet = Depends(),
+    current_user: User = Depends(get_token_user)  # защита токеном
 ) -> List[GameDTO]:
     """
-    Возвращает список всех игр.
+    Возвращает список игр в порядке id (из каталога в памяти).
     """
-    stmt = select(Game)
-    results = (await session.scalars(stmt)).all()
-    return results
+    snapshot = await catalog.snapshot()
+    # ETag — версия каталога: 304 без обращения к БД
+    not_modified = conditional.check(snapshot.version)
+    if not_modified is not None:
+        return not_modified
+    results = params.slice(snapshot.games, Game.id)
+    if params.stream:
+        return conditional.apply(items_response(results, GameDTO, params.stream))
+    params.set_next_cursor(response, results, Game.id)
+    return fast_response(results, GameDTO, many=True, response=response)
 
 
 @router.get("/{game_id}", response_model=GameDTO)
 async def get_game(
     game_id: int,
-    session: AsyncSession = Depends(get_session),
-    current_user: User = Depends(get_current_user)  # защита токеном
+    session: AsyncSession = Depends(get_read_session),
+    current_user: User = Depends(get_token_user)  # защита токеном
 ) -> GameDTO:
     """
     Возвращает игру по ID или 404, если не найдена.
+    Игры нет в каталоге процесса — проверяем БД: её могли добавить в другом воркере.
     """
-    stmt = select(Game).where(Game.id == game_id)
-    game = (await session.scalars(stmt)).first()
+    game = await catalog.game(game_id)
+    if game is None:
+        game = await session.get(Game, game_id)
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
-    return game
+    return fast_response(game, GameDTO)
 
 
 @router.patch("/{game_id}", response_model=GameDTO)
@@ -74,26 +95,19 @@ async def update_game(
 ) -> GameDTO:
     """
     Частичное обновление игры (code, name).
-    Проверка на уникальный code, если меняем.
+    Уникальность code проверяет ограничение в БД.
     """
-    stmt = select(Game).where(Game.id == game_id)
-    game = (await session.scalars(stmt)).first()
-    if not game:
-        raise HTTPException(status_code=404, detail="Game not found")
-
-    if update_data.code is not None:
-        stmt_check = select(Game).where(Game.code == update_data.code, Game.id != game_id)
-        existing = (await session.scalars(stmt_check)).first()
-        if existing:
-            raise HTTPException(status_code=400, detail="Another game with this code already exists")
-        game.code = update_data.code
-
-    if update_data.name is not None:
-        game.name = update_data.name
-
-    await session.commit()
-    await session.refresh(game)
-    return game
+    await catalog.bump(session)
+    game = await update_returning(
+        session,
+        Game,
+        Game.id == game_id,
+        values=update_data.model_dump(exclude_none=True),
+        detail="Game not found",
+        conflict_detail="Another game with this code already exists"
+    )
+    catalog.invalidate()
+    return fast_response(game, GameDTO)
 
 
 @router.delete("/{game_id}")
@@ -105,11 +119,9 @@ async def delete_game(
     """
     Удаляет игру по ID.
     """
-    stmt = select(Game).where(Game.id == game_id)
-    game = (await session.scalars(stmt)).first()
-    if not game:
-        raise HTTPException(status_code=404, detail="Game not found")
-
-    await session.delete(game)
-    await session.commit()
+    await catalog.bump(session)
+    await delete_returning(session, Game, Game.id == game_id, detail="Game not found")
+    catalog.invalidate()
+    leaderboards.drop_game(game_id)
+    histograms.drop_game(game_id)
     return {"detail": "Game deleted"}
@@ -0,0 +1,39 @@
+import asyncio
+
+from fastapi import APIRouter, HTTPException, status
+from sqlalchemy import exc, text
+
+from config import config
+from database.session_maker import engine
+from utils.health import worker_state
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+
+@router.get("/live")
+async def liveness() -> dict:
+    """
+    Процесс жив и event loop отвечает. БД не проверяется: её недоступность
+    не повод перезапускать воркер.
+    """
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+async def readiness() -> dict:
+    """
+    Воркер готов принимать трафик: старт завершён, остановка не началась,
+    primary отвечает на SELECT 1 за HEALTH_DB_TIMEOUT секунд. Иначе 503.
+    """
+    if not worker_state.accepting:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="draining" if worker_state.draining else "starting"
+        )
+    try:
+        async with asyncio.timeout(config.server.health_timeout):
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+    except (TimeoutError, exc.DBAPIError, OSError):
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="database unavailable")
+    return {"status": "ready"}
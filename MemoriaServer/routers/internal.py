@@ -0,0 +1,75 @@
+from dataclasses import asdict
+from datetime import datetime
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+
+from database.engine_profile import pool_status
+from database.export import ExportDataset, copy_export
+from database.session_maker import engine, replicas
+from utils.auth import require_internal_access
+from utils.health import worker_state
+from utils.stat_buffer import stat_buffer
+
+router = APIRouter(
+    prefix="/internal",
+    tags=["Internal"],
+    dependencies=[Depends(require_internal_access)]
+)
+
+
+@router.get("/pool")
+async def get_pool_status() -> dict:
+    """
+    Текущее состояние пулов соединений по движкам (primary и реплики по имени):
+    занятые, overflow, время ожидания.
+    """
+    return {
+        "primary": pool_status(engine),
+        **{replica.name: pool_status(replica.engine) for replica in replicas.replicas}
+    }
+
+
+@router.get("/replicas")
+async def get_replicas_status() -> list[dict]:
+    """
+    Реплики для чтения: здоровье, отставание и последняя ошибка проверки.
+    """
+    return replicas.status()
+
+
+@router.get("/stat-buffer")
+async def get_stat_buffer_status() -> dict:
+    """
+    Write-behind статистики этого воркера: строки в буфере, сбросы, ошибки, потери.
+    """
+    return stat_buffer.status()
+
+
+@router.get("/warmup")
+async def get_warmup_report() -> dict | None:
+    """
+    Итог прогрева этого воркера при старте: длительность, соединения, запросы, ошибка.
+    """
+    return asdict(worker_state.warmup) if worker_state.warmup is not None else None
+
+
+@router.get("/export/{dataset}")
+async def export_dataset(
+        dataset: ExportDataset,
+        format: Literal["ndjson", "csv"] = Query("ndjson"),
+        since: Optional[datetime] = None
+) -> StreamingResponse:
+    """
+    Выгрузка users JOIN user_game_stats (dataset=stats) или users JOIN user_achievements
+    (dataset=achievements) одним COPY ... TO STDOUT. since — только строки,
+    изменённые начиная с этого момента.
+    """
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/csv"
+    filename = f"{dataset}.{format}"
+    return StreamingResponse(
+        copy_export(dataset, format, since),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -0,0 +1,148 @@
+from typing import List, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import Game, User, UserGameStat
+from database.session_maker import get_read_session, read_sessionmaker, replicas
+from schemas.leaderboard_schemas import LeaderboardPageDTO, RankDTO
+from utils.auth import get_token_user
+from utils.leaderboard import TopK, leaderboards
+from utils.pagination import decode_cursor, encode_cursor
+from utils.score_histogram import histograms
+from utils.serialization import FastJSONResponse, fast_response
+
+router = APIRouter(prefix="/leaderboard", tags=["Leaderboard"])
+
+HISTOGRAM_QUERY = (
+    select(UserGameStat.game_id, UserGameStat.high_score, func.count())
+    .where(UserGameStat.high_score > 0)
+    .group_by(UserGameStat.game_id, UserGameStat.high_score)
+)
+
+
+def game_leaderboard_query(game_id: int, limit: int, after: Optional[tuple[int, UUID]] = None):
+    stmt = (
+        select(UserGameStat.user_id, User.name, UserGameStat.high_score)
+        .join(User, User.id == UserGameStat.user_id)
+        .where(UserGameStat.game_id == game_id, UserGameStat.high_score > 0)
+        .order_by(UserGameStat.high_score.desc(), UserGameStat.user_id.desc())
+        .limit(limit)
+    )
+    if after is not None:
+        stmt = stmt.where(tuple_(UserGameStat.high_score, UserGameStat.user_id) < after)
+    return stmt
+
+
+def make_page(rows: list, limit: int) -> FastJSONResponse:
+    """Страница LeaderboardPageDTO сразу в JSON, без промежуточных DTO."""
+    items = [{"user_id": user_id, "name": name, "score": score} for user_id, name, score in rows]
+    next_cursor = None
+    if len(items) == limit:
+        next_cursor = encode_cursor(items[-1]["score"], items[-1]["user_id"])
+    return fast_response({"items": items, "next_cursor": next_cursor})
+
+
+async def load_histograms() -> list:
+    """Строки для пересборки гистограмм; своя сессия — пересборка может идти в фоне после ответа."""
+    async with read_sessionmaker(replicas=replicas, pinned=False) as session:
+        return (await session.execute(HISTOGRAM_QUERY)).all()
+
+
+async def load_board(session: AsyncSession, game_id: int) -> TopK:
+    rows = (await session.execute(game_leaderboard_query(game_id, leaderboards.k))).all()
+    if not rows and await session.get(Game, game_id) is None:
+        raise HTTPException(status_code=404, detail="Game not found")
+    return leaderboards.put(game_id, [tuple(row) for row in rows])
+
+
+@router.get("/game/{game_id}", response_model=LeaderboardPageDTO)
+async def get_game_leaderboard(
+        game_id: int,
+        limit: int = Query(20, ge=1, le=100),
+        cursor: Optional[str] = None,
+        session: AsyncSession = Depends(get_read_session),
+        current_user: User = Depends(get_token_user)
+) -> FastJSONResponse:
+    """
+    Лидерборд игры по high_score с keyset-пагинацией.
+    Первая страница отдаётся из in-memory TopK без запроса к БД
+    (кроме подгрузки имён, изменившихся с момента загрузки доски).
+    """
+    if cursor is None:
+        board = leaderboards.get(game_id) or await load_board(session, game_id)
+        if board.can_serve(limit):
+            rows = board.top(limit)
+            missing = [user_id for user_id, name, _ in rows if name is None]
+            if missing:
+                names = dict((await session.execute(
+                    select(User.id, User.name).where(User.id.in_(missing))
+                )).all())
+                for user_id in missing:
+                    board.set_name(user_id, names.get(user_id))
+                # Пользователь мог быть удалён в другом воркере
+                rows = [row for row in board.top(limit) if row[1] is not None]
+            return make_page(rows, limit)
+        after = None
+    else:
+        after = decode_cursor(cursor, int, UUID)
+
+    rows = (await session.execute(game_leaderboard_query(game_id, limit, after))).all()
+    return make_page(rows, limit)
+
+
+@router.get("/global", response_model=LeaderboardPageDTO)
+async def get_global_leaderboard(
+        limit: int = Query(20, ge=1, le=100),
+        cursor: Optional[str] = None,
+        session: AsyncSession = Depends(get_read_session),
+        current_user: User = Depends(get_token_user)
+) -> FastJSONResponse:
+    """
+    Глобальный лидерборд по experience с keyset-пагинацией.
+    """
+    stmt = (
+        select(User.id, User.name, User.experience)
+        .order_by(User.experience.desc(), User.id.desc())
+        .limit(limit)
+    )
+    if cursor is not None:
+        stmt = stmt.where(tuple_(User.experience, User.id) < decode_cursor(cursor, int, UUID))
+    rows = (await session.execute(stmt)).all()
+    return make_page(rows, limit)
+
+
+@router.get("/rank/{user_id}", response_model=List[RankDTO])
+async def get_user_ranks(
+        user_id: UUID,
+        session: AsyncSession = Depends(get_read_session),
+        current_user: User = Depends(get_token_user)
+) -> FastJSONResponse:
+    """
+    Место и перцентиль пользователя во всех играх, где у него есть счёт.
+    Считается по in-memory гистограммам за O(log n); из БД читаются только
+    счета самого пользователя (и вся статистика при первой сборке гистограмм,
+    устаревшие пересобираются в фоне).
+    """
+    await histograms.ensure(load_histograms)
+
+    stmt = select(UserGameStat.game_id, UserGameStat.high_score).where(
+        UserGameStat.user_id == user_id,
+        UserGameStat.high_score > 0
+    )
+    ranks = []
+    for game_id, high_score in (await session.execute(stmt)).all():
+        estimate = histograms.rank(game_id, high_score)
+        if estimate is None:
+            continue
+        rank, percentile = estimate
+        ranks.append({
+            "game_id": game_id,
+            "high_score": high_score,
+            "rank": rank,
+            "players": histograms.total(game_id),
+            "percentile": round(percentile, 2)
+        })
+    return fast_response(ranks)
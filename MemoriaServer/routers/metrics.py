@@ -0,0 +1,66 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from database.engine_profile import pool_stats
+from database.session_maker import engine, replicas
+from utils.auth import require_internal_access
+from utils.metrics import Counter, Gauge, metrics
+from utils.stat_buffer import stat_buffer
+
+router = APIRouter(tags=["Internal"], dependencies=[Depends(require_internal_access)])
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def pool_metrics() -> list:
+    """
+    Состояние пулов на момент выдачи и накопленные счётчики ожидания соединений,
+    по движку: db — роль (primary / replica, как у метрик выражений), instance —
+    имя движка (URL реплики без пароля).
+    """
+    labels = ("db", "instance")
+    size = Gauge("db_pool_size", "Configured pool size.", labels)
+    checked_out = Gauge("db_pool_checked_out", "Connections in use.", labels)
+    overflow = Gauge("db_pool_overflow", "Connections open above pool size.", labels)
+    checkouts = Counter("db_pool_checkouts_total", "Connection checkouts from the pool.", labels)
+    timeouts = Counter("db_pool_timeouts_total", "Checkouts that timed out waiting for a connection.", labels)
+    wait = Counter("db_pool_wait_seconds_total", "Time spent waiting for a connection.", labels)
+    engines = [
+        ("primary", "primary", engine),
+        *(("replica", replica.name, replica.engine) for replica in replicas.replicas)
+    ]
+    for role, name, current in engines:
+        pool = current.sync_engine.pool
+        stats = pool_stats(current)
+        key = (role, name)
+        size.set(key, pool.size())
+        checked_out.set(key, pool.checkedout())
+        overflow.set(key, max(pool.overflow(), 0))
+        checkouts.inc(key, stats.checkouts)
+        timeouts.inc(key, stats.timeouts)
+        wait.inc(key, stats.wait_total)
+    return [size, checked_out, overflow, checkouts, timeouts, wait]
+
+
+def stat_buffer_metrics() -> list:
+    status = stat_buffer.status()
+    pending = Gauge("stat_buffer_pending_rows", "Results waiting for a write-behind flush.")
+    pending.set((), status["pending"] + status["inflight"])
+    flushed = Counter("stat_buffer_flushed_rows_total", "Rows written by write-behind flushes.")
+    flushed.inc((), status["flushed_rows"])
+    failures = Counter("stat_buffer_flush_failures_total", "Flushes that failed and were retried.")
+    failures.inc((), status["failures"])
+    dropped = Counter("stat_buffer_dropped_rows_total", "Rows dropped because they could not be written.")
+    dropped.inc((), status["dropped_rows"])
+    return [pending, flushed, failures, dropped]
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics() -> PlainTextResponse:
+    """
+    Метрики воркера в текстовом формате Prometheus (utils/metrics.py).
+    """
+    return PlainTextResponse(
+        metrics.render([*pool_metrics(), *stat_buffer_metrics()]),
+        media_type=CONTENT_TYPE
+    )
@@ -1,48 +1,92 @@
-import os
-import uuid
 from typing import List
 from uuid import UUID
 
 from fastapi import (
     APIRouter,
     Depends,
+    BackgroundTasks,
     HTTPException,
-    status,
-    UploadFile,
-    File
+    Request,
+    Response,
+    status
 )
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy import select
+from sqlalchemy import and_, case, delete, func, literal_column, select, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from database.models import (
+    Game,
     User,
     UserAchievement,
     UserGameStat, Achievement
 )
-from database.session_maker import get_session
+from database.onboarding import EMAIL_CONSTRAINT, onboard_user
+from database.profile import profile_statement
+from database.row_versions import rows_version
+from database.session_maker import get_read_session, get_session
+from database.stats_writes import (
+    claim_result_keys,
+    fold_results,
+    result_upsert,
+    with_previous_high_score
+)
+from database.writes import (
+    FOREIGN_KEY_VIOLATION,
+    UNIQUE_VIOLATION,
+    delete_returning,
+    is_violation,
+    update_returning
+)
 from schemas.achievements_schemas import (
     UserAchievementDTO,
     UpdateUserAchievementDTO,
     AddUserAchievementDTO
 )
 from schemas.game_schemas import (
+    GameResultBatchDTO,
+    GameResultDTO,
     UpdateUserGameStatDTO,
     UserGameStatDTO,
     AddUserGameStatDTO
 )
+from schemas.profile_schemas import ProfileDTO
 from schemas.token import Token
 from schemas.user_schemas import (
     UserDTO,
     AddUserDTO,
     UpdateUserDTO
 )
-from utils.auth import create_access_token, get_current_user
-from utils.password_utils import hash_password, verify_password
+from utils.auth import (
+    create_access_token,
+    get_current_user,
+    get_token_user,
+    invalidate_principal
+)
+from utils.avatars import receive_avatar, release_avatar, render_avatar_variants
+from utils.catalog import catalog
+from utils.etag import ConditionalGet
+from utils.leaderboard import leaderboards
+from utils.pagination import ListParams
+from utils.password_utils import hash_password_async, verify_password_async
+from utils.serialization import fast_response
+from utils.stat_buffer import stat_buffer
+from utils.stat_events import StatChange, publish, publish_records
+from utils.streaming import stream_response
 
 router = APIRouter(prefix="/user", tags=["User"])
 
 
+async def user_rows_version(session: AsyncSession, model, key, user_id: UUID) -> tuple:
+    """
+    Версия строк пользователя в user_game_stats / user_achievements
+    (database.row_versions): меняется при любой вставке, изменении и удалении.
+    Читает только строки этого пользователя (одна секция).
+    """
+    stmt = select(rows_version(model, key)).where(model.user_id == user_id)
+    return tuple((await session.execute(stmt)).one())
+
+
 # Вспомогательная функция для генерации токена для заданного пользователя
 async def generate_token_for_user(user: User) -> Token:
     user_data = UserDTO.from_orm(user).dict()
@@ -62,8 +106,13 @@ async def login_user(
     # По умолчанию form_data.username содержит email
     stmt = select(User).where(User.email == form_data.username)
     user = (await session.scalars(stmt)).first()
+    if user is not None:
+        # Отсоединённый объект rollback не сбрасывает, его поля нужны для токена
+        session.expunge(user)
+    # Соединение возвращается в пул на время bcrypt: очередь логинов не держит пул БД
+    await session.rollback()
 
-    if not user or not verify_password(form_data.password, user.password):
+    if not user or not await verify_password_async(form_data.password, user.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Email or password is incorrect"
@@ -82,55 +131,33 @@ async def add_user(
 ) -> Token:
     """
     Создаёт нового пользователя, хеширует пароль и сразу генерирует JWT-токен,
-    что позволяет сразу "залогиниться". При этом создаются статистики по играм и
-    записи достижений для нового пользователя.
-    """
-    # Проверка на существование пользователя с таким email
-    stmt = select(User).where(User.email == user_in.email)
-    existing = (await session.scalars(stmt)).first()
-    if existing:
+    что позволяет сразу "залогиниться". При этом создаются статистики по всем играм
+    каталога и записи всех достижений — одним запросом в одной транзакции.
+    Занятый email проверяется до bcrypt: повторная регистрация не тратит на хэш
+    ~250 мс CPU. Гонку двух одновременных регистраций ловит уникальный индекс.
+    """
+    taken = await session.scalar(select(User.id).where(User.email == user_in.email))
+    # Соединение возвращается в пул на время хэширования
+    await session.rollback()
+    if taken is not None:
+        raise HTTPException(status_code=400, detail="User with this email already exists")
+
+    hashed_pwd = await hash_password_async(user_in.password)
+    try:
+        new_user = await onboard_user(
+            session,
+            name=user_in.name,
+            email=user_in.email,
+            password=hashed_pwd
+        )
+    except IntegrityError as error:
+        if not is_violation(error, UNIQUE_VIOLATION, EMAIL_CONSTRAINT):
+            raise
         raise HTTPException(
             status_code=400,
             detail="User with this email already exists"
         )
 
-    # Хеширование пароля и создание нового пользователя
-    hashed_pwd = hash_password(user_in.password)
-    new_user = User(
-        name=user_in.name,
-        email=user_in.email,
-        password=hashed_pwd
-    )
-    session.add(new_user)
-    await session.commit()
-    await session.refresh(new_user)
-
-    # Создаем статистику для игр (например, для game_id от 1 до 9)
-    for game_id in range(1, 10):
-        new_stat = UserGameStat(
-            user_id=new_user.id,
-            game_id=game_id,
-            high_score=0,
-            games_played=0,
-            stats={}
-        )
-        session.add(new_stat)
-
-    # Создаем записи для достижений пользователя.
-    # Предполагается, что достижения уже есть в таблице Achievement.
-    stmt = select(Achievement)
-    achievements = (await session.scalars(stmt)).all()
-    for achievement in achievements:
-        new_user_achievement = UserAchievement(
-            user_id=new_user.id,
-            achievement_id=achievement.id,
-            achieved=False,
-            progress=0
-        )
-        session.add(new_user_achievement)
-
-    await session.commit()
-
     # Сразу генерируем токен как при логине
     return await generate_token_for_user(new_user)
 
@@ -140,15 +167,20 @@ async def add_user(
 # -----------------------------------------------------
 @router.get("/get", response_model=List[UserDTO])
 async def get_all_users(
-        session: AsyncSession = Depends(get_session),
-        current_user: User = Depends(get_current_user)
+        response: Response,
+        params: ListParams = Depends(),
+        session: AsyncSession = Depends(get_read_session),
+        current_user: User = Depends(get_token_user)
 ) -> List[UserDTO]:
     """
-    Возвращает список всех пользователей.
+    Возвращает список пользователей в порядке id (постранично при limit/cursor).
     """
-    stmt = select(User)
+    stmt = params.apply(select(User), User.id)
+    if params.stream:
+        return stream_response(stmt, UserDTO, params.stream, bind=session.bind)
     users = (await session.scalars(stmt)).all()
-    return [UserDTO.from_orm(u) for u in users]
+    params.set_next_cursor(response, users, User.id)
+    return fast_response(users, UserDTO, many=True, response=response)
 
 
 # -----------------------------------------------------
@@ -157,17 +189,24 @@ async def get_all_users(
 @router.get("/get/{user_id}", response_model=UserDTO)
 async def get_user_by_id(
         user_id: UUID,
-        session: AsyncSession = Depends(get_session),
-        current_user: User = Depends(get_current_user)
+        response: Response,
+        conditional: ConditionalGet = Depends(),
+        session: AsyncSession = Depends(get_read_session),
+        current_user: User = Depends(get_token_user)
 ) -> UserDTO:
     """
     Получить пользователя по ID. Если не найден, 404.
+    ETag — xmin строки (меняется при каждом UPDATE), читается тем же запросом.
     """
-    stmt = select(User).where(User.id == user_id)
-    user = (await session.scalars(stmt)).first()
-    if not user:
+    stmt = select(User, literal_column("users.xmin")).where(User.id == user_id)
+    row = (await session.execute(stmt)).first()
+    if not row:
         raise HTTPException(status_code=404, detail="User not found")
-    return UserDTO.from_orm(user)
+    user, row_version = row
+    not_modified = conditional.check(row_version)
+    if not_modified is not None:
+        return not_modified
+    return fast_response(user, UserDTO, response=response)
 
 
 # -----------------------------------------------------
@@ -183,33 +222,18 @@ async def update_user(
     """
     Частичное обновление пользователя (имя, email, experience).
     """
-    stmt = select(User).where(User.id == user_id)
-    user = (await session.scalars(stmt)).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
+    user = await update_returning(
+        session,
+        User,
+        User.id == user_id,
+        values=update_data.model_dump(exclude_none=True),
+        detail="User not found",
+        conflict_detail="Another user with this email already exists"
+    )
+    invalidate_principal(user_id)
     if update_data.name is not None:
-        user.name = update_data.name
-
-    if update_data.email is not None:
-        check_stmt = select(User).where(
-            User.email == update_data.email,
-            User.id != user_id
-        )
-        duplicate = (await session.scalars(check_stmt)).first()
-        if duplicate:
-            raise HTTPException(
-                status_code=400,
-                detail="Another user with this email already exists"
-            )
-        user.email = update_data.email
-
-    if update_data.experience is not None:
-        user.experience = update_data.experience
-
-    await session.commit()
-    await session.refresh(user)
-    return UserDTO.from_orm(user)
+        leaderboards.forget_name(user_id)
+    return fast_response(user, UserDTO)
 
 
 # -----------------------------------------------------
@@ -222,55 +246,90 @@ async def delete_user(
         current_user: User = Depends(get_current_user)
 ) -> dict:
     """
-    Удалить пользователя по ID.
-    """
-    stmt = select(User).where(User.id == user_id)
-    user = (await session.scalars(stmt)).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    await session.delete(user)
-    await session.commit()
+    Удалить пользователя по ID вместе с его записями достижений и статистики.
+    """
+    # Статистика удаляется явно, а не каскадом: её счета нужно убрать из
+    # гистограмм мест и досок лидербордов процесса
+    removed_stats = (await session.execute(
+        delete(UserGameStat)
+        .where(UserGameStat.user_id == user_id)
+        .returning(UserGameStat.game_id, UserGameStat.high_score)
+    )).all()
+    # Достижения удаляются в CTE того же запроса: FK проверяется в конце команды
+    removed_achievements = (
+        delete(UserAchievement)
+        .where(UserAchievement.user_id == user_id)
+        .cte("removed_achievements")
+    )
+    stmt = (
+        delete(User)
+        .where(User.id == user_id)
+        .returning(User.id)
+        .add_cte(removed_achievements)
+    )
+    await delete_returning(session, User, detail="User not found", stmt=stmt)
+    invalidate_principal(user_id)
+    leaderboards.remove_user(user_id)
+    publish(StatChange(user_id, game_id, None, high_score) for game_id, high_score in removed_stats)
+    stat_buffer.forget_user(user_id)
     return {"detail": "User deleted"}
 
 
 # -----------------------------------------------------
 # 6. Загрузка / обновление аватара (требует токен)
 # -----------------------------------------------------
-AVATAR_DIR = "media/avatars"
-
-
-@router.post("/{user_id}/avatar", response_model=UserDTO)
+@router.post(
+    "/{user_id}/avatar",
+    response_model=UserDTO,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"multipart/form-data": {"schema": {
+                "type": "object",
+                "properties": {"file": {"type": "string", "format": "binary"}},
+                "required": ["file"]
+            }}}
+        }
+    }
+)
 async def upload_user_avatar(
         user_id: UUID,
-        file: UploadFile = File(...),
+        request: Request,
+        background_tasks: BackgroundTasks,
         session: AsyncSession = Depends(get_session),
         current_user: User = Depends(get_current_user)
 ) -> UserDTO:
     """
-    Загрузка или обновление аватара пользователя.
-    """
-    stmt = select(User).where(User.id == user_id)
-    user = (await session.scalars(stmt)).first()
-    if not user:
+    Загрузка или обновление аватара пользователя (multipart, поле file).
+    Тело читается потоком и пишется на диск в потоке (utils.avatars), файл
+    хранится под именем по хэшу содержимого, превью считаются в пуле процессов.
+    avatar_url и avatar_variants меняются одним UPDATE, который возвращает и
+    прежние значения; прежние файлы удаляются после ответа.
+    """
+    avatar_url = await receive_avatar(request)
+    avatar_variants = await render_avatar_variants(avatar_url)
+
+    # Самосоединение в UPDATE ... FROM видит строку до изменения
+    previous = User.__table__.alias("previous")
+    stmt = (
+        update(User)
+        .where(User.id == user_id, previous.c.id == User.id)
+        .values(avatar_url=avatar_url, avatar_variants=avatar_variants)
+        .returning(User, previous.c.avatar_url, previous.c.avatar_variants)
+        .execution_options(synchronize_session=False)
+    )
+    row = (await session.execute(stmt)).first()
+    if row is None:
+        # Файл не удаляем: за REUSE_GRACE его мог переиспользовать другой запрос,
+        # а по тому же хэшу он пригодится при повторной загрузке
         raise HTTPException(status_code=404, detail="User not found")
-
-    ext = os.path.splitext(file.filename)[1]
-    unique_name = f"avatar-{uuid.uuid4()}{ext}"
-    save_path = os.path.join(AVATAR_DIR, unique_name)
-
-    os.makedirs(AVATAR_DIR, exist_ok=True)
-    if user.avatar_url is not None:
-        os.remove(user.avatar_url)
-
-    contents = await file.read()
-    with open(save_path, "wb") as f:
-        f.write(contents)
-
-    user.avatar_url = f"media/avatars/{unique_name}"
     await session.commit()
-    await session.refresh(user)
-    return UserDTO.from_orm(user)
+    user, previous_url, previous_variants = row
+
+    invalidate_principal(user_id)
+    if previous_url != avatar_url:
+        background_tasks.add_task(release_avatar, previous_url, previous_variants)
+    return fast_response(user, UserDTO)
 
 
 # -----------------------------------------------------
@@ -279,23 +338,35 @@ async def upload_user_avatar(
 @router.get("/{user_id}/achievements", response_model=List[UserAchievementDTO])
 async def list_user_achievements(
         user_id: UUID,
-        session: AsyncSession = Depends(get_session),
-        current_user: User = Depends(get_current_user)
+        response: Response,
+        params: ListParams = Depends(),
+        conditional: ConditionalGet = Depends(),
+        session: AsyncSession = Depends(get_read_session),
+        current_user: User = Depends(get_token_user)
 ) -> List[UserAchievementDTO]:
     """
-    Возвращает список всех достижений для данного пользователя.
+    Возвращает список достижений пользователя в порядке achievement_id.
     """
-    stmt = select(UserAchievement).where(UserAchievement.user_id == user_id)
+    stmt = params.apply(
+        select(UserAchievement).where(UserAchievement.user_id == user_id),
+        UserAchievement.achievement_id
+    )
+    not_modified = conditional.check(*await user_rows_version(session, UserAchievement, UserAchievement.achievement_id, user_id))
+    if not_modified is not None:
+        return not_modified
+    if params.stream:
+        return conditional.apply(stream_response(stmt, UserAchievementDTO, params.stream, bind=session.bind))
     records = (await session.scalars(stmt)).all()
-    return records
+    params.set_next_cursor(response, records, UserAchievement.achievement_id)
+    return fast_response(records, UserAchievementDTO, many=True, response=response)
 
 
 @router.get("/{user_id}/achievements/{achievement_id}", response_model=UserAchievementDTO)
 async def get_user_achievement(
         user_id: UUID,
         achievement_id: int,
-        session: AsyncSession = Depends(get_session),
-        current_user: User = Depends(get_current_user)
+        session: AsyncSession = Depends(get_read_session),
+        current_user: User = Depends(get_token_user)
 ) -> UserAchievementDTO:
     """
     Возвращает одну запись user_achievement по ключам (user_id, achievement_id).
@@ -307,7 +378,7 @@ async def get_user_achievement(
     record = (await session.scalars(stmt)).first()
     if not record:
         raise HTTPException(status_code=404, detail="UserAchievement not found")
-    return record
+    return fast_response(record, UserAchievementDTO)
 
 
 @router.post("/{user_id}/achievements", response_model=UserAchievementDTO, status_code=status.HTTP_201_CREATED)
@@ -337,7 +408,7 @@ async def create_user_achievement(
     session.add(new_record)
     await session.commit()
     await session.refresh(new_record)
-    return new_record
+    return fast_response(new_record, UserAchievementDTO, status_code=status.HTTP_201_CREATED)
 
 
 @router.patch("/{user_id}/achievements/{achievement_id}", response_model=UserAchievementDTO)
@@ -350,37 +421,49 @@ async def update_user_achievement(
 ) -> UserAchievementDTO:
     """
     Частично обновляет запись user_achievement (achieved, progress).
+    Нужен для достижений без правила: с правилом прогресс считает сервер
+    при записи статистики.
     Автоматически устанавливает achieved, если progress достигает max_progress.
+    Всё делается одним UPDATE: max_progress берётся из каталога в памяти,
+    а если достижения там нет (добавлено в другом воркере) — подзапросом.
     """
-    stmt = select(UserAchievement).where(
-        UserAchievement.user_id == user_id,
-        UserAchievement.achievement_id == achievement_id
-    )
-    record = (await session.scalars(stmt)).first()
-    if not record:
-        raise HTTPException(status_code=404, detail="UserAchievement not found")
-
-    # Если приходит обновление прогресса, проверяем его значение
+    values = {}
     if update_data.progress is not None:
         new_progress = update_data.progress
-        # Получаем данные о достижении из таблицы Achievement
-        achievement_stmt = select(Achievement).where(Achievement.id == achievement_id)
-        achievement_record = (await session.scalars(achievement_stmt)).first()
-        if achievement_record:
-            if new_progress >= achievement_record.max_progress:
-                # Если прогресс достиг максимума, устанавливаем achieved и фиксируем значение
-                record.progress = achievement_record.max_progress
-                record.achieved = True
-            else:
-                record.progress = new_progress
-
-    # Если явно передается поле achieved, его можно обработать, но основная логика определяется прогрессом
+        achievement = await catalog.achievement(achievement_id)
+        if achievement is not None:
+            values["progress"] = min(new_progress, achievement.max_progress)
+            if achievement.max_progress <= new_progress:
+                values["achieved"] = True
+        else:
+            max_progress = (
+                select(Achievement.max_progress)
+                .where(Achievement.id == achievement_id)
+                .scalar_subquery()
+            )
+            # Если достижения нет и в БД, прогресс не меняем (как и раньше)
+            values["progress"] = case(
+                (max_progress.is_(None), UserAchievement.progress),
+                else_=func.least(new_progress, max_progress)
+            )
+            values["achieved"] = case(
+                (max_progress <= new_progress, True),
+                else_=UserAchievement.achieved
+            )
+
+    # Явно переданное achieved имеет приоритет над вычисленным по прогрессу
     if update_data.achieved is not None:
-        record.achieved = update_data.achieved
+        values["achieved"] = update_data.achieved
 
-    await session.commit()
-    await session.refresh(record)
-    return record
+    record = await update_returning(
+        session,
+        UserAchievement,
+        UserAchievement.user_id == user_id,
+        UserAchievement.achievement_id == achievement_id,
+        values=values,
+        detail="UserAchievement not found"
+    )
+    return fast_response(record, UserAchievementDTO)
 
 
 @router.delete("/{user_id}/achievements/{achievement_id}")
@@ -393,16 +476,13 @@ async def delete_user_achievement(
     """
     Удаляет запись user_achievement.
     """
-    stmt = select(UserAchievement).where(
+    await delete_returning(
+        session,
+        UserAchievement,
         UserAchievement.user_id == user_id,
-        UserAchievement.achievement_id == achievement_id
+        UserAchievement.achievement_id == achievement_id,
+        detail="UserAchievement not found"
     )
-    record = (await session.scalars(stmt)).first()
-    if not record:
-        raise HTTPException(status_code=404, detail="UserAchievement not found")
-
-    await session.delete(record)
-    await session.commit()
     return {"detail": "UserAchievement deleted"}
 
 
@@ -412,23 +492,46 @@ async def delete_user_achievement(
 @router.get("/{user_id}/stats", response_model=List[UserGameStatDTO])
 async def list_user_stats(
         user_id: UUID,
-        session: AsyncSession = Depends(get_session),
-        current_user: User = Depends(get_current_user)
+        response: Response,
+        params: ListParams = Depends(),
+        conditional: ConditionalGet = Depends(),
+        session: AsyncSession = Depends(get_read_session),
+        current_user: User = Depends(get_token_user)
 ) -> List[UserGameStatDTO]:
     """
-    Возвращает список статистики для пользователя.
+    Возвращает список статистики для пользователя в порядке game_id.
+    Несброшенные результаты (utils.stat_buffer) накладываются на страницу, в том
+    числе по играм, строк которых ещё нет в БД. Потоковая выдача дельт не
+    накладывает: буфер пользователя сначала сбрасывается, а строки читаются из primary.
     """
-    stmt = select(UserGameStat).where(UserGameStat.user_id == user_id)
+    stmt = params.apply(
+        select(UserGameStat).where(UserGameStat.user_id == user_id),
+        UserGameStat.game_id
+    )
+    bind = session.bind
+    if params.stream and stat_buffer.has_pending(user_id):
+        await stat_buffer.drain_user(user_id)
+        bind = None
+    not_modified = conditional.check(
+        *await user_rows_version(session, UserGameStat, UserGameStat.game_id, user_id),
+        *stat_buffer.version(user_id)
+    )
+    if not_modified is not None:
+        return not_modified
+    if params.stream:
+        return conditional.apply(stream_response(stmt, UserGameStatDTO, params.stream, bind=bind))
     records = (await session.scalars(stmt)).all()
-    return records
+    params.set_next_cursor(response, records, UserGameStat.game_id)
+    records = stat_buffer.merge_many(user_id, records, params.covers(records, UserGameStat.game_id))
+    return fast_response(records, UserGameStatDTO, many=True, response=response)
 
 
 @router.get("/{user_id}/stats/{game_id}", response_model=UserGameStatDTO)
 async def get_user_stat_for_game(
         user_id: UUID,
         game_id: int,
-        session: AsyncSession = Depends(get_session),
-        current_user: User = Depends(get_current_user)
+        session: AsyncSession = Depends(get_read_session),
+        current_user: User = Depends(get_token_user)
 ) -> UserGameStatDTO:
     """
     Получить статистику для конкретной игры.
@@ -437,10 +540,10 @@ async def get_user_stat_for_game(
         UserGameStat.user_id == user_id,
         UserGameStat.game_id == game_id
     )
-    record = (await session.scalars(stmt)).first()
+    record = stat_buffer.merge(user_id, game_id, (await session.scalars(stmt)).first())
     if not record:
         raise HTTPException(status_code=404, detail="UserGameStat not found")
-    return record
+    return fast_response(record, UserGameStatDTO)
 
 
 @router.post("/{user_id}/stats", response_model=UserGameStatDTO, status_code=status.HTTP_201_CREATED)
@@ -453,6 +556,7 @@ async def create_user_stat(
     """
     Создаёт новую запись user_game_stats.
     """
+    await stat_buffer.drain(user_id, data.game_id)
     stmt_check = select(UserGameStat).where(
         UserGameStat.user_id == user_id,
         UserGameStat.game_id == data.game_id
@@ -470,7 +574,122 @@ async def create_user_stat(
     session.add(new_record)
     await session.commit()
     await session.refresh(new_record)
-    return new_record
+    publish_records([(new_record, None)])
+    return fast_response(new_record, UserGameStatDTO, status_code=status.HTTP_201_CREATED)
+
+
+@router.post("/{user_id}/stats/{game_id}/result", response_model=UserGameStatDTO)
+async def submit_game_result(
+        user_id: UUID,
+        game_id: int,
+        result: GameResultDTO,
+        session: AsyncSession = Depends(get_session),
+        current_user: User = Depends(get_current_user)
+) -> UserGameStatDTO:
+    """
+    Принимает результат партии: games_played увеличивается на 1,
+    high_score = GREATEST(high_score, score), метрики сливаются в stats.
+    Один INSERT ... ON CONFLICT DO UPDATE ... RETURNING, запись создаётся при отсутствии.
+    Достижения с правилами по этой игре пересчитываются в том же запросе.
+
+    При STAT_WRITE_BEHIND результат копится в utils.stat_buffer и пишется пачкой;
+    ответ — строка из БД с наложенными несброшенными результатами.
+    """
+    if stat_buffer.enabled:
+        return await buffer_game_result(session, user_id, game_id, result)
+    stmt = with_previous_high_score(result_upsert([{
+        "user_id": user_id,
+        "game_id": game_id,
+        "high_score": result.score,
+        "games_played": 1,
+        "stats": result.stats
+    }]), [(user_id, game_id)], achievements=True)
+    try:
+        row = (await session.execute(stmt)).one()
+    except IntegrityError as error:
+        if not is_violation(error, FOREIGN_KEY_VIOLATION):
+            raise
+        raise HTTPException(status_code=404, detail="User or game not found")
+    await session.commit()
+    publish_records([row])
+    return fast_response(row[0], UserGameStatDTO)
+
+
+async def buffer_game_result(
+        session: AsyncSession,
+        user_id: UUID,
+        game_id: int,
+        result: GameResultDTO
+) -> Response:
+    # Пользователь и текущая строка — одним запросом; в буфер не попадает то, что не запишется
+    row = (await session.execute(
+        select(User.id, UserGameStat)
+        .outerjoin(UserGameStat, and_(UserGameStat.user_id == User.id, UserGameStat.game_id == game_id))
+        .where(User.id == user_id)
+    )).first()
+    # Игра созданная в другом воркере может ещё не попасть в каталог — тогда спрашиваем БД
+    if row is None or (await catalog.game(game_id) is None and await session.get(Game, game_id) is None):
+        raise HTTPException(status_code=404, detail="User or game not found")
+    await stat_buffer.add(user_id, game_id, result.score, result.stats)
+    return fast_response(stat_buffer.merge(user_id, game_id, row[1]), UserGameStatDTO)
+
+
+@router.post("/{user_id}/stats/batch", response_model=List[UserGameStatDTO])
+async def submit_game_results(
+        user_id: UUID,
+        batch: GameResultBatchDTO,
+        session: AsyncSession = Depends(get_session),
+        current_user: User = Depends(get_current_user)
+) -> List[UserGameStatDTO]:
+    """
+    Принимает пакет результатов по разным играм (например, накопленных офлайн).
+    Результаты сворачиваются по игре и применяются одним многострочным upsert.
+    Результаты с уже виденным idempotency_key пропускаются (upsert без них, а если
+    новых нет — без upsert). Ответ — текущие строки всех игр пакета, в том числе
+    игр, все результаты которых оказались повтором. Достижения с правилами по
+    всем играм пакета пересчитываются тем же запросом.
+    """
+    results = batch.results
+    game_ids = {r.game_id for r in results}
+    keys = list(dict.fromkeys(r.idempotency_key for r in results if r.idempotency_key))
+    try:
+        if keys:
+            fresh = set((await session.scalars(claim_result_keys(user_id, keys))).all())
+            seen = set()
+            accepted = []
+            for r in results:
+                if r.idempotency_key is not None:
+                    if r.idempotency_key not in fresh or r.idempotency_key in seen:
+                        continue
+                    seen.add(r.idempotency_key)
+                accepted.append(r)
+            results = accepted
+
+        rows = []
+        if results:
+            folded = fold_results(user_id, results)
+            stmt = with_previous_high_score(
+                result_upsert(folded),
+                [(row["user_id"], row["game_id"]) for row in folded],
+                achievements=True
+            )
+            rows = (await session.execute(stmt)).all()
+    except IntegrityError as error:
+        # Нет пользователя (FK ключей и статистики) или игры; остальное — не 404
+        if not is_violation(error, FOREIGN_KEY_VIOLATION):
+            raise
+        raise HTTPException(status_code=404, detail="User or game not found")
+    records = [record for record, _ in rows]
+    # Игры, по которым пришли только повторы: отдаём их строки как есть
+    replayed = game_ids - {record.game_id for record in records}
+    if replayed:
+        records.extend((await session.scalars(
+            select(UserGameStat).where(UserGameStat.user_id == user_id, UserGameStat.game_id.in_(replayed))
+        )).all())
+    await session.commit()
+    publish_records(rows)
+    records.sort(key=lambda record: record.game_id)
+    return fast_response(stat_buffer.merge_many(user_id, records, game_ids.__contains__), UserGameStatDTO, many=True)
 
 
 @router.patch("/{user_id}/stats/{game_id}", response_model=UserGameStatDTO)
@@ -483,23 +702,35 @@ async def update_user_stat(
 ) -> UserGameStatDTO:
     """
     Частично обновляет статистику (high_score, games_played).
-    """
-    stmt = select(UserGameStat).where(
-        UserGameStat.user_id == user_id,
-        UserGameStat.game_id == game_id
+    Достижения с правилами по игре пересчитываются тем же запросом.
+    """
+    # Абсолютные значения пишутся поверх уже сброшенных результатов партий
+    await stat_buffer.drain(user_id, game_id)
+    values = update_data.model_dump(exclude_none=True)
+    if not values:
+        record = await update_returning(
+            session,
+            UserGameStat,
+            UserGameStat.user_id == user_id,
+            UserGameStat.game_id == game_id,
+            values=values,
+            detail="UserGameStat not found"
+        )
+        return fast_response(record, UserGameStatDTO)
+
+    stmt = with_previous_high_score(
+        update(UserGameStat)
+        .where(UserGameStat.user_id == user_id, UserGameStat.game_id == game_id)
+        .values(**values),
+        [(user_id, game_id)],
+        achievements=True
     )
-    record = (await session.scalars(stmt)).first()
-    if not record:
+    row = (await session.execute(stmt)).first()
+    if row is None:
         raise HTTPException(status_code=404, detail="UserGameStat not found")
-
-    if update_data.high_score is not None:
-        record.high_score = update_data.high_score
-    if update_data.games_played is not None:
-        record.games_played = update_data.games_played
-
     await session.commit()
-    await session.refresh(record)
-    return record
+    publish_records([row])
+    return fast_response(row[0], UserGameStatDTO)
 
 
 @router.delete("/{user_id}/stats/{game_id}")
@@ -512,14 +743,44 @@ async def delete_user_stat(
     """
     Удаляет запись user_game_stats.
     """
-    stmt = select(UserGameStat).where(
-        UserGameStat.user_id == user_id,
-        UserGameStat.game_id == game_id
+    await stat_buffer.drain(user_id, game_id)
+    deleted = await delete_returning(
+        session,
+        UserGameStat,
+        detail="UserGameStat not found",
+        stmt=delete(UserGameStat)
+        .where(UserGameStat.user_id == user_id, UserGameStat.game_id == game_id)
+        .returning(UserGameStat.high_score)
     )
-    record = (await session.scalars(stmt)).first()
-    if not record:
-        raise HTTPException(status_code=404, detail="UserGameStat not found")
-
-    await session.delete(record)
-    await session.commit()
+    publish([StatChange(user_id, game_id, None, deleted.high_score)])
     return {"detail": "UserGameStat deleted"}
+
+
+# -----------------------------------------------------
+# 9. Профиль целиком (требует токен)
+# -----------------------------------------------------
+@router.get("/{user_id}/profile", response_model=ProfileDTO)
+async def get_user_profile(
+        user_id: UUID,
+        response: Response,
+        conditional: ConditionalGet = Depends(),
+        session: AsyncSession = Depends(get_read_session),
+        current_user: User = Depends(get_token_user)
+) -> ProfileDTO:
+    """
+    Экран профиля одним запросом вместо трёх (пользователь, статистика, достижения).
+    Документ собирается в Postgres (database/profile.py) и отдаётся как есть.
+    ETag — xmin пользователя, версии его статистики и достижений и версия каталога
+    (документ включает код и название игр и данные достижений), читаются тем же запросом.
+    """
+    row = (await session.execute(profile_statement(user_id))).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="User not found")
+    document, *version = row
+    not_modified = conditional.check(*version, *stat_buffer.version(user_id))
+    if not_modified is not None:
+        return not_modified
+    document = document.encode()
+    if stat_buffer.has_pending(user_id):
+        document = stat_buffer.merge_profile(user_id, document, (await catalog.snapshot()).games_by_id)
+    return fast_response(document, response=response)
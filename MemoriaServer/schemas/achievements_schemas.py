@@ -1,16 +1,24 @@
-from typing import Optional
+from typing import Literal, Optional
 from uuid import UUID
 
 from pydantic import BaseModel
 
+# Показатели статистики игры, по которым сервер считает прогресс достижения
+RuleMetric = Literal["games_played", "high_score"]
+
 
 class AddAchievementDTO(BaseModel):
     """
     DTO для создания нового достижения.
+    game_id + metric — правило: прогресс равен metric статистики игры game_id
+    (например, "сыграть 10 раз" или "набрать 500 очков"), цель — max_progress.
+    Правило действует, только если заданы оба поля; иначе прогресс передаёт клиент.
     """
     name: str
     description: str
     max_progress: int
+    game_id: Optional[int] = None
+    metric: Optional[RuleMetric] = None
 
 
 class AchievementDTO(AddAchievementDTO):
@@ -31,6 +39,8 @@ class UpdateAchievementDTO(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
     max_progress: Optional[int] = None
+    game_id: Optional[int] = None
+    metric: Optional[RuleMetric] = None
 
 
 class AddUserAchievementDTO(BaseModel):
@@ -1,7 +1,7 @@
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from uuid import UUID
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class AddGameDTO(BaseModel):
@@ -58,3 +58,27 @@ class UpdateUserGameStatDTO(BaseModel):
     """
     high_score: Optional[int] = None
     games_played: Optional[int] = None
+
+
+class GameResultDTO(BaseModel):
+    """
+    Результат одной сыгранной партии.
+    stats — метрики партии, сливаются в UserGameStat.stats поверх прежних.
+    """
+    score: int
+    stats: Dict[str, Any] = Field(default_factory=dict)
+
+
+class GameResultItemDTO(GameResultDTO):
+    """
+    Результат партии в пакете. idempotency_key делает повторную отправку безопасной.
+    """
+    game_id: int
+    idempotency_key: Optional[str] = Field(default=None, max_length=64)
+
+
+class GameResultBatchDTO(BaseModel):
+    """
+    Пакет результатов (например, сыгранных офлайн) по любым играм.
+    """
+    results: List[GameResultItemDTO] = Field(max_length=1000)
@@ -0,0 +1,34 @@
+from typing import List, Optional
+from uuid import UUID
+
+from pydantic import BaseModel
+
+
+class LeaderboardEntryDTO(BaseModel):
+    """
+    Строка лидерборда: игрок и его счёт (high_score или experience).
+    """
+    user_id: UUID
+    name: str
+    score: int
+
+
+class LeaderboardPageDTO(BaseModel):
+    """
+    Страница лидерборда. next_cursor передаётся в следующий запрос, None — конец.
+    """
+    items: List[LeaderboardEntryDTO]
+    next_cursor: Optional[str] = None
+
+
+class RankDTO(BaseModel):
+    """
+    Место игрока в игре по гистограмме счёта (оценка, см. utils/score_histogram).
+    rank у равных счетов один и тот же; percentile — доля остальных игроков
+    со счётом не выше, в процентах.
+    """
+    game_id: int
+    high_score: int
+    rank: int
+    players: int
+    percentile: float
@@ -0,0 +1,35 @@
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from schemas.achievements_schemas import RuleMetric, UserAchievementDTO
+from schemas.game_schemas import UserGameStatDTO
+from schemas.user_schemas import UserDTO
+
+
+class ProfileStatDTO(UserGameStatDTO):
+    """
+    Статистика по игре в профиле: с кодом и названием игры.
+    """
+    game_code: str
+    game_name: str
+
+
+class ProfileAchievementDTO(UserAchievementDTO):
+    """
+    Достижение пользователя в профиле: с данными достижения из каталога.
+    """
+    name: str
+    description: str
+    max_progress: int
+    game_id: Optional[int] = None
+    metric: Optional[RuleMetric] = None
+
+
+class ProfileDTO(BaseModel):
+    """
+    Экран профиля одним ответом: пользователь, статистика по всем играм и все достижения.
+    """
+    user: UserDTO
+    stats: List[ProfileStatDTO]
+    achievements: List[ProfileAchievementDTO]
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, Optional
 from uuid import UUID
 
 from pydantic import BaseModel, EmailStr
@@ -24,6 +24,8 @@ class UserDTO(BaseModel):
     experience: int
     email: EmailStr
     avatar_url: Optional[str] = None  # путь к картинке (если есть)
+    # Превью по размеру и формату: {"80": {"webp": "media/avatars/...", "jpeg": ...}}
+    avatar_variants: Optional[Dict[str, Dict[str, str]]] = None
 
     class Config:
         # Pydantic v2 вариант
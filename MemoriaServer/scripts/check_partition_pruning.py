@@ -0,0 +1,105 @@
+"""
+Проверка, что запросы одного пользователя из routers/user.py читают одну секцию
+user_game_stats / user_achievements.
+
+Для каждого запроса выполняется EXPLAIN (без ANALYZE — данные не меняются) через
+asyncpg с теми же параметрами, что и в маршруте, и из плана собираются имена
+секций. Работает с базой из .env после миграции e4b81f2c7a93.
+Запуск из каталога MemoriaServer:
+
+    python -m scripts.check_partition_pruning
+"""
+import asyncio
+import json
+import sys
+import uuid
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql
+
+from database.models import User, UserAchievement, UserGameStat
+from database.partitioning import PARTITION_NAME
+from database.session_maker import engine
+from database.stats_writes import result_upsert, with_previous_high_score
+
+
+def statements(user_id: uuid.UUID) -> dict:
+    game_id = achievement_id = 1
+    stat_row = {"user_id": user_id, "game_id": game_id, "high_score": 1, "games_played": 1, "stats": {}}
+    return {
+        "list_user_stats": select(UserGameStat)
+        .where(UserGameStat.user_id == user_id)
+        .order_by(UserGameStat.game_id)
+        .limit(50),
+        "get_user_stat_for_game": select(UserGameStat).where(
+            UserGameStat.user_id == user_id, UserGameStat.game_id == game_id
+        ),
+        "update_user_stat": with_previous_high_score(
+            update(UserGameStat)
+            .where(UserGameStat.user_id == user_id, UserGameStat.game_id == game_id)
+            .values(high_score=1),
+            [(user_id, game_id)],
+            achievements=True
+        ),
+        "submit_game_result": with_previous_high_score(
+            result_upsert([stat_row]), [(user_id, game_id)], achievements=True
+        ),
+        "delete_user_stat": delete(UserGameStat)
+        .where(UserGameStat.user_id == user_id, UserGameStat.game_id == game_id)
+        .returning(UserGameStat.high_score),
+        "list_user_achievements": select(UserAchievement)
+        .where(UserAchievement.user_id == user_id)
+        .order_by(UserAchievement.achievement_id)
+        .limit(50),
+        "get_user_achievement": select(UserAchievement).where(
+            UserAchievement.user_id == user_id, UserAchievement.achievement_id == achievement_id
+        ),
+        "update_user_achievement": update(UserAchievement)
+        .where(UserAchievement.user_id == user_id, UserAchievement.achievement_id == achievement_id)
+        .values(progress=1)
+        .returning(UserAchievement),
+        "delete_user": delete(User)
+        .where(User.id == user_id)
+        .returning(User.id)
+        .add_cte(delete(UserAchievement).where(UserAchievement.user_id == user_id).cte("removed_achievements")),
+    }
+
+
+def scanned_partitions(plan: dict) -> dict[str, set[str]]:
+    """Секции из плана, сгруппированные по родительской таблице."""
+    found: dict[str, set[str]] = {}
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        match = PARTITION_NAME.match(node.get("Relation Name", ""))
+        if match is not None:
+            found.setdefault(match["table"], set()).add(node["Relation Name"])
+        stack.extend(node.get("Plans", []))
+    return found
+
+
+async def main() -> int:
+    failed = 0
+    async with engine.connect() as conn:
+        raw = (await conn.get_raw_connection()).driver_connection
+        for name, stmt in statements(uuid.uuid4()).items():
+            compiled = stmt.compile(dialect=postgresql.asyncpg.dialect())
+            args = [compiled.params[key] for key in compiled.positiontup or ()]
+            # Параметры JSON asyncpg принимает строкой
+            args = [json.dumps(arg) if isinstance(arg, dict) else arg for arg in args]
+            explain = await raw.fetchval(f"EXPLAIN (FORMAT JSON) {compiled}", *args)
+            # Кодек json, который ставит SQLAlchemy, уже разбирает ответ; без него это строка
+            if isinstance(explain, str):
+                explain = json.loads(explain)
+            plan = explain[0]["Plan"]
+            partitions = scanned_partitions(plan)
+            ok = all(len(names) == 1 for names in partitions.values())
+            failed += not ok
+            summary = ", ".join(f"{table}: {len(names)}" for table, names in sorted(partitions.items()))
+            print(f"{'OK  ' if ok else 'FAIL'} {name:<26} {summary or 'секции не найдены'}")
+    await engine.dispose()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,42 @@
+"""
+Выгрузка для аналитики напрямую из БД (без HTTP), тем же COPY, что и /internal/export.
+
+Работает с базой из .env. Запуск из каталога MemoriaServer:
+
+    python -m scripts.export stats --format csv --output stats.csv
+    python -m scripts.export achievements --since 2026-10-01T00:00:00+00:00 > achievements.ndjson
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime
+
+from database.export import copy_export
+from database.session_maker import engine
+
+
+async def main(args: argparse.Namespace) -> None:
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    written = 0
+    started = time.perf_counter()
+    try:
+        async for chunk in copy_export(args.dataset, args.format, args.since):
+            output.write(chunk)
+            written += len(chunk)
+    finally:
+        if args.output:
+            output.close()
+        await engine.dispose()
+    elapsed = time.perf_counter() - started
+    print(f"{args.dataset}: {written / 1024 / 1024:.1f} MiB за {elapsed:.2f} с", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Выгрузка статистики и достижений пользователей")
+    parser.add_argument("dataset", choices=["stats", "achievements"])
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None,
+                        help="только строки, изменённые начиная с этого момента (ISO 8601)")
+    parser.add_argument("--output", default=None, help="файл вместо stdout")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,189 @@
+"""
+Запуск в продакшене (в Docker — CMD образа):
+
+    python serve.py
+
+Мастер-процесс открывает сокет SERVER_HOST:SERVER_PORT и делает fork
+SERVER_WORKERS воркеров uvicorn (uvloop + httptools), которые принимают
+соединения с общего сокета. При SERVER_PRELOAD приложение импортируется в мастере
+до fork: модели, схемы и маршруты собираются один раз, воркеры стартуют сразу
+с lifespan и делят страницы памяти с мастером. Пул БД до fork не открывается —
+соединения у каждого воркера свои (lifespan). Упавший воркер перезапускается;
+после аварийного выхода — с паузой, которая удваивается при каждом следующем
+падении подряд (от RESPAWN_DELAY до RESPAWN_DELAY_MAX) и сбрасывается, если
+воркер проработал RESPAWN_RESET секунд. Иначе воркер, падающий на старте или
+сразу после него, перезапускался бы в цикле без остановки.
+
+Остановка (SIGTERM или SIGINT мастеру):
+1. мастер пересылает SIGTERM воркерам;
+2. воркер SERVER_DRAIN_DELAY секунд отвечает 503 на /api/health/ready, продолжая
+   обслуживать запросы, — балансировщик выводит его из ротации;
+3. воркер закрывает сокет и ждёт начатые запросы до SERVER_GRACEFUL_TIMEOUT секунд;
+4. lifespan: сброс буфера статистики, остановка фоновых задач, dispose пулов БД.
+Воркеры, не завершившиеся к сроку, мастер добивает SIGKILL.
+
+Для разработки по-прежнему подходит uvicorn main:app --reload.
+"""
+import logging
+import os
+import signal
+import sys
+import time
+from typing import Optional
+
+import uvicorn
+
+from config import ServerConfig, config
+from utils.health import worker_state
+
+# Логгер uvicorn: его формат и уровень настраивает uvicorn.Config, как и у воркеров
+logger = logging.getLogger("uvicorn.error")
+
+HANDLED_SIGNALS = (signal.SIGINT, signal.SIGTERM)
+# Код выхода uvicorn, если lifespan не стартовал (например, БД недоступна)
+STARTUP_FAILURE = 3
+# Пауза перед перезапуском после аварийного выхода: удваивается с каждым падением подряд
+RESPAWN_DELAY = 1.0
+RESPAWN_DELAY_MAX = 30.0
+# Воркер, проработавший столько секунд, упал не в цикле падений: пауза начинается заново
+RESPAWN_RESET = 60.0
+
+
+class DrainingServer(uvicorn.Server):
+    """
+    uvicorn.Server, который по первому сигналу не закрывает сокет сразу, а
+    drain_delay секунд продолжает работать с readiness = 503. Повторный
+    сигнал завершает ожидание.
+    """
+
+    def __init__(self, server_config: uvicorn.Config, drain_delay: float):
+        super().__init__(server_config)
+        self.drain_delay = drain_delay
+        self._drain_deadline: Optional[float] = None
+
+    def handle_exit(self, sig, frame) -> None:
+        worker_state.start_draining()
+        if self._drain_deadline is None and self.drain_delay > 0:
+            self._drain_deadline = time.monotonic() + self.drain_delay
+            return
+        super().handle_exit(sig, frame)
+
+    async def on_tick(self, counter: int) -> bool:
+        if self._drain_deadline is not None and time.monotonic() >= self._drain_deadline:
+            self.should_exit = True
+        return await super().on_tick(counter)
+
+
+class Supervisor:
+    """Мастер-процесс: общий сокет, fork воркеров, перезапуск и остановка."""
+
+    def __init__(self, settings: ServerConfig):
+        self.settings = settings
+        if settings.preload:
+            from main import app
+        else:
+            app = "main:app"
+        self.uvicorn_config = uvicorn.Config(
+            app,
+            host=settings.host,
+            port=settings.port,
+            loop="uvloop",
+            http="httptools",
+            lifespan="on",
+            backlog=settings.backlog,
+            timeout_keep_alive=settings.keepalive,
+            timeout_graceful_shutdown=settings.graceful_timeout,
+        )
+        self.socket = None
+        # pid воркера -> время запуска (monotonic)
+        self.workers: dict[int, float] = {}
+        self.stop_signal: Optional[int] = None
+        self.respawn_at = 0.0
+        # Аварийные выходы подряд
+        self.failures = 0
+
+    def spawn(self) -> None:
+        pid = os.fork()
+        if pid:
+            self.workers[pid] = time.monotonic()
+            return
+        # Воркер: сигналы до старта uvicorn игнорируем, дальше их ловит DrainingServer
+        for sig in HANDLED_SIGNALS:
+            signal.signal(sig, signal.SIG_IGN)
+        code = 0
+        try:
+            server = DrainingServer(self.uvicorn_config, self.settings.drain_delay)
+            server.run(sockets=[self.socket])
+            if not server.started:
+                code = STARTUP_FAILURE
+        except BaseException:
+            logger.exception("Worker %d crashed", os.getpid())
+            code = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)
+
+    def reap(self) -> None:
+        while self.workers:
+            try:
+                pid, wait_status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.workers.clear()
+                return
+            if pid == 0:
+                return
+            self.record_exit(pid, os.waitstatus_to_exitcode(wait_status))
+
+    def record_exit(self, pid: int, code: int) -> None:
+        """Убирает воркер; после аварийного выхода откладывает следующий запуск."""
+        started = self.workers.pop(pid, None)
+        if code == 0 or self.stop_signal is not None:
+            return
+        now = time.monotonic()
+        if started is not None and now - started >= RESPAWN_RESET:
+            self.failures = 0
+        delay = min(RESPAWN_DELAY * 2 ** self.failures, RESPAWN_DELAY_MAX)
+        self.failures += 1
+        self.respawn_at = now + delay
+        # Код < 0 — воркер убит сигналом (например, OOM killer), STARTUP_FAILURE — не стартовал lifespan
+        logger.warning("Worker %d exited with code %d, respawning in %.1fs", pid, code, delay)
+
+    def handle_signal(self, sig, frame) -> None:
+        if self.stop_signal is not None:
+            # Повторный сигнал — воркерам: прекратить ожидание drain
+            for pid in self.workers:
+                os.kill(pid, sig)
+        self.stop_signal = sig
+
+    def run(self) -> None:
+        self.socket = self.uvicorn_config.bind_socket()
+        for sig in HANDLED_SIGNALS:
+            signal.signal(sig, self.handle_signal)
+        logger.info(
+            "Serving on http://%s:%d with %d workers (master %d)",
+            self.settings.host, self.settings.port, self.settings.workers, os.getpid()
+        )
+
+        while self.stop_signal is None:
+            self.reap()
+            if len(self.workers) < self.settings.workers and time.monotonic() >= self.respawn_at:
+                self.spawn()
+                continue
+            time.sleep(0.1)
+
+        for pid in self.workers:
+            os.kill(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.settings.drain_delay + self.settings.graceful_timeout + 5
+        while self.workers and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in self.workers:
+            os.kill(pid, signal.SIGKILL)
+        for pid in list(self.workers):
+            os.waitpid(pid, 0)
+        self.socket.close()
+
+
+if __name__ == "__main__":
+    Supervisor(config.server).run()
@@ -0,0 +1,169 @@
+import asyncio
+import os
+import time
+
+import pytest
+from fastapi import FastAPI, Request
+from starlette.testclient import TestClient
+
+from config import config
+from utils import avatars
+from utils.avatars import receive_avatar, release_avatar
+
+BOUNDARY = "avatar-test-boundary"
+CONTENT_TYPE = f"multipart/form-data; boundary={BOUNDARY}"
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 56
+
+
+def multipart(**fields: bytes) -> bytes:
+    body = b""
+    for name, data in fields.items():
+        body += (
+            f"--{BOUNDARY}\r\n"
+            f'Content-Disposition: form-data; name="{name}"; filename="{name}.bin"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n"
+        ).encode() + data + b"\r\n"
+    return body + f"--{BOUNDARY}--\r\n".encode()
+
+
+def chunked(body: bytes, size: int = 100):
+    """Тело без Content-Length: httpx отправляет генератор как chunked."""
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+@pytest.fixture
+def directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(config.avatars, "directory", str(tmp_path))
+    monkeypatch.setattr(config.avatars, "max_bytes", 1000)
+    monkeypatch.setattr(config.avatars, "chunk_size", 64)
+    return tmp_path
+
+
+@pytest.fixture
+def client(directory):
+    app = FastAPI()
+
+    @app.post("/avatar")
+    async def upload(request: Request) -> dict:
+        return {"url": await receive_avatar(request)}
+
+    with TestClient(app) as client:
+        yield client
+
+
+def files(directory) -> list[str]:
+    return sorted(os.listdir(directory))
+
+
+def test_stores_file_under_content_hash_and_dedupes(client, directory):
+    first = client.post("/avatar", content=multipart(file=PNG), headers={"Content-Type": CONTENT_TYPE})
+    # Тот же файл другим запросом и потоком без Content-Length — тот же файл на диске
+    second = client.post("/avatar", content=chunked(multipart(file=PNG)), headers={"Content-Type": CONTENT_TYPE})
+    assert first.status_code == second.status_code == 200
+    assert first.json()["url"] == second.json()["url"]
+    name = first.json()["url"].rsplit("/", 1)[1]
+    assert name.endswith(".png")
+    assert files(directory) == [name]
+    assert (directory / name).read_bytes() == PNG
+
+
+def test_rejects_large_content_length_before_reading_body(client, directory):
+    body = multipart(file=PNG)
+    response = client.post("/avatar", content=body, headers={
+        "Content-Type": CONTENT_TYPE,
+        "Content-Length": str(1000 + avatars.MULTIPART_OVERHEAD + 1),
+    })
+    assert response.status_code == 413
+    # Временный файл не создавался: отказ до разбора тела
+    assert files(directory) == []
+
+
+def test_rejects_oversized_file_mid_stream_without_content_length(client, directory):
+    body = multipart(file=PNG + b"\x00" * 2000)
+    response = client.post("/avatar", content=chunked(body), headers={"Content-Type": CONTENT_TYPE})
+    assert response.status_code == 413
+    assert files(directory) == []
+
+
+def test_rejects_unsupported_signature(client, directory):
+    body = multipart(file=b"GIF00a" + b"\x00" * 200)
+    response = client.post("/avatar", content=chunked(body), headers={"Content-Type": CONTENT_TYPE})
+    assert response.status_code == 415
+    assert response.json()["detail"] == avatars.UNSUPPORTED_TYPE
+    assert files(directory) == []
+
+
+def test_missing_file_field(client, directory):
+    response = client.post("/avatar", content=multipart(other=PNG), headers={"Content-Type": CONTENT_TYPE})
+    assert response.status_code == 422
+    assert files(directory) == []
+
+
+def test_requires_multipart(client):
+    response = client.post("/avatar", content=PNG, headers={"Content-Type": "image/png"})
+    assert response.status_code == 415
+
+
+class FakeSession:
+    def __init__(self, referenced: bool):
+        self.referenced = referenced
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    async def scalar(self, stmt):
+        return self.referenced
+
+
+@pytest.fixture
+def stored(directory):
+    """Файл аватара с превью; mtime в прошлом, за пределами grace."""
+    paths = [directory / "abc.png", directory / "abc-80.webp"]
+    for path in paths:
+        path.write_bytes(PNG)
+    old = time.time() - 3600
+    os.utime(paths[0], (old, old))
+    url = f"{directory}/abc.png"
+    variants = {"80": {"webp": f"{directory}/abc-80.webp"}}
+    return url, variants, paths
+
+
+def release(monkeypatch, referenced: bool, *args, **kwargs):
+    monkeypatch.setattr(avatars, "sessionmaker", lambda: FakeSession(referenced))
+    asyncio.run(release_avatar(*args, **kwargs))
+
+
+def test_release_removes_unreferenced_file_and_variants(monkeypatch, stored):
+    url, variants, paths = stored
+    release(monkeypatch, False, url, variants)
+    assert not any(path.exists() for path in paths)
+
+
+def test_release_keeps_referenced_file(monkeypatch, stored):
+    url, variants, paths = stored
+    release(monkeypatch, True, url, variants)
+    assert all(path.exists() for path in paths)
+
+
+def test_release_keeps_file_reuploaded_within_grace(monkeypatch, stored):
+    url, variants, paths = stored
+    # Повторная загрузка того же файла обновляет mtime (_Sink.commit)
+    os.utime(paths[0])
+    release(monkeypatch, False, url, variants)
+    assert all(path.exists() for path in paths)
+    release(monkeypatch, False, url, variants, grace=0)
+    assert not any(path.exists() for path in paths)
+
+
+def test_release_ignores_urls_outside_avatar_directory(monkeypatch, stored, tmp_path):
+    outside = tmp_path.parent / "outside.png"
+    outside.write_bytes(PNG)
+    try:
+        release(monkeypatch, False, str(outside))
+        assert outside.exists()
+    finally:
+        outside.unlink()
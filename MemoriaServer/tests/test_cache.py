@@ -0,0 +1,169 @@
+import asyncio
+from typing import Optional
+from uuid import uuid4
+
+import pytest
+from fastapi import BackgroundTasks, HTTPException
+
+from database.models import User
+from routers import user as user_routes
+from schemas.user_schemas import UpdateUserDTO
+from utils import cache
+from utils.auth import create_access_token, get_current_user, principal_cache
+from utils.cache import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_lru_evicts_least_recently_used(clock):
+    lru = TTLCache(maxsize=2, ttl=60)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    # Чтение делает "a" свежей, вытесняется "b"
+    assert lru.get("a") == 1
+    lru.set("c", 3)
+    assert (lru.get("a"), lru.get("b"), lru.get("c")) == (1, None, 3)
+    assert len(lru) == 2
+
+
+def test_entries_expire_after_ttl(clock):
+    ttl = TTLCache(maxsize=10, ttl=5)
+    ttl.set("a", 1)
+    clock[0] += 5
+    assert ttl.get("a") == 1
+    clock[0] += 0.1
+    assert ttl.get("a", "missing") == "missing"
+    # Устаревшая запись удаляется при чтении
+    assert len(ttl) == 0
+
+
+def test_zero_size_disables_cache_and_pop_returns_value(clock):
+    disabled = TTLCache(maxsize=0, ttl=60)
+    disabled.set("a", 1)
+    assert disabled.get("a") is None
+
+    enabled = TTLCache(maxsize=1, ttl=60)
+    enabled.set("a", 1)
+    assert enabled.pop("a") == 1
+    assert enabled.pop("a") is None
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    """Сессия, которая отдаёт заданные строки и считает запросы."""
+
+    def __init__(self, *rows):
+        self.rows = list(rows)
+        self.queries = 0
+
+    async def scalars(self, stmt):
+        self.queries += 1
+        return FakeResult(self.rows)
+
+    async def execute(self, stmt):
+        self.queries += 1
+        return FakeResult(self.rows)
+
+    def expunge(self, obj):
+        pass
+
+    async def commit(self):
+        pass
+
+
+def make_user(email: str = "player@example.com") -> User:
+    return User(id=uuid4(), name="player", email=email, experience=0)
+
+
+def token_for(user: User, email: Optional[str] = None) -> str:
+    return create_access_token({"sub": email or user.email, "user_id": str(user.id)})
+
+
+@pytest.fixture(autouse=True)
+def empty_principal_cache():
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
+
+
+def test_current_user_is_cached_per_user_id():
+    user = make_user()
+    session = FakeSession(user)
+    token = token_for(user)
+
+    assert asyncio.run(get_current_user(token, session)) is user
+    assert asyncio.run(get_current_user(token, session)) is user
+    assert session.queries == 1
+
+
+def test_email_mismatch_goes_back_to_database():
+    user = make_user()
+    asyncio.run(get_current_user(token_for(user), FakeSession(user)))
+
+    # Email сменили: токен со старым email не должен пройти по закэшированному объекту
+    session = FakeSession()
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(get_current_user(token_for(user, email="old@example.com"), session))
+    assert error.value.status_code == 401
+    assert session.queries == 1
+
+
+def cache_user(user: User) -> None:
+    asyncio.run(get_current_user(token_for(user), FakeSession(user)))
+    assert principal_cache.get(str(user.id)) is user
+
+
+def test_update_invalidates_principal(monkeypatch):
+    user = make_user()
+    cache_user(user)
+
+    async def update_returning(*args, **kwargs):
+        return user
+
+    monkeypatch.setattr(user_routes, "update_returning", update_returning)
+    asyncio.run(user_routes.update_user(user.id, UpdateUserDTO(experience=5), session=None, current_user=user))
+    assert principal_cache.get(str(user.id)) is None
+
+
+def test_delete_invalidates_principal(monkeypatch):
+    user = make_user()
+    cache_user(user)
+
+    async def delete_returning(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(user_routes, "delete_returning", delete_returning)
+    asyncio.run(user_routes.delete_user(user.id, session=FakeSession(), current_user=user))
+    assert principal_cache.get(str(user.id)) is None
+
+
+def test_avatar_upload_invalidates_principal(monkeypatch):
+    user = make_user()
+    cache_user(user)
+
+    async def receive_avatar(request):
+        return "media/avatars/new.png"
+
+    async def render_avatar_variants(url):
+        return {}
+
+    monkeypatch.setattr(user_routes, "receive_avatar", receive_avatar)
+    monkeypatch.setattr(user_routes, "render_avatar_variants", render_avatar_variants)
+    session = FakeSession((user, None, None))
+    asyncio.run(user_routes.upload_user_avatar(user.id, None, BackgroundTasks(), session=session, current_user=user))
+    assert principal_cache.get(str(user.id)) is None
@@ -0,0 +1,49 @@
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+from utils.media import MediaFiles
+
+BODY = b"0123456789"
+
+
+@pytest.fixture
+def client(tmp_path):
+    (tmp_path / "file.txt").write_bytes(BODY)
+    media = MediaFiles(
+        directory=str(tmp_path),
+        max_age=60,
+        cache_entries=16,
+        cache_ttl=60,
+        inline_max=4,
+        chunk_size=3
+    )
+    with TestClient(Starlette(routes=[Mount("/media", app=media)])) as client:
+        yield client
+
+
+@pytest.mark.parametrize("path", [
+    "/media/missing.txt",
+    "/media/file.txt%00.png",
+    "/media/" + "a" * 300,
+    "/media/file.txt/inner",
+])
+def test_unreadable_paths_are_404(client, path):
+    assert client.get(path).status_code == 404
+
+
+@pytest.mark.parametrize("http_range, status, body", [
+    ("bytes=2-4", 206, BODY[2:5]),
+    ("bytes=-3", 206, BODY[-3:]),
+    ("bytes=7-", 206, BODY[7:]),
+    # last < first: заголовок недействителен и игнорируется
+    ("bytes=5-2", 200, BODY),
+    ("bytes=0-1,4-5", 200, BODY),
+    ("bytes=10-", 416, b""),
+    ("bytes=-0", 416, b""),
+])
+def test_ranges(client, http_range, status, body):
+    response = client.get("/media/file.txt", headers={"Range": http_range})
+    assert response.status_code == status
+    assert response.content == body
@@ -0,0 +1,122 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+from starlette.responses import PlainTextResponse
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+from utils.metrics import Counter, Gauge, Histogram, Metrics, MetricsMiddleware, instrument_engine
+
+
+def test_histogram_renders_cumulative_buckets_sum_and_count():
+    histogram = Histogram("latency_seconds", "Latency.", ("route",), (0.1, 0.5, 1.0))
+    for value in (0.05, 0.1, 0.3, 0.7, 2.0):
+        histogram.observe(("/a",), value)
+
+    lines = list(histogram.render())
+    assert lines[:2] == ["# HELP latency_seconds Latency.", "# TYPE latency_seconds histogram"]
+    assert lines[2:] == [
+        # Граница включительно (le): 0.1 попадает в первую корзину
+        'latency_seconds_bucket{route="/a",le="0.1"} 2',
+        'latency_seconds_bucket{route="/a",le="0.5"} 3',
+        'latency_seconds_bucket{route="/a",le="1.0"} 4',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 5',
+        'latency_seconds_sum{route="/a"} 3.15',
+        'latency_seconds_count{route="/a"} 5',
+    ]
+
+
+def test_counter_and_gauge_escape_label_values():
+    counter = Counter("errors_total", "Errors.", ("detail",))
+    counter.inc(('quote " backslash \\ newline \n',), 2)
+    counter.inc(('quote " backslash \\ newline \n',))
+    assert list(counter.render())[2:] == ['errors_total{detail="quote \\" backslash \\\\ newline \\n"} 3']
+
+    gauge = Gauge("in_progress", "In progress.")
+    gauge.inc()
+    gauge.inc()
+    gauge.dec()
+    assert list(gauge.render()) == ["# HELP in_progress In progress.", "# TYPE in_progress gauge", "in_progress 1"]
+
+
+def test_render_includes_every_metric_and_extra_gauges():
+    registry = Metrics()
+    registry.requests.inc(("GET", "/users/{id}", 200))
+    registry.latency.observe(("GET", "/users/{id}"), 0.02)
+    extra = Gauge("db_pool_size", "Pool size.", ("db",))
+    extra.set(("primary",), 10)
+
+    rendered = registry.render([extra])
+    assert rendered.startswith("# worker pid ")
+    assert rendered.endswith("\n")
+    assert 'http_requests_total{method="GET",route="/users/{id}",status="200"} 1' in rendered
+    assert 'http_request_duration_seconds_count{method="GET",route="/users/{id}"} 1' in rendered
+    assert "http_requests_in_progress 0" in rendered
+    assert 'db_pool_size{db="primary"} 10' in rendered
+
+
+@pytest.fixture
+def instrumented():
+    """Приложение с MetricsMiddleware, маршрутом с параметром, Mount и движком SQLite."""
+    registry = Metrics()
+    engine = create_engine("sqlite://")
+    instrument_engine(SimpleNamespace(sync_engine=engine), "primary", registry)
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int) -> dict:
+        with engine.connect() as conn:
+            for _ in range(item_id):
+                conn.execute(text("SELECT 1"))
+        return {"id": item_id}
+
+    @app.get("/broken")
+    async def broken() -> dict:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT * FROM missing"))
+        return {}
+
+    async def media(scope, receive, send):
+        await PlainTextResponse("file")(scope, receive, send)
+
+    app.routes.append(Mount("/media", app=media))
+    app.add_middleware(MetricsMiddleware, registry=registry)
+    with TestClient(app, raise_server_exceptions=False) as client:
+        yield client, registry
+
+
+def test_middleware_labels_requests_by_route_template(instrumented):
+    client, registry = instrumented
+    for path in ("/items/1", "/items/2", "/media/a/b.png", "/media/c.png", "/nope"):
+        client.get(path)
+
+    assert registry.requests.values == {
+        ("GET", "/items/{item_id}", 200): 2,
+        ("GET", "/media", 200): 2,
+        ("GET", "unmatched", 404): 1,
+    }
+    assert registry.latency.series[("GET", "/items/{item_id}")].count == 2
+    assert registry.in_progress.values[()] == 0
+
+
+def test_middleware_counts_queries_per_request(instrumented):
+    client, registry = instrumented
+    client.get("/items/3")
+    client.get("/items/0")
+
+    series = registry.request_queries.series[("GET", "/items/{item_id}")]
+    assert (series.count, series.sum) == (2, 3)
+    statements = registry.statements.series[("primary", "SELECT")]
+    assert statements.count == 3
+
+
+def test_failed_request_and_statement_are_counted(instrumented):
+    client, registry = instrumented
+    assert client.get("/broken").status_code == 500
+
+    assert registry.requests.values[("GET", "/broken", 500)] == 1
+    assert registry.statement_errors.values[("primary", "SELECT")] == 1
+    # Упавшее выражение тоже считается выполненным запросом
+    assert registry.request_queries.series[("GET", "/broken")].sum == 1
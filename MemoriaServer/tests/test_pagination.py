@@ -0,0 +1,74 @@
+import base64
+from types import SimpleNamespace
+from uuid import UUID, uuid4
+
+import pytest
+from fastapi import HTTPException, Response
+
+from database.models import Achievement
+from utils.pagination import DEFAULT_LIMIT, ListParams, decode_cursor, encode_cursor
+
+
+def raw_cursor(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip("=")
+
+
+def test_round_trip():
+    user_id = uuid4()
+    assert decode_cursor(encode_cursor(42, user_id), int, UUID) == (42, user_id)
+
+
+@pytest.mark.parametrize("cursor", [
+    "!!!not-base64",
+    raw_cursor("not json"),
+    raw_cursor('{"a": 1}'),
+    encode_cursor(1),
+    encode_cursor(1, 2, 3),
+    # Правильная форма, но не те типы значений
+    encode_cursor(1, 2),
+    encode_cursor("1", str(uuid4())),
+    raw_cursor('[true, "00000000-0000-0000-0000-000000000000"]'),
+    raw_cursor('[1.5, "00000000-0000-0000-0000-000000000000"]'),
+    raw_cursor('[1, null]'),
+    raw_cursor('[1, ["x"]]'),
+    encode_cursor(1, "not-a-uuid"),
+])
+def test_malformed_cursor_is_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, int, UUID)
+    assert error.value.status_code == 400
+
+
+def test_default_page_and_next_cursor():
+    items = [SimpleNamespace(id=i) for i in range(1, DEFAULT_LIMIT + 11)]
+    params = ListParams(limit=None, cursor=None, stream=None)
+
+    page = params.slice(items, Achievement.id)
+    response = Response()
+    params.set_next_cursor(response, page, Achievement.id)
+    assert len(page) == DEFAULT_LIMIT
+    assert decode_cursor(response.headers["X-Next-Cursor"], int) == (DEFAULT_LIMIT,)
+
+    params = ListParams(limit=None, cursor=response.headers["X-Next-Cursor"], stream=None)
+    page = params.slice(items, Achievement.id)
+    response = Response()
+    params.set_next_cursor(response, page, Achievement.id)
+    assert [item.id for item in page] == list(range(DEFAULT_LIMIT + 1, DEFAULT_LIMIT + 11))
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_stream_without_limit_is_unbounded():
+    stmt = ListParams(limit=None, cursor=None, stream="ndjson").apply(Achievement.__table__.select(), Achievement.id)
+    assert stmt._limit_clause is None
+
+
+def test_covers_limits_buffered_keys_to_the_page():
+    rows = [SimpleNamespace(id=i) for i in (3, 4)]
+    column = Achievement.id
+    # Полная страница после курсора: (2, 4]
+    covers = ListParams(limit=2, cursor=encode_cursor(2), stream=None).covers(rows, column)
+    assert [value for value in range(7) if covers(value)] == [3, 4]
+    # Неполная страница — последняя, покрывает всё после курсора
+    covers = ListParams(limit=5, cursor=encode_cursor(2), stream=None).covers(rows, column)
+    assert [value for value in range(7) if covers(value)] == [3, 4, 5, 6]
+    assert ListParams(limit=None, cursor=None, stream="json").covers([], column)(0)
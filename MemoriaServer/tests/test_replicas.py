@@ -0,0 +1,19 @@
+import asyncio
+
+import pytest
+from sqlalchemy import exc
+
+from database.replicas import is_connect_error
+
+
+@pytest.mark.parametrize("error, expected", [
+    (ConnectionRefusedError(111, "refused"), True),
+    (asyncio.TimeoutError(), True),
+    (exc.DBAPIError("SELECT 1", {}, Exception("closed"), connection_invalidated=True), True),
+    # Отмена запроса из-за конфликта с восстановлением на hot standby — реплика жива
+    (exc.OperationalError("SELECT 1", {}, Exception("canceling statement due to conflict with recovery")), False),
+    (exc.DataError("SELECT 1", {}, Exception("invalid input")), False),
+    (ValueError("bug"), False),
+])
+def test_is_connect_error(error, expected):
+    assert is_connect_error(error) is expected
@@ -0,0 +1,45 @@
+import asyncio
+
+from config import ResultKeysConfig
+from utils import result_keys as result_keys_module
+from utils.result_keys import ResultKeyPruner
+
+
+class FakeResult:
+    def __init__(self, count: int):
+        self.count = count
+
+    def all(self) -> list:
+        return ["key"] * self.count
+
+
+class FakeSession:
+    def __init__(self, batches: list[int], commits: list):
+        self.batches = batches
+        self.commits = commits
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    async def scalars(self, stmt):
+        return FakeResult(self.batches.pop(0))
+
+    async def commit(self):
+        self.commits.append(1)
+
+
+def test_prune_deletes_in_batches_until_a_short_one(monkeypatch):
+    settings = ResultKeysConfig()
+    settings.prune_batch = 100
+    pruner = ResultKeyPruner(settings)
+    batches, commits = [100, 100, 7, 100], []
+    monkeypatch.setattr(result_keys_module, "sessionmaker", lambda: FakeSession(batches, commits))
+
+    assert asyncio.run(pruner.prune()) == 207
+    # Каждая порция — своя транзакция, лишней порции после короткой нет
+    assert len(commits) == 3
+    assert batches == [100]
+    assert pruner.pruned == 207
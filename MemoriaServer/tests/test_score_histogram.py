@@ -0,0 +1,71 @@
+import asyncio
+from uuid import uuid4
+
+from utils.score_histogram import ScoreHistogram, ScoreHistograms
+from utils.stat_events import StatChange
+
+
+def test_ties_share_rank_and_count_as_not_higher():
+    histogram = ScoreHistogram()
+    for score in (10, 20, 20, 30):
+        histogram.add(score)
+
+    assert histogram.rank(30) == (1, 100.0)
+    # Второй игрок с 20 выше не считается: 2 из 3 остальных не выше
+    assert histogram.rank(20) == (2, 100.0 * 2 / 3)
+    assert histogram.rank(10) == (4, 0.0)
+
+
+def test_first_build_is_single_flight():
+    histograms = ScoreHistograms(ttl=60)
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return [(1, 10, 2)]
+
+    async def scenario():
+        await asyncio.gather(*(histograms.ensure(load) for _ in range(5)))
+
+    asyncio.run(scenario())
+    assert calls == [1]
+    assert histograms.total(1) == 2
+
+
+def test_stale_histograms_are_served_while_one_rebuild_runs():
+    histograms = ScoreHistograms(ttl=0)
+    histograms.build([(1, 10, 1)])
+    histograms.built_at -= 1
+    started = []
+    release = None
+
+    async def load():
+        started.append(1)
+        await release.wait()
+        return [(1, 10, 3)]
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        for _ in range(3):
+            await histograms.ensure(load)
+            await asyncio.sleep(0)
+            # Пока пересборка идёт, отвечаем по старой гистограмме
+            assert histograms.total(1) == 1
+        release.set()
+        await histograms._rebuild
+
+    asyncio.run(scenario())
+    assert started == [1]
+    assert histograms.total(1) == 3
+
+
+def test_deleted_row_leaves_histogram():
+    histograms = ScoreHistograms(ttl=60)
+    histograms.build([(1, 10, 1), (1, 20, 1)])
+
+    histograms.apply([StatChange(uuid4(), 1, None, 20)])
+
+    assert histograms.total(1) == 1
+    assert histograms.rank(1, 10) == (1, 100.0)
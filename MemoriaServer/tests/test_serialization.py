@@ -0,0 +1,26 @@
+from types import SimpleNamespace
+from uuid import uuid4
+
+import orjson
+from asyncpg.pgproto import pgproto
+
+from schemas.user_schemas import UserDTO
+from utils.serialization import dumps, dumps_many
+
+
+def user(user_id) -> SimpleNamespace:
+    return SimpleNamespace(id=user_id, name="n", experience=1, email="n@example.com",
+                           avatar_url=None, avatar_variants=None)
+
+
+def test_uuid_from_asyncpg_is_serialized_as_string():
+    # asyncpg отдаёт UUID своим подклассом, сам orjson его не сериализует
+    user_id = uuid4()
+    document = orjson.loads(dumps(user(pgproto.UUID(str(user_id))), UserDTO))
+    assert document["id"] == str(user_id)
+
+
+def test_plain_uuid_and_many():
+    ids = [uuid4(), uuid4()]
+    documents = orjson.loads(dumps_many([user(ids[0]), user(pgproto.UUID(str(ids[1])))], UserDTO))
+    assert [document["id"] for document in documents] == [str(user_id) for user_id in ids]
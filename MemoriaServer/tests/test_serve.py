@@ -0,0 +1,45 @@
+import time
+
+import pytest
+
+import serve
+from config import ServerConfig
+from serve import RESPAWN_DELAY, RESPAWN_DELAY_MAX, RESPAWN_RESET, Supervisor
+
+
+@pytest.fixture
+def supervisor() -> Supervisor:
+    settings = ServerConfig()
+    settings.preload = False
+    return Supervisor(settings)
+
+
+def crash(supervisor: Supervisor, pid: int, code: int = 1, uptime: float = 0.0) -> float:
+    """Аварийный выход воркера pid; возвращает назначенную паузу перед перезапуском."""
+    supervisor.workers[pid] = time.monotonic() - uptime
+    supervisor.record_exit(pid, code)
+    return supervisor.respawn_at - time.monotonic()
+
+
+def test_respawn_backs_off_exponentially_on_any_abnormal_exit(supervisor):
+    codes = (1, serve.STARTUP_FAILURE, -9, 1, 1, 1, 1)
+    delays = [crash(supervisor, pid, code) for pid, code in enumerate(codes, 1)]
+    expected = [min(RESPAWN_DELAY * 2 ** n, RESPAWN_DELAY_MAX) for n in range(7)]
+    assert delays == pytest.approx(expected, abs=0.05)
+    assert not supervisor.workers
+
+
+def test_long_running_worker_resets_backoff(supervisor):
+    for pid in range(4):
+        crash(supervisor, pid)
+    assert crash(supervisor, 10, uptime=RESPAWN_RESET + 1) == pytest.approx(RESPAWN_DELAY, abs=0.05)
+
+
+def test_clean_exit_and_shutdown_do_not_delay(supervisor):
+    supervisor.workers[1] = time.monotonic()
+    supervisor.record_exit(1, 0)
+    assert supervisor.respawn_at == 0.0
+    supervisor.stop_signal = 15
+    supervisor.workers[2] = time.monotonic()
+    supervisor.record_exit(2, 1)
+    assert supervisor.respawn_at == 0.0 and supervisor.failures == 0
@@ -0,0 +1,274 @@
+import asyncio
+from uuid import uuid4
+
+import orjson
+import pytest
+from sqlalchemy import exc
+
+from config import StatBufferConfig
+from database.models import UserGameStat
+from schemas.game_schemas import GameDTO
+from utils import stat_buffer as stat_buffer_module
+from utils.stat_buffer import StatBuffer
+
+USER = uuid4()
+
+
+def make_buffer(**overrides) -> StatBuffer:
+    settings = StatBufferConfig()
+    settings.enabled = True
+    settings.flush_interval = 0.01
+    settings.flush_entries = 100
+    settings.max_unflushed = 1000
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    return StatBuffer(settings)
+
+
+class FakeSession:
+    def __init__(self):
+        self.commits = 0
+        self.rollbacks = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+def driver_error(sqlstate: str, message: str) -> Exception:
+    """Как у диалекта asyncpg: SQLSTATE в атрибуте исключения драйвера."""
+    orig = Exception(message)
+    orig.sqlstate = sqlstate
+    return orig
+
+
+def returning(values: list[dict]) -> list:
+    return [
+        (UserGameStat(user_id=row["user_id"], game_id=row["game_id"], high_score=row["high_score"],
+                      games_played=row["games_played"], stats=row["stats"]), None)
+        for row in values
+    ]
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """sessionmaker и upsert без БД; bad — game_id, на которых upsert падает."""
+    state = {"bad": set(), "error": None, "calls": []}
+
+    async def upsert(session, values):
+        state["calls"].append(len(values))
+        await asyncio.sleep(0)
+        if state["error"] is not None:
+            raise state["error"]
+        if any(row["game_id"] in state["bad"] for row in values):
+            raise exc.DataError("upsert", {}, driver_error("22003", "integer out of range"))
+        return returning(values)
+
+    monkeypatch.setattr(stat_buffer_module, "sessionmaker", FakeSession)
+    monkeypatch.setattr(StatBuffer, "_upsert", staticmethod(upsert))
+    return state
+
+
+def test_add_folds_results_per_key():
+    buffer = make_buffer()
+
+    async def scenario():
+        await buffer.add(USER, 1, 10, {"a": 1})
+        await buffer.add(USER, 1, 30, {"b": 2})
+        await buffer.add(USER, 1, 20, {"a": 3})
+        await buffer.add(USER, 2, 5, {})
+
+    asyncio.run(scenario())
+    pending = buffer.pending_for(USER)
+    assert pending[1].games_played == 3
+    assert pending[1].high_score == 30
+    assert pending[1].stats == {"a": 3, "b": 2}
+    assert pending[2].games_played == 1
+    assert buffer.status()["pending"] == 2
+
+
+def test_merge_overlays_pending_on_records():
+    buffer = make_buffer()
+    asyncio.run(buffer.add(USER, 1, 50, {"x": 1}))
+    record = UserGameStat(user_id=USER, game_id=1, high_score=40, games_played=5, stats={"y": 2})
+
+    merged = buffer.merge(USER, 1, record)
+    assert (merged.high_score, merged.games_played, merged.stats) == (50, 6, {"y": 2, "x": 1})
+    # Строки в БД ещё нет — собирается из дельты
+    created = buffer.merge(USER, 1, None)
+    assert (created.high_score, created.games_played) == (50, 1)
+    # Без дельты запись возвращается как есть
+    other = UserGameStat(user_id=USER, game_id=2, high_score=1, games_played=1, stats={})
+    assert buffer.merge(USER, 2, other) is other
+    assert [r.games_played for r in buffer.merge_many(USER, [record, other])] == [6, 1]
+    assert buffer.version(USER) == ((1, 1, 50),)
+
+
+def test_merge_many_adds_buffered_games_within_bounds():
+    buffer = make_buffer()
+
+    async def scenario():
+        for game_id in (1, 3, 5, 7):
+            await buffer.add(USER, game_id, game_id * 10, {})
+
+    asyncio.run(scenario())
+    page = [UserGameStat(user_id=USER, game_id=game_id, high_score=1, games_played=1, stats={}) for game_id in (2, 5)]
+
+    # Без include строки, которых нет в БД, не добавляются (ответ пакета)
+    assert [r.game_id for r in buffer.merge_many(USER, page)] == [2, 5]
+    # Страница покрывает (1, 5]: игра 3 из буфера встаёт по порядку, 1 и 7 — чужие страницы
+    merged = buffer.merge_many(USER, page, lambda game_id: 1 < game_id <= 5)
+    assert [r.game_id for r in merged] == [2, 3, 5]
+    assert (merged[1].games_played, merged[1].high_score) == (1, 30)
+    assert (merged[2].games_played, merged[2].high_score) == (2, 50)
+    # Пустая последняя страница после курсора
+    assert [r.game_id for r in buffer.merge_many(USER, [], lambda game_id: game_id > 5)] == [7]
+
+
+def test_merge_profile_document():
+    buffer = make_buffer()
+
+    async def scenario():
+        await buffer.add(USER, 1, 99, {})
+        await buffer.add(USER, 0, 5, {})
+        await buffer.add(USER, 4, 7, {})
+
+    asyncio.run(scenario())
+    games = {
+        0: GameDTO(id=0, code="zero", name="Zero"),
+        1: GameDTO(id=1, code="one", name="One"),
+    }
+    document = b'{"user":{},"stats":[{"game_id":1,"high_score":10,"games_played":2}],"achievements":[]}'
+    stats = orjson.loads(buffer.merge_profile(USER, document, games))["stats"]
+    # Игра 0 есть только в буфере — берётся из каталога; игры 4 в каталоге нет
+    assert [item["game_id"] for item in stats] == [0, 1]
+    assert stats[0] == {
+        "user_id": str(USER), "game_id": 0, "high_score": 5, "games_played": 1,
+        "game_code": "zero", "game_name": "Zero",
+    }
+    assert (stats[1]["high_score"], stats[1]["games_played"]) == (99, 3)
+    assert buffer.merge_profile(uuid4(), document, games) is document
+
+
+def test_drain_user_flushes_only_when_user_has_rows(fake_db):
+    buffer = make_buffer()
+
+    async def scenario():
+        await buffer.drain_user(USER)
+        assert fake_db["calls"] == []
+        await buffer.add(USER, 1, 1, {})
+        assert buffer.has_pending(USER) and not buffer.has_pending(uuid4())
+        await buffer.drain_user(USER)
+
+    asyncio.run(scenario())
+    assert fake_db["calls"] == [1]
+    assert not buffer.has_pending(USER)
+
+
+def test_flush_writes_folded_rows(fake_db):
+    buffer = make_buffer()
+
+    async def scenario():
+        await buffer.add(USER, 1, 10, {})
+        await buffer.add(USER, 1, 20, {})
+        await buffer.flush()
+
+    asyncio.run(scenario())
+    assert fake_db["calls"] == [1]
+    assert buffer.status()["pending"] == 0
+    assert buffer.flushed == 1
+
+
+def test_failed_flush_restores_rows_and_keeps_newer_results(fake_db):
+    buffer = make_buffer()
+    fake_db["error"] = exc.TimeoutError("QueuePool limit reached")
+
+    async def scenario():
+        await buffer.add(USER, 1, 10, {"a": 1})
+        flush = asyncio.create_task(buffer.flush())
+        await asyncio.sleep(0)
+        assert buffer.status()["inflight"] == 1
+        # Пришёл результат, пока пачка писалась
+        await buffer.add(USER, 1, 40, {"b": 2})
+        with pytest.raises(exc.TimeoutError):
+            await flush
+
+    asyncio.run(scenario())
+    entry = buffer.pending_for(USER)[1]
+    assert (entry.games_played, entry.high_score, entry.stats) == (2, 40, {"a": 1, "b": 2})
+    assert buffer.flushed == 0
+
+
+def test_row_errors_fall_back_to_single_rows_and_drop_bad_ones(fake_db):
+    buffer = make_buffer()
+    fake_db["bad"] = {2}
+
+    async def scenario():
+        for game_id in (1, 2, 3):
+            await buffer.add(USER, game_id, 1, {})
+        await buffer.flush()
+
+    asyncio.run(scenario())
+    # Пачка целиком, затем по одной строке
+    assert fake_db["calls"] == [3, 1, 1, 1]
+    assert buffer.dropped == 1
+    assert buffer.flushed == 2
+    assert buffer.status()["pending"] == 0
+
+
+def test_connection_errors_keep_the_batch(fake_db):
+    buffer = make_buffer()
+    fake_db["error"] = exc.DBAPIError("upsert", {}, Exception("connection lost"), connection_invalidated=True)
+
+    async def scenario():
+        await buffer.add(USER, 1, 1, {})
+        with pytest.raises(exc.DBAPIError):
+            await buffer.flush()
+
+    asyncio.run(scenario())
+    assert buffer.dropped == 0
+    assert buffer.pending_for(USER)[1].games_played == 1
+
+
+@pytest.mark.parametrize("sqlstate", ["40P01", "40001", "57014"])
+def test_retryable_errors_keep_the_batch(fake_db, sqlstate):
+    buffer = make_buffer()
+    # Дедлок, сбой сериализации, отмена по statement_timeout — не вина строк
+    fake_db["error"] = exc.DBAPIError("upsert", {}, driver_error(sqlstate, "retry"))
+
+    async def scenario():
+        await buffer.add(USER, 1, 1, {})
+        await buffer.add(USER, 2, 1, {})
+        with pytest.raises(exc.DBAPIError):
+            await buffer.flush()
+
+    asyncio.run(scenario())
+    assert fake_db["calls"] == [2]
+    assert buffer.dropped == 0
+    assert set(buffer.pending_for(USER)) == {1, 2}
+
+
+def test_flusher_survives_non_dbapi_errors(fake_db):
+    buffer = make_buffer()
+    fake_db["error"] = exc.TimeoutError("QueuePool limit reached")
+
+    async def scenario():
+        buffer.start()
+        await buffer.add(USER, 1, 1, {})
+        await asyncio.sleep(0.05)
+        assert buffer.failures >= 1
+        fake_db["error"] = None
+        await asyncio.sleep(0.05)
+        await buffer.stop()
+
+    asyncio.run(scenario())
+    assert buffer.flushed == 1
+    assert buffer.status()["pending"] == 0
@@ -0,0 +1,35 @@
+import asyncio
+import os
+
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+
+from utils.thumbnails import DECODE_ERRORS, ThumbnailPool, render_variants
+
+
+@pytest.mark.filterwarnings("ignore::PIL.Image.DecompressionBombWarning")
+def test_render_rejects_images_over_max_pixels(tmp_path):
+    source = tmp_path / "source.png"
+    # Больше предела, но меньше удвоенного: Pillow здесь только предупреждает
+    Image.new("RGB", (100, 80)).save(source)
+
+    with pytest.raises(DECODE_ERRORS):
+        render_variants(str(source), "avatar", (32,), ("webp",), 80, 100 * 60)
+
+    assert os.listdir(tmp_path) == ["source.png"]
+
+
+def test_pool_recovers_after_worker_crash():
+    pool = ThumbnailPool(workers=1, queue_limit=1)
+
+    async def scenario():
+        with pytest.raises(HTTPException) as error:
+            await pool.run(os._exit, 1)
+        assert error.value.status_code == 503
+        return await pool.run(pow, 2, 10)
+
+    try:
+        assert asyncio.run(scenario()) == 1024
+    finally:
+        pool.shutdown()
@@ -0,0 +1,49 @@
+import asyncio
+
+from config import EngineConfig
+from utils import warmup
+from utils.warmup import warm_up
+
+
+def make_profile(connections: int = 2, timeout: float = 0.2) -> EngineConfig:
+    profile = EngineConfig()
+    profile.warmup_connections = connections
+    profile.pool_size = 10
+    profile.warmup_timeout = timeout
+    return profile
+
+
+def test_one_failing_engine_does_not_abort_the_others(monkeypatch):
+    finished = []
+
+    async def warm_engine(engine, connections, report):
+        if engine == "refused":
+            raise ConnectionRefusedError("connect failed")
+        if engine == "blackhole":
+            await asyncio.sleep(10)
+        await asyncio.sleep(0.01)
+        report.connections += connections
+        finished.append(engine)
+
+    monkeypatch.setattr(warmup, "warm_engine", warm_engine)
+    report = asyncio.run(warm_up(
+        [("primary", "primary"), ("replica-a", "refused"), ("replica-b", "blackhole")],
+        make_profile()
+    ))
+    # primary прогрет целиком, хотя реплика упала раньше него
+    assert finished == ["primary"]
+    assert report.connections == 2
+    assert set(report.errors) == {"replica-a", "replica-b"}
+    assert "ConnectionRefusedError" in report.errors["replica-a"]
+    assert "TimeoutError" in report.errors["replica-b"]
+    # Таймаут у каждого движка свой, а не сумма
+    assert report.duration_ms < 1000
+
+
+def test_disabled_warmup_skips_engines(monkeypatch):
+    async def warm_engine(engine, connections, report):
+        raise AssertionError("must not be called")
+
+    monkeypatch.setattr(warmup, "warm_engine", warm_engine)
+    report = asyncio.run(warm_up([("primary", "primary")], make_profile(connections=0)))
+    assert report.connections == 0 and report.errors == {}
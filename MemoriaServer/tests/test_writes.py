@@ -0,0 +1,32 @@
+from typing import Optional
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from database.writes import FOREIGN_KEY_VIOLATION, UNIQUE_VIOLATION, is_violation
+
+
+class DriverError(Exception):
+    def __init__(self, constraint_name: Optional[str]):
+        super().__init__(constraint_name)
+        self.constraint_name = constraint_name
+
+
+def integrity_error(sqlstate: Optional[str], constraint: Optional[str] = None) -> IntegrityError:
+    """Как у диалекта asyncpg: sqlstate в orig, исключение драйвера — в orig.__cause__."""
+    orig = Exception("integrity")
+    orig.sqlstate = sqlstate
+    orig.__cause__ = DriverError(constraint)
+    return IntegrityError("INSERT ...", {}, orig)
+
+
+@pytest.mark.parametrize("error, sqlstate, constraint, expected", [
+    (integrity_error(FOREIGN_KEY_VIOLATION), FOREIGN_KEY_VIOLATION, None, True),
+    (integrity_error(UNIQUE_VIOLATION), FOREIGN_KEY_VIOLATION, None, False),
+    (integrity_error("23514"), UNIQUE_VIOLATION, None, False),
+    (integrity_error(None), UNIQUE_VIOLATION, None, False),
+    (integrity_error(UNIQUE_VIOLATION, "ix_users_email"), UNIQUE_VIOLATION, "ix_users_email", True),
+    (integrity_error(UNIQUE_VIOLATION, "users_pkey"), UNIQUE_VIOLATION, "ix_users_email", False),
+])
+def test_is_violation(error, sqlstate, constraint, expected):
+    assert is_violation(error, sqlstate, constraint) is expected
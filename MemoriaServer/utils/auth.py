@@ -1,4 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import hmac
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy import select
@@ -6,7 +9,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from config import config
 from database.models import User
-from database.session_maker import get_session
+from database.session_maker import get_read_session, get_session
+from utils.cache import TTLCache
 
 # Секретный ключ и настройки
 ALGORITHM = "HS256"
@@ -16,29 +20,59 @@ router = APIRouter()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/user/login")
 
+# Кэш проверенных пользователей: user_id (из токена) -> отсоединённый объект User
+principal_cache = TTLCache(
+    maxsize=config.auth.principal_cache_size,
+    ttl=config.auth.principal_cache_ttl
+)
+
 
 def create_access_token(data: dict):
     encoded_jwt = jwt.encode(data, config.SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-async def get_current_user(
-        token: str = Depends(oauth2_scheme),
-        session: AsyncSession = Depends(get_session)
-):
+def invalidate_principal(user_id: UUID | str) -> None:
+    """Сбрасывает закэшированного пользователя после изменения или удаления."""
+    principal_cache.pop(str(user_id))
+
+
+def decode_token(token: str) -> dict:
     try:
         payload = jwt.decode(token, config.SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Не удалось подтвердить учетные данные"
-            )
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Не удалось подтвердить учетные данные"
         )
+    if payload.get("sub") is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Не удалось подтвердить учетные данные"
+        )
+    return payload
+
+
+async def get_current_user(
+        token: str = Depends(oauth2_scheme),
+        session: AsyncSession = Depends(get_session)
+):
+    """
+    Пользователь по токену; проверенный объект кэшируется по user_id на
+    PRINCIPAL_CACHE_TTL секунд. Кэш свой у каждого воркера: invalidate_principal
+    после изменения или удаления сбрасывает запись только в воркере, который
+    обработал запрос. Остальные воркеры до истечения TTL могут пропустить токен
+    удалённого пользователя или токен с прежним email и отдать маршрутам прежние
+    поля пользователя. Поэтому TTL держится коротким (PRINCIPAL_CACHE_TTL).
+    """
+    payload = decode_token(token)
+    email: str = payload["sub"]
+    cache_key = payload.get("user_id") or email
+
+    user = principal_cache.get(cache_key)
+    # Email в токене мог устареть после смены — тогда идём в БД, как и раньше
+    if user is not None and user.email == email:
+        return user
 
     stmt = select(User).where(User.email == email)
     user = (await session.scalars(stmt)).first()
@@ -47,4 +81,42 @@ async def get_current_user(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Пользователь не найден"
         )
+    # Отсоединяем объект, чтобы изменения в маршруте не попадали в кэш
+    session.expunge(user)
+    principal_cache.set(cache_key, user)
     return user
+
+
+async def get_token_user(
+        token: str = Depends(oauth2_scheme),
+        session: AsyncSession = Depends(get_read_session)
+):
+    """
+    Зависимость для read-only маршрутов.
+    При TRUST_TOKEN_CLAIMS=true пользователь собирается из подписанного claim "user",
+    который кладёт generate_token_for_user, и БД не используется вовсе.
+    Данные claim фиксируются на момент выдачи токена, поэтому удалённый
+    пользователь сохраняет доступ на чтение, пока жив его токен.
+    Иначе пользователь читается через сессию чтения маршрута (реплика или primary).
+    """
+    if config.auth.trust_token_claims:
+        payload = decode_token(token)
+        claim = payload.get("user")
+        if claim and claim.get("email") == payload["sub"]:
+            return User(
+                id=UUID(claim["id"]),
+                name=claim["name"],
+                email=claim["email"],
+                experience=claim["experience"],
+                avatar_url=claim.get("avatar_url"),
+                avatar_variants=claim.get("avatar_variants")
+            )
+    return await get_current_user(token, session)
+
+
+async def require_internal_access(x_internal_token: str | None = Header(None)) -> None:
+    """Пропускает к служебным эндпоинтам только запросы с заголовком X-Internal-Token."""
+    if not config.INTERNAL_TOKEN or not hmac.compare_digest(
+            x_internal_token or "", config.INTERNAL_TOKEN
+    ):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
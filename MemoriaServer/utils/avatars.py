@@ -0,0 +1,298 @@
+# utils/avatars.py
+"""
+Приём аватаров потоком.
+
+Тело multipart-запроса разбирается по мере поступления (python-multipart), в памяти
+копится не больше AVATAR_CHUNK_SIZE байт: запись на диск и sha256 считаются в потоке,
+event loop не блокируется. Размер ограничен AVATAR_MAX_BYTES: слишком большой
+Content-Length отклоняется до чтения тела, а тело без него обрывается с 413, как
+только предел превышен. Тип файла определяется по сигнатуре, а не по имени.
+Превью разных размеров считаются в пуле процессов (utils.thumbnails).
+
+Файл хранится под именем <sha256>.<ext>: одинаковые аватары разных пользователей
+лежат на диске один раз, превью называются <sha256>-<size>.<ext>. Прежний файл
+с превью удаляется фоновой задачей после ответа и только если на него больше
+никто не ссылается.
+"""
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+from typing import Optional
+
+from fastapi import HTTPException, Request, status
+from python_multipart.multipart import MultipartParser, parse_options_header
+from sqlalchemy import exists, select
+
+from config import config
+from database.models import User
+from database.session_maker import sessionmaker
+from utils.thumbnails import DECODE_ERRORS, render_variants, thumbnail_pool
+
+FIELD_NAME = b"file"
+# Запас на границы и заголовки частей multipart сверх размера самого файла
+MULTIPART_OVERHEAD = 16 * 1024
+# Файл, который только что загрузили заново (тот же хэш), не удаляем какое-то время:
+# новая ссылка на него может быть ещё не зафиксирована
+REUSE_GRACE = 60
+
+SIGNATURES = (
+    (0, b"\xff\xd8\xff", ".jpg"),
+    (0, b"\x89PNG\r\n\x1a\n", ".png"),
+    (0, b"GIF87a", ".gif"),
+    (0, b"GIF89a", ".gif"),
+    (8, b"WEBP", ".webp"),
+)
+SNIFF_BYTES = 16
+UNSUPPORTED_TYPE = "Avatar must be a JPEG, PNG, GIF or WebP image"
+
+
+def sniff_extension(head: bytes) -> Optional[str]:
+    """Расширение по первым байтам файла или None для неподдерживаемого типа."""
+    for offset, signature, ext in SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            if ext == ".webp" and not head.startswith(b"RIFF"):
+                continue
+            return ext
+    return None
+
+
+def too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Avatar is larger than {config.avatars.max_bytes} bytes"
+    )
+
+
+def avatar_path(url: str) -> Optional[str]:
+    """Путь к файлу по avatar_url; None для ссылок вне каталога аватаров."""
+    directory = config.avatars.directory
+    name = url[len(directory) + 1:] if url.startswith(directory + "/") else ""
+    if not name or "/" in name or name.startswith("."):
+        return None
+    return os.path.join(directory, name)
+
+
+class _Sink:
+    """Временный файл в каталоге аватаров и sha256 содержимого; методы блокирующие."""
+
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        fd, self.tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+        self.file = os.fdopen(fd, "wb")
+        self.directory = directory
+        self.digest = hashlib.sha256()
+
+    def write(self, data: bytes) -> None:
+        # hashlib и запись файла отпускают GIL
+        self.digest.update(data)
+        self.file.write(data)
+
+    def commit(self, ext: str) -> str:
+        """Переносит файл под имя по хэшу; если такой уже есть — оставляет его."""
+        self.file.close()
+        name = self.digest.hexdigest() + ext
+        path = os.path.join(self.directory, name)
+        if os.path.exists(path):
+            os.utime(path)
+            os.unlink(self.tmp_path)
+        else:
+            # mkstemp создаёт файл 0600, а отдавать его будет и статика
+            os.chmod(self.tmp_path, 0o644)
+            os.replace(self.tmp_path, path)
+        return name
+
+    def discard(self) -> None:
+        self.file.close()
+        try:
+            os.unlink(self.tmp_path)
+        except FileNotFoundError:
+            pass
+
+
+class _FilePart:
+    """Колбэки MultipartParser: собирают данные поля file, остальные поля пропускают."""
+
+    def __init__(self):
+        self.pending: list[bytes] = []
+        self.pending_size = 0
+        self.size = 0
+        self.head = b""
+        self.found = False
+        self._in_file = False
+        self._header_field = b""
+        self._header_value = b""
+        self._disposition = b""
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self) -> None:
+        self._disposition = b""
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        if self._header_field.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        # Берём первое поле file, повторные игнорируем
+        self._in_file = options.get(b"name") == FIELD_NAME and not self.found
+        self.found = self.found or self._in_file
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if not self._in_file:
+            return
+        chunk = data[start:end]
+        if len(self.head) < SNIFF_BYTES:
+            self.head += chunk[:SNIFF_BYTES - len(self.head)]
+        self.pending.append(chunk)
+        self.pending_size += len(chunk)
+        self.size += len(chunk)
+
+    def on_part_end(self) -> None:
+        self._in_file = False
+
+    def take(self) -> bytes:
+        data = b"".join(self.pending)
+        self.pending.clear()
+        self.pending_size = 0
+        return data
+
+
+async def receive_avatar(request: Request) -> str:
+    """
+    Читает поле file из multipart-тела запроса и сохраняет его под именем по хэшу.
+    Возвращает avatar_url. 413 — файл больше AVATAR_MAX_BYTES, 415 — не картинка,
+    422 — нет поля file.
+    """
+    settings = config.avatars
+    body_limit = settings.max_bytes + MULTIPART_OVERHEAD
+    content_length = request.headers.get("content-length")
+    if content_length is not None and content_length.isdigit() and int(content_length) > body_limit:
+        raise too_large()
+
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    boundary = options.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Expected multipart/form-data with a file field"
+        )
+
+    part = _FilePart()
+    parser = MultipartParser(boundary, part.callbacks())
+    sink = await asyncio.to_thread(_Sink, settings.directory)
+    ext = None
+    try:
+        received = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > body_limit:
+                raise too_large()
+            parser.write(chunk)
+            if part.size > settings.max_bytes:
+                raise too_large()
+            if ext is None and len(part.head) >= SNIFF_BYTES:
+                ext = sniff_extension(part.head)
+                if ext is None:
+                    raise HTTPException(
+                        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                        detail=UNSUPPORTED_TYPE
+                    )
+            if part.pending_size >= settings.chunk_size:
+                await asyncio.to_thread(sink.write, part.take())
+        parser.finalize()
+
+        if not part.found:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Field 'file' is required")
+        ext = ext or sniff_extension(part.head)
+        if ext is None:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail=UNSUPPORTED_TYPE
+            )
+        if part.pending:
+            await asyncio.to_thread(sink.write, part.take())
+        name = await asyncio.to_thread(sink.commit, ext)
+    except BaseException:
+        await asyncio.to_thread(sink.discard)
+        raise
+    return f"{settings.directory}/{name}"
+
+
+async def render_avatar_variants(url: str) -> dict[str, dict[str, str]]:
+    """
+    Превью аватара по AVATAR_SIZES / AVATAR_FORMATS: {"80": {"webp": url, ...}}.
+    Файл, который не удалось декодировать, удаляется, ответ — 415.
+    """
+    settings = config.thumbnails
+    path = avatar_path(url)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    try:
+        names = await thumbnail_pool.run(
+            render_variants, path, stem, settings.sizes, settings.formats, settings.quality, settings.max_pixels
+        )
+    except DECODE_ERRORS:
+        await release_avatar(url, grace=0)
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Avatar image cannot be decoded")
+    directory = config.avatars.directory
+    return {
+        size: {fmt: f"{directory}/{name}" for fmt, name in by_format.items()}
+        for size, by_format in names.items()
+    }
+
+
+async def release_avatar(
+        url: Optional[str],
+        variants: Optional[dict] = None,
+        grace: float = REUSE_GRACE
+) -> None:
+    """
+    Фоновая задача: удаляет файл аватара и его превью, если ни один пользователь на
+    него больше не ссылается и его не загружали повторно последние grace секунд.
+    """
+    path = avatar_path(url) if url else None
+    if path is None:
+        return
+    async with sessionmaker() as session:
+        referenced = await session.scalar(select(exists().where(User.avatar_url == url)))
+    if referenced:
+        return
+    paths = [path] + [
+        variant_path
+        for by_format in (variants or {}).values()
+        for variant_url in by_format.values()
+        if (variant_path := avatar_path(variant_url)) is not None
+    ]
+
+    def remove() -> None:
+        try:
+            if time.time() - os.stat(path).st_mtime < grace:
+                return
+        except FileNotFoundError:
+            pass
+        for stale in paths:
+            try:
+                os.unlink(stale)
+            except FileNotFoundError:
+                pass
+
+    await asyncio.to_thread(remove)
@@ -0,0 +1,145 @@
+# utils/catalog.py
+"""
+Каталог игр и достижений в памяти процесса.
+
+Каталог меняется редко, поэтому чтения (list/get игр и достижений, max_progress
+при обновлении прогресса) обслуживаются из снимка в памяти. Снимок загружается
+при старте приложения и помечен версией из таблицы catalog_version.
+
+Маршруты, меняющие каталог, в той же транзакции увеличивают версию (bump) и после
+commit сбрасывают снимок своего процесса (invalidate). Остальные воркеры раз в
+CATALOG_POLL_INTERVAL секунд сверяют версию одним маленьким запросом и при
+расхождении перечитывают каталог. Всё читается из primary: со снимком реплики
+можно было бы запомнить новую версию со старыми строками.
+"""
+import asyncio
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import exc, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import config
+from database.models import Achievement, CatalogVersion, Game
+from database.session_maker import sessionmaker
+from schemas.achievements_schemas import AchievementDTO
+from schemas.game_schemas import GameDTO
+
+VERSION_QUERY = select(CatalogVersion.version).where(CatalogVersion.id == 1)
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """Неизменяемый снимок каталога; списки отсортированы по id."""
+
+    version: int
+    games: list[GameDTO] = field(default_factory=list)
+    achievements: list[AchievementDTO] = field(default_factory=list)
+    games_by_id: dict[int, GameDTO] = field(default_factory=dict)
+    games_by_code: dict[str, GameDTO] = field(default_factory=dict)
+    achievements_by_id: dict[int, AchievementDTO] = field(default_factory=dict)
+
+
+class Catalog:
+    """Снимок каталога процесса с загрузкой по требованию и фоновой сверкой версии."""
+
+    def __init__(self, poll_interval: float):
+        self.poll_interval = poll_interval
+        self._snapshot: Optional[CatalogSnapshot] = None
+        # Растёт при invalidate: загрузка, начатая до него, снимок не сохраняет
+        self._generation = 0
+        self._lock = asyncio.Lock()
+        self._poller: Optional[asyncio.Task] = None
+
+    @staticmethod
+    async def fetch_version(session: AsyncSession) -> int:
+        return (await session.scalar(VERSION_QUERY)) or 0
+
+    @staticmethod
+    async def bump(session: AsyncSession) -> None:
+        """Увеличивает версию в текущей транзакции; фиксирует её вызывающий код."""
+        stmt = insert(CatalogVersion).values(id=1, version=1)
+        await session.execute(stmt.on_conflict_do_update(
+            index_elements=[CatalogVersion.id],
+            set_={"version": CatalogVersion.version + 1}
+        ))
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._snapshot = None
+
+    async def load(self) -> CatalogSnapshot:
+        generation = self._generation
+        async with sessionmaker() as session:
+            # Версия читается раньше строк: иначе можно запомнить новую версию со старыми строками
+            version = await self.fetch_version(session)
+            games = [GameDTO.model_validate(game) for game in await session.scalars(select(Game).order_by(Game.id))]
+            achievements = [
+                AchievementDTO.model_validate(achievement)
+                for achievement in await session.scalars(select(Achievement).order_by(Achievement.id))
+            ]
+        snapshot = CatalogSnapshot(
+            version=version,
+            games=games,
+            achievements=achievements,
+            games_by_id={game.id: game for game in games},
+            games_by_code={game.code: game for game in games},
+            achievements_by_id={achievement.id: achievement for achievement in achievements},
+        )
+        if generation == self._generation:
+            self._snapshot = snapshot
+        return snapshot
+
+    async def snapshot(self) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        async with self._lock:
+            # Пока ждали блокировку, каталог мог загрузить другой запрос
+            return self._snapshot or await self.load()
+
+    async def game(self, game_id: int) -> Optional[GameDTO]:
+        return (await self.snapshot()).games_by_id.get(game_id)
+
+    async def game_by_code(self, code: str) -> Optional[GameDTO]:
+        return (await self.snapshot()).games_by_code.get(code)
+
+    async def achievement(self, achievement_id: int) -> Optional[AchievementDTO]:
+        return (await self.snapshot()).achievements_by_id.get(achievement_id)
+
+    async def refresh_if_changed(self) -> None:
+        async with sessionmaker() as session:
+            version = await self.fetch_version(session)
+        if self._snapshot is None or self._snapshot.version != version:
+            async with self._lock:
+                await self.load()
+
+    async def _run_poller(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.refresh_if_changed()
+            except (exc.DBAPIError, OSError):
+                # БД недоступна: оставляем прежний снимок до следующей попытки
+                pass
+
+    async def start(self) -> None:
+        try:
+            await self.load()
+        except (exc.DBAPIError, OSError):
+            # Загрузим при первом обращении
+            pass
+        self._poller = asyncio.create_task(self._run_poller())
+
+    async def stop(self) -> None:
+        if self._poller is not None:
+            self._poller.cancel()
+            try:
+                await self._poller
+            except asyncio.CancelledError:
+                pass
+            self._poller = None
+
+
+catalog = Catalog(poll_interval=config.catalog.poll_interval)
@@ -0,0 +1,63 @@
+# utils/etag.py
+"""
+Условные GET: сильный ETag из версии данных и ответ 304 на совпавший If-None-Match.
+
+Версию маршрут получает дешевле, чем сами данные (xmin строки, хэш xmin
+строк пользователя, версия каталога в памяти), поэтому 304 стоит одного
+маленького запроса или ни одного. В ETag входят путь и query-строка: разные
+страницы и форматы одного ресурса — разные представления.
+"""
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Сравнение для If-None-Match (RFC 9110: слабое, префикс W/ не учитывается)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class ConditionalGet:
+    """
+    Зависимость для GET-маршрутов с ETag.
+    check(*version) возвращает готовый ответ 304, если клиент прислал актуальный
+    ETag; иначе ставит ETag в заголовки ответа и возвращает None.
+    """
+
+    def __init__(self, request: Request, response: Response):
+        self.request = request
+        self.response = response
+        self.etag: Optional[str] = None
+
+    def check(self, *version) -> Optional[Response]:
+        self.etag = make_etag(self.request.url.path, self.request.url.query, *version)
+        headers = {"ETag": self.etag, "Cache-Control": CACHE_CONTROL}
+        if etag_matches(self.request.headers.get("if-none-match"), self.etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        self.response.headers.update(headers)
+        return None
+
+    def apply(self, response: Response) -> Response:
+        """ETag для ответа, который маршрут возвращает сам (например, потоковый)."""
+        if self.etag is not None:
+            response.headers["ETag"] = self.etag
+            response.headers["Cache-Control"] = CACHE_CONTROL
+        return response
@@ -0,0 +1,30 @@
+# utils/health.py
+"""
+Состояние воркера для проверок балансировщика (routers/health.py).
+
+- ready — lifespan закончил старт и прогрев (utils.warmup), воркер можно
+  ставить в ротацию;
+- draining — получен сигнал остановки (serve.py): readiness отвечает 503,
+  но начатые и приходящие запросы ещё обслуживаются до закрытия сокета.
+"""
+
+
+class WorkerState:
+    def __init__(self):
+        self.ready = False
+        self.draining = False
+        # Итог прогрева (utils.warmup.WarmupReport), для /internal/warmup
+        self.warmup = None
+
+    def mark_ready(self) -> None:
+        self.ready = True
+
+    def start_draining(self) -> None:
+        self.draining = True
+
+    @property
+    def accepting(self) -> bool:
+        return self.ready and not self.draining
+
+
+worker_state = WorkerState()
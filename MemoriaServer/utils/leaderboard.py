@@ -0,0 +1,141 @@
+# utils/leaderboard.py
+import time
+from bisect import bisect_left, insort
+from typing import Optional
+from uuid import UUID
+
+from config import config
+from utils import stat_events
+from utils.stat_events import StatChange
+
+
+class TopK:
+    """
+    Первые k игроков одной игры по (high_score DESC, user_id DESC) — тот же порядок,
+    что у запроса к БД. Держит инвариант: любой игрок вне доски хуже любого на доске.
+    Если после изменения инвариант уже нельзя гарантировать, доска помечается stale
+    и будет перечитана из БД.
+    """
+
+    def __init__(self, k: int, rows: list[tuple[UUID, Optional[str], int]]):
+        self.k = k
+        self._keys: list[tuple[int, int]] = []
+        self._entries: dict[UUID, list] = {}
+        for user_id, name, score in rows:
+            self._insert(user_id, score, name)
+        # Меньше k строк в БД — значит, на доске все игроки этой игры
+        self.exhaustive = len(rows) < k
+        self.stale = False
+        self.loaded_at = time.monotonic()
+
+    @staticmethod
+    def _key(user_id: UUID, score: int) -> tuple[int, int]:
+        return -score, -user_id.int
+
+    def _insert(self, user_id: UUID, score: int, name: Optional[str]) -> None:
+        insort(self._keys, self._key(user_id, score))
+        self._entries[user_id] = [score, name]
+
+    def _discard(self, user_id: UUID) -> None:
+        score, _ = self._entries.pop(user_id)
+        self._keys.pop(bisect_left(self._keys, self._key(user_id, score)))
+
+    def update(self, user_id: UUID, score: int) -> None:
+        if score <= 0:
+            self.remove(user_id)
+            return
+        key = self._key(user_id, score)
+        current = self._entries.get(user_id)
+        if current is not None:
+            old_key = self._key(user_id, current[0])
+            name = current[1]
+            self._discard(user_id)
+            dropped_out = not self._keys or key > self._keys[-1]
+            if not self.exhaustive and key > old_key and dropped_out:
+                # Счёт упал ниже последнего места: кто-то вне доски может быть выше
+                self.stale = True
+                return
+            self._insert(user_id, score, name)
+            return
+
+        if len(self._keys) < self.k:
+            if self.exhaustive:
+                self._insert(user_id, score, None)
+            else:
+                self.stale = True
+            return
+
+        if key < self._keys[-1]:
+            self._insert(user_id, score, None)
+            self._discard(UUID(int=-self._keys[-1][1]))
+        self.exhaustive = False
+
+    def remove(self, user_id: UUID) -> None:
+        if user_id not in self._entries:
+            return
+        self._discard(user_id)
+        if not self.exhaustive:
+            # Освободившееся место должен занять лучший игрок вне доски — он неизвестен
+            self.stale = True
+
+    def set_name(self, user_id: UUID, name: Optional[str]) -> None:
+        if user_id in self._entries:
+            self._entries[user_id][1] = name
+
+    def can_serve(self, limit: int) -> bool:
+        return limit <= self.k or self.exhaustive
+
+    def top(self, limit: int) -> list[tuple[UUID, Optional[str], int]]:
+        rows = []
+        for _, neg_user_id in self._keys[:limit]:
+            user_id = UUID(int=-neg_user_id)
+            score, name = self._entries[user_id]
+            rows.append((user_id, name, score))
+        return rows
+
+
+class Leaderboards:
+    """Доски TopK по game_id внутри процесса; обновляются событиями stat_events."""
+
+    def __init__(self, k: int, ttl: float):
+        self.k = k
+        self.ttl = ttl
+        self._boards: dict[int, TopK] = {}
+
+    def get(self, game_id: int) -> Optional[TopK]:
+        """Свежая доска игры или None, если её надо (пере)загрузить из БД."""
+        board = self._boards.get(game_id)
+        if board is None or board.stale or time.monotonic() - board.loaded_at > self.ttl:
+            return None
+        return board
+
+    def put(self, game_id: int, rows: list[tuple[UUID, Optional[str], int]]) -> TopK:
+        board = TopK(self.k, rows)
+        self._boards[game_id] = board
+        return board
+
+    def apply(self, changes: list[StatChange]) -> None:
+        for change in changes:
+            board = self._boards.get(change.game_id)
+            if board is None:
+                continue
+            if change.high_score is None:
+                board.remove(change.user_id)
+            else:
+                board.update(change.user_id, change.high_score)
+
+    def forget_name(self, user_id: UUID) -> None:
+        """Имя пользователя изменилось — подтянем заново при следующем показе."""
+        for board in self._boards.values():
+            board.set_name(user_id, None)
+
+    def remove_user(self, user_id: UUID) -> None:
+        for board in self._boards.values():
+            board.remove(user_id)
+
+    def drop_game(self, game_id: int) -> None:
+        self._boards.pop(game_id, None)
+
+
+leaderboards = Leaderboards(k=config.leaderboard.top_k, ttl=config.leaderboard.ttl)
+stat_events.subscribe(leaderboards.apply)
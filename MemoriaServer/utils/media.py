@@ -0,0 +1,269 @@
+# utils/media.py
+"""
+Раздача /media вместо StaticFiles.
+
+- Файлы с именем по хэшу содержимого (аватары и их превью, utils.avatars) не
+  меняются никогда: Cache-Control immutable на год, клиент их не перепроверяет.
+  Остальным — MEDIA_MAX_AGE и проверка по ETag / Last-Modified.
+- stat, заголовки и наличие сжатых копий (.br/.gz рядом с файлом) кэшируются на
+  MEDIA_CACHE_TTL секунд; файлы до MEDIA_INLINE_MAX байт (превью аватаров)
+  держатся в памяти целиком и отдаются без обращения к диску.
+- Range: один диапазон (206/416); несколько диапазонов отдаются целым файлом (200),
+  что RFC 9110 разрешает.
+- Тело большого файла отдаётся без копирования через расширения ASGI
+  http.response.zerocopysend / http.response.pathsend, если сервер их объявил;
+  иначе — чтением кусками в потоке, event loop диск не ждёт.
+"""
+import asyncio
+import mimetypes
+import os
+import re
+import stat
+from dataclasses import dataclass, field
+from email.utils import formatdate
+from typing import Optional
+
+from starlette.datastructures import Headers
+from starlette.types import Receive, Scope, Send
+
+from utils.cache import TTLCache
+from utils.etag import etag_matches
+
+# <sha256>.<ext> и <sha256>-<size>.<ext>
+CONTENT_HASHED = re.compile(r"^(?P<digest>[0-9a-f]{64})(-\d+)?\.[a-z0-9]+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Порядок предпочтения сжатых копий
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+@dataclass
+class MediaFile:
+    """Закэшированный результат stat с готовыми заголовками."""
+
+    path: str
+    size: int
+    headers: list[tuple[bytes, bytes]]
+    etag: str
+    body: Optional[bytes] = None
+    # Сжатые копии: content-encoding -> MediaFile
+    encoded: dict[str, "MediaFile"] = field(default_factory=dict)
+
+
+def _headers(
+        name: str,
+        st: os.stat_result,
+        etag: str,
+        max_age: int,
+        encoding: Optional[str] = None
+) -> list[tuple[bytes, bytes]]:
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    cache_control = IMMUTABLE if CONTENT_HASHED.match(name) else f"public, max-age={max_age}"
+    headers = [
+        (b"content-type", content_type.encode("latin-1")),
+        (b"cache-control", cache_control.encode("latin-1")),
+        (b"etag", etag.encode("latin-1")),
+        (b"last-modified", formatdate(st.st_mtime, usegmt=True).encode("latin-1")),
+        (b"accept-ranges", b"bytes"),
+    ]
+    if encoding is not None:
+        headers.append((b"content-encoding", encoding.encode("latin-1")))
+        headers.append((b"vary", b"accept-encoding"))
+    return headers
+
+
+class MediaFiles:
+    """ASGI-приложение для app.mount("/media", ...)."""
+
+    def __init__(
+            self,
+            directory: str,
+            max_age: int,
+            cache_entries: int,
+            cache_ttl: float,
+            inline_max: int,
+            chunk_size: int
+    ):
+        self.directory = os.path.realpath(directory)
+        self.max_age = max_age
+        self.inline_max = inline_max
+        self.chunk_size = chunk_size
+        # Отсутствующий файл тоже кэшируется (значение None)
+        self._files = TTLCache(maxsize=cache_entries, ttl=cache_ttl)
+
+    def _resolve(self, relative: str) -> Optional[str]:
+        parts = [part for part in relative.split("/") if part]
+        if not parts or any(part.startswith(".") or "\\" in part for part in parts):
+            return None
+        return os.path.join(self.directory, *parts)
+
+    def _load(self, path: str) -> Optional[MediaFile]:
+        """
+        stat и (для маленьких файлов) чтение; выполняется в потоке. Любой путь,
+        который не удалось прочитать (нет файла, нет прав, ENAMETOOLONG, нулевой
+        байт в имени — ValueError), — None, то есть 404.
+        """
+        try:
+            return self._read(path)
+        except (OSError, ValueError):
+            return None
+
+    def _read(self, path: str) -> Optional[MediaFile]:
+        st = os.stat(path)
+        if not stat.S_ISREG(st.st_mode):
+            return None
+        name = os.path.basename(path)
+        match = CONTENT_HASHED.match(name)
+        if match is not None:
+            etag = f'"{match["digest"][:32]}-{st.st_size}"'
+        else:
+            etag = f'"{int(st.st_mtime_ns):x}-{st.st_size:x}"'
+        media = MediaFile(path=path, size=st.st_size, headers=_headers(name, st, etag, self.max_age), etag=etag)
+        if st.st_size <= self.inline_max:
+            with open(path, "rb") as file:
+                media.body = file.read()
+        for encoding, suffix in ENCODINGS:
+            try:
+                encoded_st = os.stat(path + suffix)
+            except OSError:
+                continue
+            encoded_etag = f'"{etag[1:-1]}-{encoding}"'
+            media.encoded[encoding] = MediaFile(
+                path=path + suffix,
+                size=encoded_st.st_size,
+                headers=_headers(name, encoded_st, encoded_etag, self.max_age, encoding),
+                etag=encoded_etag
+            )
+        if media.encoded:
+            media.headers.append((b"vary", b"accept-encoding"))
+        return media
+
+    async def lookup(self, path: str) -> Optional[MediaFile]:
+        media = self._files.get(path, False)
+        if media is False:
+            media = await asyncio.to_thread(self._load, path)
+            self._files.set(path, media)
+        return media
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        assert scope["type"] == "http"
+        method = scope["method"]
+        if method not in ("GET", "HEAD"):
+            await self._empty(send, 405, [(b"allow", b"GET, HEAD")])
+            return
+        path = self._resolve(self._route_path(scope))
+        media = await self.lookup(path) if path is not None else None
+        if media is None:
+            await self._empty(send, 404, [(b"content-type", b"text/plain; charset=utf-8")], b"Not Found")
+            return
+
+        headers = Headers(scope=scope)
+        http_range = headers.get("range")
+        if media.encoded and http_range is None:
+            accepted = headers.get("accept-encoding", "")
+            for encoding, _ in ENCODINGS:
+                if encoding in media.encoded and encoding in accepted:
+                    media = media.encoded[encoding]
+                    break
+        response_headers = media.headers
+
+        if etag_matches(headers.get("if-none-match"), media.etag):
+            await self._empty(send, 304, response_headers)
+            return
+
+        start, end = 0, media.size
+        status = 200
+        if http_range is not None and (headers.get("if-range") in (None, media.etag)):
+            parsed = self._parse_range(http_range, media.size)
+            if parsed is None:
+                await self._empty(send, 416, [(b"content-range", f"bytes */{media.size}".encode("latin-1"))])
+                return
+            if parsed != (0, media.size):
+                start, end = parsed
+                status = 206
+                response_headers = response_headers + [
+                    (b"content-range", f"bytes {start}-{end - 1}/{media.size}".encode("latin-1"))
+                ]
+
+        response_headers = response_headers + [(b"content-length", str(end - start).encode("latin-1"))]
+        await send({"type": "http.response.start", "status": status, "headers": response_headers})
+        if method == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif media.body is not None:
+            await send({"type": "http.response.body", "body": media.body[start:end], "more_body": False})
+        else:
+            await self._send_file(scope, send, media, start, end)
+
+    @staticmethod
+    def _route_path(scope: Scope) -> str:
+        """Путь внутри точки монтирования (Mount оставляет в path полный путь)."""
+        path, root_path = scope["path"], scope.get("root_path", "")
+        return path[len(root_path):] if root_path and path.startswith(root_path) else path
+
+    @staticmethod
+    def _parse_range(http_range: str, size: int) -> Optional[tuple[int, int]]:
+        """
+        (start, end) для одного диапазона; весь файл для нескольких или синтаксически
+        неверных (в том числе last < first), их заголовок Range игнорируется;
+        None — 416.
+        """
+        match = RANGE.match(http_range.strip())
+        if match is None:
+            return 0, size
+        first, last = match.groups()
+        if not first and not last:
+            return 0, size
+        if not first:
+            suffix = int(last)
+            if suffix == 0:
+                return None
+            return max(size - suffix, 0), size
+        start = int(first)
+        if last and int(last) < start:
+            return 0, size
+        if start >= size:
+            return None
+        end = min(int(last) + 1, size) if last else size
+        return start, end
+
+    async def _send_file(self, scope: Scope, send: Send, media: MediaFile, start: int, end: int) -> None:
+        path = media.path
+        extensions = scope.get("extensions") or {}
+        if "http.response.zerocopysend" in extensions:
+            file = await asyncio.to_thread(open, path, "rb")
+            try:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file,
+                    "offset": start,
+                    "count": end - start,
+                    "more_body": False,
+                })
+            finally:
+                file.close()
+            return
+        if "http.response.pathsend" in extensions and (start, end) == (0, media.size):
+            await send({"type": "http.response.pathsend", "path": path})
+            return
+
+        file = await asyncio.to_thread(open, path, "rb")
+        try:
+            position = start
+            while position < end:
+                chunk = await asyncio.to_thread(os.pread, file.fileno(), min(self.chunk_size, end - position), position)
+                if not chunk:
+                    break
+                position += len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": position < end})
+            if position < end:
+                # Файл укоротился после stat: закрываем ответ тем, что есть
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            file.close()
+
+    @staticmethod
+    async def _empty(send: Send, status: int, headers: list, body: bytes = b"") -> None:
+        if status != 304:
+            headers = list(headers) + [(b"content-length", str(len(body)).encode("latin-1"))]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body, "more_body": False})
@@ -0,0 +1,240 @@
+# utils/metrics.py
+"""
+Метрики процесса в текстовом формате Prometheus (GET /metrics, routers/metrics.py).
+
+- MetricsMiddleware: гистограмма длительности и счётчик ответов по шаблону
+  маршрута (/api/user/{user_id}/stats, а не конкретный путь), число запросов в
+  работе, гистограмма числа SQL-запросов на HTTP-запрос;
+- instrument_engine: события before/after_cursor_execute SQLAlchemy —
+  длительность каждого выражения по типу (SELECT, INSERT, ...) и движку
+  (primary / replica);
+- при выдаче добавляются состояние пулов (database.engine_profile) и счётчики
+  буфера статистики (utils.stat_buffer).
+
+Счётчики — обычные dict и int без блокировок: всё пишется из event loop воркера
+(события SQLAlchemy async выполняются в нём же, в greenlet запроса). Каждый
+воркер serve.py считает своё, и scrape попадает в того воркера, которому
+достался запрос; pid воркера — в первой строке ответа.
+"""
+import os
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50)
+# Тип выражения для метки; всё остальное — OTHER
+OPERATIONS = frozenset(("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "COPY", "BEGIN", "COMMIT", "ROLLBACK"))
+
+# Счётчик SQL-запросов текущего HTTP-запроса; список, чтобы менять его без set()
+_request_queries: ContextVar[Optional[list]] = ContextVar("request_queries", default=None)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self, kind: str = "counter") -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {kind}"
+        for labels, value in self.values.items():
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Gauge(Counter):
+    def dec(self, labels: tuple = (), amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) - amount
+
+    def set(self, labels: tuple, value: float) -> None:
+        self.values[labels] = value
+
+    def render(self, kind: str = "gauge") -> Iterable[str]:
+        return super().render(kind)
+
+
+class _Series:
+    __slots__ = ("buckets", "sum", "count")
+
+    def __init__(self, size: int):
+        # Не накопительные: накопление — при выдаче
+        self.buckets = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: tuple, buckets: tuple):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.bounds = buckets
+        self.series: dict[tuple, _Series] = {}
+
+    def observe(self, labels: tuple, value: float) -> None:
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = _Series(len(self.bounds) + 1)
+        series.buckets[bisect_left(self.bounds, value)] += 1
+        series.sum += value
+        series.count += 1
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip((*self.bounds, "+Inf"), series.buckets):
+                cumulative += count
+                le = 'le="+Inf"' if bound == "+Inf" else f'le="{_number(bound)}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {series.sum!r}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {series.count}"
+
+
+class Metrics:
+    """Метрики процесса и сборка текста для /metrics."""
+
+    def __init__(self):
+        self.requests = Counter(
+            "http_requests_total", "HTTP responses by route template and status.",
+            ("method", "route", "status")
+        )
+        self.latency = Histogram(
+            "http_request_duration_seconds", "HTTP request latency by route template.",
+            ("method", "route"), LATENCY_BUCKETS
+        )
+        self.in_progress = Gauge("http_requests_in_progress", "HTTP requests being handled.")
+        self.request_queries = Histogram(
+            "http_request_db_queries", "SQL statements executed per HTTP request.",
+            ("method", "route"), QUERY_COUNT_BUCKETS
+        )
+        self.statements = Histogram(
+            "db_statement_duration_seconds", "SQL statement execution time.",
+            ("db", "operation"), STATEMENT_BUCKETS
+        )
+        self.statement_errors = Counter(
+            "db_statement_errors_total", "SQL statements that raised an error.",
+            ("db", "operation")
+        )
+        self.in_progress.set((), 0)
+
+    def render(self, gauges: Iterable[Gauge] = ()) -> str:
+        # pid — при запуске выдачи: с SERVER_PRELOAD объект создан ещё в мастере
+        lines = [f"# worker pid {os.getpid()}"]
+        for metric in (self.requests, self.latency, self.in_progress, self.request_queries,
+                       self.statements, self.statement_errors, *gauges):
+            lines.extend(metric.render())
+        lines.append("")
+        return "\n".join(lines)
+
+
+metrics = Metrics()
+
+
+def route_template(scope: Scope) -> str:
+    """Шаблон пути маршрута, который обработал запрос; без маршрута — одна метка на всё."""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Mount (/media) не пишет route в scope, но дописывает свой путь к root_path
+    if scope.get("endpoint") is not None and scope.get("root_path"):
+        return scope["root_path"]
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: длительность до конца тела ответа, статус, запросы в работе
+    и число SQL-запросов (их считает instrument_engine через contextvar).
+    """
+
+    def __init__(self, app: ASGIApp, registry: Metrics = metrics):
+        self.app = app
+        self.metrics = registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        queries = [0]
+        token = _request_queries.set(queries)
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        registry = self.metrics
+        registry.in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            registry.in_progress.dec()
+            _request_queries.reset(token)
+            method = scope["method"]
+            # Маршрут известен только после роутинга: Router пишет его в тот же scope
+            route = route_template(scope)
+            registry.requests.inc((method, route, status_code))
+            registry.latency.observe((method, route), elapsed)
+            registry.request_queries.observe((method, route), queries[0])
+
+
+def _operation(statement: str) -> str:
+    head = statement.lstrip()[:8].split(None, 1)
+    operation = head[0].upper() if head else ""
+    return operation if operation in OPERATIONS else "OTHER"
+
+
+def instrument_engine(engine: AsyncEngine, name: str, registry: Metrics = metrics) -> None:
+    """Вешает на движок события, которые меряют каждое выражение."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+        queries = _request_queries.get()
+        if queries is not None:
+            queries[0] += 1
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_metrics_started", None)
+        if started is not None:
+            registry.statements.observe((name, _operation(statement)), time.perf_counter() - started)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(exception_context):
+        statement = exception_context.statement or ""
+        registry.statement_errors.inc((name, _operation(statement)))
@@ -0,0 +1,103 @@
+# utils/pagination.py
+import base64
+import json
+from typing import Any, Callable, Literal, Optional, Sequence
+
+from fastapi import HTTPException, Query, Response, status
+from sqlalchemy import Select, tuple_
+
+# Размер страницы, если limit не передан; потоковая выдача без limit отдаёт всё
+DEFAULT_LIMIT = 100
+
+
+def encode_cursor(*values) -> str:
+    """Упаковывает значения ключа последней строки страницы в непрозрачный курсор."""
+    raw = json.dumps(values, default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _cast(cast: type, value):
+    """
+    JSON курсора хранит int как число, остальное (UUID, строки) — строкой
+    (encode_cursor, default=str). Значение другого JSON-типа не приводим: UUID(2)
+    или int(True) дали бы не ту ошибку или не то значение.
+    """
+    if cast is int:
+        if type(value) is not int:
+            raise TypeError(value)
+        return value
+    if not isinstance(value, str):
+        raise TypeError(value)
+    return cast(value)
+
+
+def decode_cursor(cursor: str, *types: type) -> tuple:
+    """
+    Распаковывает курсор и приводит значения к types (например, int, UUID).
+    Битый курсор или курсор другой формы — 400.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError(cursor)
+        return tuple(_cast(cast, value) for cast, value in zip(types, values))
+    except (ValueError, TypeError, AttributeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+class ListParams:
+    """
+    Общие параметры списочных маршрутов.
+    limit/cursor — keyset-пагинация по стабильному порядку, курсор следующей
+    страницы отдаётся в заголовке X-Next-Cursor (тело ответа остаётся списком).
+    Без limit отдаётся DEFAULT_LIMIT строк.
+    stream — потоковая выдача JSON-массивом или NDJSON через серверный курсор;
+    без limit она отдаёт все строки.
+    """
+
+    def __init__(
+            self,
+            limit: Optional[int] = Query(
+                None, ge=1, le=1000,
+                description=f"Размер страницы, по умолчанию {DEFAULT_LIMIT} (для stream — без ограничения)"
+            ),
+            cursor: Optional[str] = None,
+            stream: Optional[Literal["json", "ndjson"]] = None
+    ):
+        self.limit = DEFAULT_LIMIT if limit is None and stream is None else limit
+        self.cursor = cursor
+        self.stream = stream
+
+    def apply(self, stmt: Select, *columns) -> Select:
+        """Добавляет ORDER BY columns и условие "после курсора"."""
+        stmt = stmt.order_by(*columns)
+        if self.cursor is not None:
+            after = decode_cursor(self.cursor, *(c.type.python_type for c in columns))
+            stmt = stmt.where(tuple_(*columns) > after)
+        if self.limit is not None:
+            stmt = stmt.limit(self.limit)
+        return stmt
+
+    def slice(self, items: Sequence, column) -> list:
+        """То же, что apply, для списка в памяти, уже упорядоченного по column."""
+        if self.cursor is not None:
+            (after,) = decode_cursor(self.cursor, column.type.python_type)
+            items = [item for item in items if getattr(item, column.key) > after]
+        if self.limit is not None:
+            items = items[:self.limit]
+        return list(items)
+
+    def set_next_cursor(self, response: Response, items: Sequence, *columns) -> None:
+        if self.limit is not None and len(items) == self.limit:
+            last = items[-1]
+            response.headers["X-Next-Cursor"] = encode_cursor(*(getattr(last, c.key) for c in columns))
+
+    def covers(self, items: Sequence, column) -> Callable[[Any], bool]:
+        """
+        Предикат "значение column попадает в диапазон страницы items": после курсора
+        и, если страница полная, не дальше её последней строки (дальше — следующая).
+        """
+        after = decode_cursor(self.cursor, column.type.python_type)[0] if self.cursor is not None else None
+        until = getattr(items[-1], column.key) if self.limit is not None and len(items) == self.limit else None
+        return lambda value: (after is None or value > after) and (until is None or value <= until)
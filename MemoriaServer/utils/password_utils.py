@@ -1,6 +1,12 @@
 # utils/password_utils.py
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
 
+from config import config
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
@@ -12,3 +18,49 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Проверяет, что plain_password соответствует хэшированному hashed_password."""
     return pwd_context.verify(plain_password, hashed_password)
+
+
+class HashingPool:
+    """
+    Пул потоков для bcrypt, чтобы хэширование не блокировало event loop.
+    bcrypt отпускает GIL, поэтому потоки дают реальный параллелизм.
+    Если в работе и в очереди уже workers + queue_limit задач, сразу отвечаем 503.
+    """
+
+    def __init__(self, workers: int, queue_limit: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._capacity = workers + queue_limit
+        self._pending = 0
+
+    async def run(self, func, *args):
+        if self._pending >= self._capacity:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Password hashing is overloaded, try again later",
+                headers={"Retry-After": "1"}
+            )
+        # Счётчик меняется только из потока event loop, блокировка не нужна
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+hashing_pool = HashingPool(
+    workers=config.hashing.workers,
+    queue_limit=config.hashing.queue_limit
+)
+
+
+async def hash_password_async(password: str) -> str:
+    """Возвращает хэш пароля, вычисленный в пуле hashing_pool."""
+    return await hashing_pool.run(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Проверяет пароль в пуле hashing_pool, не блокируя event loop."""
+    return await hashing_pool.run(verify_password, plain_password, hashed_password)
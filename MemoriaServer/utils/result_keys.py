@@ -0,0 +1,68 @@
+# utils/result_keys.py
+"""
+Очистка game_result_keys.
+
+Ключ идемпотентности нужен, только пока клиент может повторить отправку пакета,
+поэтому ключи старше RESULT_KEY_RETENTION_HOURS удаляются фоновой задачей каждого
+воркера раз в RESULT_KEY_PRUNE_INTERVAL секунд. Удаление идёт порциями по
+RESULT_KEY_PRUNE_BATCH строк в отдельных транзакциях; воркеры, которые чистят
+одновременно, пропускают строки друг друга (database.stats_writes.prune_result_keys).
+"""
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Optional
+
+from config import ResultKeysConfig, config
+from database.session_maker import sessionmaker
+from database.stats_writes import prune_result_keys
+
+logger = logging.getLogger(__name__)
+
+
+class ResultKeyPruner:
+    """Фоновое удаление устаревших ключей идемпотентности."""
+
+    def __init__(self, settings: ResultKeysConfig):
+        self.retention = timedelta(hours=settings.retention_hours)
+        self.interval = settings.prune_interval
+        self.batch = max(settings.prune_batch, 1)
+        self._task: Optional[asyncio.Task] = None
+        self.pruned = 0
+
+    async def prune(self) -> int:
+        """Удаляет все устаревшие ключи; возвращает число удалённых."""
+        total = 0
+        while True:
+            async with sessionmaker() as session:
+                deleted = len((await session.scalars(prune_result_keys(self.retention, self.batch))).all())
+                await session.commit()
+            total += deleted
+            self.pruned += deleted
+            if deleted < self.batch:
+                return total
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.prune()
+            except Exception:
+                # БД недоступна: попробуем на следующем тике, задача не должна умирать
+                logger.exception("Pruning game result keys failed")
+
+    def start(self) -> None:
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+result_key_pruner = ResultKeyPruner(config.result_keys)
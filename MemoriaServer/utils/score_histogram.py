@@ -0,0 +1,182 @@
+# utils/score_histogram.py
+"""
+Гистограммы high_score по играм для ответа "какое у меня место и перцентиль".
+
+Счёт раскладывается по лог-линейным корзинам: значения меньше 64 получают
+собственную корзину, дальше каждая октава [2^e, 2^(e+1)) делится на 32 равные
+корзины, то есть ширина корзины не больше 1/32 (~3%) от счёта. Для всего
+диапазона Integer выходит 864 корзины, счётчики лежат в дереве Фенвика,
+поэтому место считается за O(log корзин) без обращения к БД.
+
+Погрешность: игроки из других корзин учитываются точно. Внутри своей корзины
+предполагается равномерное распределение, поэтому ошибка места не больше числа
+других игроков в той же корзине; для счёта меньше 64 место точное. Кроме того,
+гистограмма процесса видит только свои записи и пересобирается из БД раз в
+HISTOGRAM_TTL секунд, что ограничивает расхождение между воркерами.
+В расчёт входят только строки с high_score > 0, как и в лидерборде.
+
+Пересборка читает всю user_game_stats, поэтому идёт одна на процесс: первую
+ждут все запросы, а устаревшие гистограммы отдаются как есть, пока их
+пересобирает фоновая задача.
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+from config import config
+from utils import stat_events
+from utils.stat_events import StatChange
+
+LINEAR_LIMIT = 64
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+BUCKETS = LINEAR_LIMIT + (31 - 6) * SUB_BUCKETS
+
+logger = logging.getLogger(__name__)
+
+
+def bucket_of(score: int) -> int:
+    if score < LINEAR_LIMIT:
+        return score
+    exponent = score.bit_length() - 1
+    shift = exponent - SUB_BUCKET_BITS
+    return LINEAR_LIMIT + (exponent - 6) * SUB_BUCKETS + ((score >> shift) - SUB_BUCKETS)
+
+
+def bucket_bounds(bucket: int) -> tuple[int, int]:
+    """Нижняя граница корзины и её ширина."""
+    if bucket < LINEAR_LIMIT:
+        return bucket, 1
+    exponent, sub = divmod(bucket - LINEAR_LIMIT, SUB_BUCKETS)
+    shift = exponent + 6 - SUB_BUCKET_BITS
+    return (SUB_BUCKETS + sub) << shift, 1 << shift
+
+
+class ScoreHistogram:
+    """Счётчики игроков по корзинам одной игры на дереве Фенвика."""
+
+    def __init__(self):
+        self._tree = [0] * (BUCKETS + 1)
+        self._counts = [0] * BUCKETS
+        self.total = 0
+
+    def add(self, score: int, count: int = 1) -> None:
+        if score <= 0:
+            return
+        bucket = bucket_of(score)
+        self._counts[bucket] += count
+        self.total += count
+        i = bucket + 1
+        while i <= BUCKETS:
+            self._tree[i] += count
+            i += i & -i
+
+    def remove(self, score: int) -> None:
+        self.add(score, -1)
+
+    def _count_upto(self, bucket: int) -> int:
+        result = 0
+        i = bucket + 1
+        while i > 0:
+            result += self._tree[i]
+            i -= i & -i
+        return result
+
+    def rank(self, score: int) -> Optional[tuple[int, float]]:
+        """
+        Оценка места (1 — лучший; у равных счетов место одно) и перцентиля (доля
+        остальных игроков со счётом не выше, %) для игрока с этим счётом, который
+        сам учтён в гистограмме.
+        """
+        if score <= 0 or self.total <= 0:
+            return None
+        bucket = bucket_of(score)
+        higher = self.total - self._count_upto(bucket)
+        others = max(self._counts[bucket] - 1, 0)
+        low, width = bucket_bounds(bucket)
+        # Доля соседей по корзине, которые выше, при равномерном распределении внутри неё
+        higher_in_bucket = round(others * (low + width - 1 - score) / width)
+        lower = self.total - 1 - higher - higher_in_bucket
+        percentile = 100.0 * lower / (self.total - 1) if self.total > 1 else 100.0
+        return higher + higher_in_bucket + 1, percentile
+
+
+class ScoreHistograms:
+    """Гистограммы всех игр процесса, поддерживаются событиями stat_events."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._games: dict[int, ScoreHistogram] = {}
+        self.built_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._rebuild: Optional[asyncio.Task] = None
+
+    @property
+    def fresh(self) -> bool:
+        return self.built_at is not None and time.monotonic() - self.built_at <= self.ttl
+
+    def build(self, rows) -> None:
+        """Пересобирает всё из строк (game_id, high_score, count)."""
+        games: dict[int, ScoreHistogram] = {}
+        for game_id, score, count in rows:
+            games.setdefault(game_id, ScoreHistogram()).add(score, count)
+        self._games = games
+        self.built_at = time.monotonic()
+
+    async def ensure(self, load: Callable[[], Awaitable[list]]) -> None:
+        """
+        Гарантирует, что гистограммы собраны; load возвращает строки для build.
+        Первая сборка — под блокировкой, остальные запросы ждут её. Устаревшие
+        гистограммы остаются в работе, пересборку запускаем одну в фоне.
+        """
+        if self.fresh:
+            return
+        if self.built_at is None:
+            async with self._lock:
+                if self.built_at is None:
+                    self.build(await load())
+            return
+        if self._rebuild is None or self._rebuild.done():
+            self._rebuild = asyncio.create_task(self._refresh(load))
+
+    async def _refresh(self, load: Callable[[], Awaitable[list]]) -> None:
+        try:
+            self.build(await load())
+        except Exception:
+            # Отдаём старые гистограммы, следующий запрос попробует снова
+            logger.exception("Score histogram rebuild failed")
+
+    async def stop(self) -> None:
+        if self._rebuild is not None:
+            self._rebuild.cancel()
+            try:
+                await self._rebuild
+            except asyncio.CancelledError:
+                pass
+            self._rebuild = None
+
+    def rank(self, game_id: int, score: int) -> Optional[tuple[int, float]]:
+        histogram = self._games.get(game_id)
+        return histogram.rank(score) if histogram is not None else None
+
+    def total(self, game_id: int) -> int:
+        histogram = self._games.get(game_id)
+        return histogram.total if histogram is not None else 0
+
+    def apply(self, changes: list[StatChange]) -> None:
+        if self.built_at is None:
+            return
+        for change in changes:
+            histogram = self._games.setdefault(change.game_id, ScoreHistogram())
+            if change.previous_high_score is not None:
+                histogram.remove(change.previous_high_score)
+            if change.high_score is not None:
+                histogram.add(change.high_score)
+
+    def drop_game(self, game_id: int) -> None:
+        self._games.pop(game_id, None)
+
+
+histograms = ScoreHistograms(ttl=config.leaderboard.histogram_ttl)
+stat_events.subscribe(histograms.apply)
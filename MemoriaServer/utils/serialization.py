@@ -0,0 +1,121 @@
+# utils/serialization.py
+"""
+Быстрый путь ответа: ORM-объекты и строки Core сразу в байты через orjson.
+
+Обычный путь FastAPI при response_model: маршрут строит DTO (from_orm), FastAPI
+ещё раз валидирует их по response_model, переводит в jsonable-структуру и только
+потом json.dumps. Здесь для каждого DTO один раз компилируется функция, которая
+берёт поля атрибутами объекта в dict, и orjson сериализует результат: datetime,
+вложенные списки и uuid.UUID он понимает сам, а подкласс UUID из asyncpg
+(pgproto.UUID) переводит в строку _default. Валидации нет: данные уже прошли
+типы колонок БД. response_model в маршрутах остаётся для схемы OpenAPI.
+"""
+import typing
+from typing import Any, Callable, Iterable, Optional, Type
+from uuid import UUID
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+# Z вместо +00:00 — как у pydantic
+ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+
+def _default(value: Any) -> Any:
+    # orjson понимает только сам uuid.UUID, а asyncpg отдаёт свой подкласс
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError
+
+
+def to_json(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+_serializers: dict[type, Callable[[Any], dict]] = {}
+
+
+def _nested_model(annotation) -> Optional[tuple[str, Type[BaseModel]]]:
+    """("one"|"list", модель) для полей-моделей и списков моделей, иначе None."""
+    args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+    if typing.get_origin(annotation) in (list, typing.List) and args:
+        inner = args[0]
+        if isinstance(inner, type) and issubclass(inner, BaseModel):
+            return "list", inner
+        return None
+    if args and typing.get_origin(annotation) is typing.Union and len(args) == 1:
+        return _nested_model(args[0])
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return "one", annotation
+    return None
+
+
+def _compile(dto: Type[BaseModel]) -> Callable[[Any], dict]:
+    namespace: dict[str, Any] = {}
+    items = []
+    for name, field in dto.model_fields.items():
+        key = field.serialization_alias or field.alias or name
+        value = f"obj.{name}"
+        nested = _nested_model(field.annotation)
+        if nested is not None:
+            kind, model = nested
+            namespace[f"_{name}"] = serializer(model)
+            if kind == "list":
+                value = f"[_{name}(item) for item in obj.{name}]"
+            else:
+                value = f"(None if obj.{name} is None else _{name}(obj.{name}))"
+        items.append(f"{key!r}: {value}")
+    source = f"def serialize(obj):\n    return {{{', '.join(items)}}}\n"
+    exec(source, namespace)
+    return namespace["serialize"]
+
+
+def serializer(dto: Type[BaseModel]) -> Callable[[Any], dict]:
+    """Функция obj -> dict по полям dto; компилируется один раз на DTO."""
+    serialize = _serializers.get(dto)
+    if serialize is None:
+        serialize = _serializers[dto] = _compile(dto)
+    return serialize
+
+
+def dumps(obj: Any, dto: Type[BaseModel]) -> bytes:
+    return to_json(serializer(dto)(obj))
+
+
+def dumps_many(objs: Iterable[Any], dto: Type[BaseModel]) -> bytes:
+    serialize = serializer(dto)
+    return to_json([serialize(obj) for obj in objs])
+
+
+class FastJSONResponse(Response):
+    """JSON-ответ через orjson; готовые байты отдаются как есть."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return to_json(content)
+
+
+def fast_response(
+        content: Any,
+        dto: Optional[Type[BaseModel]] = None,
+        *,
+        many: bool = False,
+        response: Optional[Response] = None,
+        status_code: int = 200
+) -> FastJSONResponse:
+    """
+    Ответ маршрута в обход response_model. dto — как сериализовать content
+    (ORM-объект, Row или их список при many=True); без dto content сериализуется
+    как есть. response — внедрённый Response маршрута, его заголовки
+    (ETag, X-Next-Cursor, cookie) переносятся в ответ.
+    """
+    if dto is not None:
+        content = dumps_many(content, dto) if many else dumps(content, dto)
+    result = FastJSONResponse(content, status_code=status_code)
+    if response is not None:
+        result.raw_headers.extend(response.raw_headers)
+    return result
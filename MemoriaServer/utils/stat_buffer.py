@@ -0,0 +1,382 @@
+# utils/stat_buffer.py
+"""
+Write-behind для счётчиков user_game_stats (STAT_WRITE_BEHIND=true).
+
+Результаты партий не пишутся в БД по одному: в памяти воркера они сворачиваются
+по (user_id, game_id) так же, как fold_results сворачивает пакет (games_played
+складывается, high_score — максимум, stats сливаются), и раз в
+STAT_FLUSH_INTERVAL_MS или при STAT_FLUSH_ENTRIES строк сбрасываются одним
+многострочным upsert (result_upsert + with_previous_high_score, с пересчётом
+достижений). Горячий пользователь за интервал даёт одну строку вместо десятков
+транзакций.
+
+Потери ограничены: в буфере не больше STAT_MAX_UNFLUSHED строк (запрос сверх
+предела ждёт сброса), при остановке воркера буфер сбрасывается (stop в lifespan).
+Теряется только то, что накопилось с последнего сброса до аварийного завершения.
+
+Чтения в этом воркере (get_user_stat_for_game, list_user_stats, профиль)
+накладывают несброшенные дельты на строки из БД, ETag учитывает их версию.
+Дельты других воркеров видны после их сброса, то есть с задержкой до интервала.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Mapping, Optional
+from uuid import UUID
+
+import orjson
+from fastapi import HTTPException, status
+from sqlalchemy import exc
+
+from config import StatBufferConfig, config
+from database.models import UserGameStat
+from database.session_maker import sessionmaker
+from database.stats_writes import result_upsert, with_previous_high_score
+from schemas.game_schemas import GameDTO
+from utils.stat_events import publish_records
+
+Key = tuple[UUID, int]
+
+# Классы SQLSTATE, в которых виновата сама строка: data exception (22003 —
+# переполнение счётчика) и integrity constraint violation (23503 — удалённый
+# пользователь или игра). Остальное (40P01, 40001, 57014, ошибки соединения)
+# проходит при повторе, и пачка возвращается в буфер
+ROW_ERROR_CLASSES = ("22", "23")
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PendingStat:
+    """Свёрнутые несброшенные результаты одной пары (user_id, game_id)."""
+
+    games_played: int = 0
+    high_score: Optional[int] = None
+    stats: dict = field(default_factory=dict)
+
+    def add(self, games_played: int, high_score: Optional[int], stats: dict) -> None:
+        self.games_played += games_played
+        if high_score is not None and (self.high_score is None or high_score > self.high_score):
+            self.high_score = high_score
+        self.stats.update(stats)
+
+
+class StatBuffer:
+    """Буфер результатов партий процесса с фоновым сбросом."""
+
+    def __init__(self, settings: StatBufferConfig):
+        self.enabled = settings.enabled
+        self.flush_interval = settings.flush_interval
+        self.flush_entries = max(settings.flush_entries, 1)
+        self.max_unflushed = max(settings.max_unflushed, 1)
+        self._pending: dict[Key, PendingStat] = {}
+        # Пачка, которая пишется прямо сейчас: до commit чтения учитывают и её
+        self._inflight: dict[Key, PendingStat] = {}
+        self._by_user: dict[UUID, set[int]] = {}
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+        # Счётчики для /internal/stat-buffer
+        self.flushed = 0
+        self.flushes = 0
+        self.failures = 0
+        self.dropped = 0
+
+    # --- запись ---
+
+    async def add(self, user_id: UUID, game_id: int, score: int, stats: dict) -> None:
+        key = (user_id, game_id)
+        while key not in self._pending and len(self._pending) >= self.max_unflushed:
+            # Предел потерь: новая строка ждёт, пока буфер не будет сброшен
+            try:
+                await self.flush()
+            except (exc.SQLAlchemyError, OSError):
+                # В том числе TimeoutError пула: соединений нет, буфер полон
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Stats buffer is full, try again later",
+                    headers={"Retry-After": "1"}
+                )
+        entry = self._pending.get(key)
+        if entry is None:
+            entry = self._pending[key] = PendingStat()
+            self._by_user.setdefault(user_id, set()).add(game_id)
+        entry.add(1, score, stats)
+        if len(self._pending) >= self.flush_entries:
+            self._wakeup.set()
+
+    async def drain(self, user_id: UUID, game_id: int) -> None:
+        """Сбрасывает буфер, если в нём есть строка пары: перед записью абсолютных значений."""
+        if (user_id, game_id) in self._pending or (user_id, game_id) in self._inflight:
+            await self.flush()
+
+    def forget_user(self, user_id: UUID) -> None:
+        """Выбрасывает несброшенные результаты удалённого пользователя."""
+        for game_id in self._by_user.pop(user_id, ()):
+            self._pending.pop((user_id, game_id), None)
+
+    def _restore(self, batch: dict[Key, PendingStat]) -> None:
+        """Возвращает несохранённую пачку в буфер поверх пришедших за это время результатов."""
+        for key, entry in batch.items():
+            newer = self._pending.get(key)
+            if newer is not None:
+                entry.add(newer.games_played, newer.high_score, newer.stats)
+            self._pending[key] = entry
+            self._by_user.setdefault(key[0], set()).add(key[1])
+
+    async def flush(self) -> None:
+        written: list = []
+        async with self._lock:
+            if not self._pending:
+                return
+            batch, self._pending, self._by_user = self._pending, {}, {}
+            self._inflight = batch
+            try:
+                await self._write(batch, written)
+            except BaseException:
+                # В batch остались только незаписанные строки
+                self._restore(batch)
+                raise
+            finally:
+                self._inflight = {}
+                self.flushed += len(written)
+                publish_records(written)
+            self.flushes += 1
+
+    @staticmethod
+    def _values(key: Key, entry: PendingStat) -> dict:
+        return {
+            "user_id": key[0],
+            "game_id": key[1],
+            "high_score": entry.high_score,
+            "games_played": entry.games_played,
+            "stats": entry.stats
+        }
+
+    @staticmethod
+    def _is_row_error(error: exc.DBAPIError) -> bool:
+        """Ошибка из-за данных строки (FK, переполнение, check), которая не пройдёт и при повторе."""
+        sqlstate = getattr(error.orig, "sqlstate", None) or ""
+        return not error.connection_invalidated and sqlstate[:2] in ROW_ERROR_CLASSES
+
+    async def _write(self, batch: dict[Key, PendingStat], written: list) -> None:
+        """
+        Пишет batch; записанные строки RETURNING добавляет в written, а их ключи
+        удаляет из batch — при исключении в batch остаётся только незаписанное.
+        """
+        # Порядок ключей одинаковый во всех воркерах — блокировки строк берутся в одном порядке
+        keys = sorted(batch, key=lambda key: (str(key[0]), key[1]))
+        async with sessionmaker() as session:
+            try:
+                rows = []
+                # Кусками: у asyncpg предел в 32767 параметров на запрос
+                for start in range(0, len(keys), self.flush_entries):
+                    chunk = keys[start:start + self.flush_entries]
+                    rows.extend(await self._upsert(session, [self._values(key, batch[key]) for key in chunk]))
+                await session.commit()
+                written.extend(rows)
+                batch.clear()
+                return
+            except exc.DBAPIError as error:
+                await session.rollback()
+                if not self._is_row_error(error):
+                    raise
+
+            # Пачку отвергла одна из строк (удалённый пользователь или игра,
+            # переполнение счётчика): пишем по одной, такие строки выбрасываем,
+            # иначе они возвращались бы в буфер и блокировали каждый сброс
+            for key in keys:
+                try:
+                    rows = await self._upsert(session, [self._values(key, batch[key])])
+                    await session.commit()
+                except exc.DBAPIError as error:
+                    await session.rollback()
+                    if not self._is_row_error(error):
+                        raise
+                    self.dropped += 1
+                    logger.warning("Dropping buffered stats for %s: %s", key, error.orig)
+                    del batch[key]
+                    continue
+                written.extend(rows)
+                del batch[key]
+
+    @staticmethod
+    async def _upsert(session, values: list[dict]) -> list:
+        stmt = with_previous_high_score(
+            result_upsert(values),
+            [(row["user_id"], row["game_id"]) for row in values],
+            achievements=True
+        )
+        return (await session.execute(stmt)).all()
+
+    # --- чтение ---
+
+    def pending_for(self, user_id: UUID) -> dict[int, PendingStat]:
+        """Несброшенные дельты пользователя по game_id (включая пишущуюся пачку)."""
+        result: dict[int, PendingStat] = {}
+        for game_id in self._by_user.get(user_id, ()):
+            entry = self._pending[(user_id, game_id)]
+            result[game_id] = PendingStat(entry.games_played, entry.high_score, dict(entry.stats))
+        if self._inflight:
+            for (inflight_user, game_id), entry in self._inflight.items():
+                if inflight_user == user_id:
+                    merged = result.setdefault(game_id, PendingStat())
+                    merged.add(entry.games_played, entry.high_score, entry.stats)
+        return result
+
+    def version(self, user_id: UUID) -> tuple:
+        """Часть ETag: несброшенные дельты пользователя."""
+        if not self._by_user.get(user_id) and not self._inflight:
+            return ()
+        return tuple(sorted(
+            (game_id, entry.games_played, entry.high_score)
+            for game_id, entry in self.pending_for(user_id).items()
+        ))
+
+    @staticmethod
+    def _apply(record: Optional[UserGameStat], user_id: UUID, game_id: int, entry: PendingStat) -> UserGameStat:
+        """Новый несвязанный с сессией объект: строка из БД с наложенной дельтой."""
+        if record is None:
+            return UserGameStat(
+                user_id=user_id,
+                game_id=game_id,
+                high_score=entry.high_score,
+                games_played=entry.games_played,
+                stats=entry.stats
+            )
+        high_score = record.high_score
+        if entry.high_score is not None and entry.high_score > high_score:
+            high_score = entry.high_score
+        return UserGameStat(
+            user_id=user_id,
+            game_id=game_id,
+            high_score=high_score,
+            games_played=record.games_played + entry.games_played,
+            stats={**(record.stats or {}), **entry.stats},
+            updated_at=record.updated_at
+        )
+
+    def merge(self, user_id: UUID, game_id: int, record: Optional[UserGameStat]) -> Optional[UserGameStat]:
+        entry = self.pending_for(user_id).get(game_id)
+        if entry is None:
+            return record
+        return self._apply(record, user_id, game_id, entry)
+
+    def merge_many(
+            self,
+            user_id: UUID,
+            records: Iterable[UserGameStat],
+            include: Optional[Callable[[int], bool]] = None
+    ) -> list[UserGameStat]:
+        """
+        Накладывает дельты на строки списка (он упорядочен по game_id). Игры, строк
+        которых ещё нет в БД, добавляются, если include(game_id) — то есть game_id
+        попадает в диапазон или набор, который покрывает список; порядок сохраняется.
+        """
+        pending = self.pending_for(user_id)
+        if not pending:
+            return list(records)
+        merged = [
+            self._apply(record, user_id, record.game_id, pending.pop(record.game_id))
+            if record.game_id in pending else record
+            for record in records
+        ]
+        if include is None:
+            return merged
+        missing = [
+            self._apply(None, user_id, game_id, entry)
+            for game_id, entry in pending.items() if include(game_id)
+        ]
+        if not missing:
+            return merged
+        return sorted([*merged, *missing], key=lambda record: record.game_id)
+
+    def has_pending(self, user_id: UUID) -> bool:
+        return bool(self._by_user.get(user_id)) or any(key[0] == user_id for key in self._inflight)
+
+    async def drain_user(self, user_id: UUID) -> None:
+        """Сбрасывает буфер, если в нём есть строки пользователя: перед чтением без наложения дельт."""
+        if self.has_pending(user_id):
+            await self.flush()
+
+    def merge_profile(self, user_id: UUID, document: bytes, games: Mapping[int, GameDTO]) -> bytes:
+        """
+        Накладывает дельты на stats документа профиля (database/profile.py).
+        Игры, строк которых ещё нет в БД, добавляются с кодом и названием из
+        каталога games; игры, которой нет в каталоге, строка не переживёт сброс.
+        """
+        pending = self.pending_for(user_id)
+        if not pending:
+            return document
+        profile = orjson.loads(document)
+        for item in profile["stats"]:
+            entry = pending.pop(item["game_id"], None)
+            if entry is not None:
+                item["games_played"] += entry.games_played
+                if entry.high_score is not None and entry.high_score > item["high_score"]:
+                    item["high_score"] = entry.high_score
+        missing = [
+            {
+                "user_id": str(user_id),
+                "game_id": game_id,
+                "high_score": entry.high_score,
+                "games_played": entry.games_played,
+                "game_code": games[game_id].code,
+                "game_name": games[game_id].name,
+            }
+            for game_id, entry in pending.items() if game_id in games
+        ]
+        if missing:
+            profile["stats"] = sorted([*profile["stats"], *missing], key=lambda item: item["game_id"])
+        return orjson.dumps(profile)
+
+    # --- жизненный цикл ---
+
+    async def _run_flusher(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                # БД или пул недоступны: пачка вернулась в буфер, попробуем на
+                # следующем тике. Задача не должна умирать ни от какой ошибки
+                self.failures += 1
+                logger.exception("Stats buffer flush failed, %d rows kept", len(self._pending))
+
+    def start(self) -> None:
+        if self.enabled and self._flusher is None:
+            self._flusher = asyncio.create_task(self._run_flusher())
+
+    async def stop(self) -> None:
+        """Останавливает фоновый сброс и сбрасывает остаток буфера."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        try:
+            await self.flush()
+        except Exception:
+            self.failures += 1
+            self.dropped += len(self._pending)
+            logger.exception("Final stats buffer flush failed, %d rows lost", len(self._pending))
+
+    def status(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "pending": len(self._pending),
+            "inflight": len(self._inflight),
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed,
+            "failures": self.failures,
+            "dropped_rows": self.dropped,
+        }
+
+
+stat_buffer = StatBuffer(config.stat_buffer)
@@ -0,0 +1,38 @@
+# utils/stat_events.py
+from typing import Callable, Iterable, NamedTuple, Optional
+from uuid import UUID
+
+
+class StatChange(NamedTuple):
+    """
+    Изменение строки user_game_stats после commit.
+    high_score=None — строка удалена, previous_high_score=None — строки не было.
+    """
+    user_id: UUID
+    game_id: int
+    high_score: Optional[int]
+    previous_high_score: Optional[int]
+
+
+_subscribers: list[Callable[[list[StatChange]], None]] = []
+
+
+def subscribe(callback: Callable[[list[StatChange]], None]) -> None:
+    """Регистрирует обработчик изменений статистики (in-memory структуры процесса)."""
+    _subscribers.append(callback)
+
+
+def publish(changes: Iterable[StatChange]) -> None:
+    changes = list(changes)
+    if not changes:
+        return
+    for callback in _subscribers:
+        callback(changes)
+
+
+def publish_records(rows: Iterable[tuple]) -> None:
+    """Публикует пары (UserGameStat, previous_high_score), например из with_previous_high_score."""
+    publish(
+        StatChange(record.user_id, record.game_id, record.high_score, previous)
+        for record, previous in rows
+    )
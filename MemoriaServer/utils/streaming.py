@@ -0,0 +1,64 @@
+# utils/streaming.py
+from typing import AsyncIterator, Literal, Optional, Sequence, Type
+
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from database.session_maker import sessionmaker
+from utils.serialization import serializer, to_json
+
+STREAM_BATCH_SIZE = 500
+
+
+async def iter_json(
+        stmt: Select,
+        dto: Type[BaseModel],
+        fmt: Literal["json", "ndjson"],
+        bind: Optional[AsyncEngine] = None
+) -> AsyncIterator[bytes]:
+    """
+    Читает строки серверным курсором (session.stream_scalars) порциями
+    STREAM_BATCH_SIZE и сразу сериализует их, поэтому память не растёт с таблицей.
+    Каждая порция уходит одним куском; сериализация — компилированный serializer + orjson.
+    Сессия своя: сессия зависимости закрывается до отправки тела ответа.
+    bind — движок сессии маршрута (например, реплики), по умолчанию primary.
+    """
+    serialize = serializer(dto)
+    async with sessionmaker(bind=bind) if bind is not None else sessionmaker() as session:
+        result = await session.stream_scalars(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+        if fmt == "ndjson":
+            async for batch in result.partitions():
+                yield b"".join(to_json(serialize(obj)) + b"\n" for obj in batch)
+            return
+
+        yield b"["
+        separator = b""
+        async for batch in result.partitions():
+            yield separator + b",".join(to_json(serialize(obj)) for obj in batch)
+            separator = b","
+        yield b"]"
+
+
+def stream_response(
+        stmt: Select,
+        dto: Type[BaseModel],
+        fmt: Literal["json", "ndjson"],
+        bind: Optional[AsyncEngine] = None
+) -> StreamingResponse:
+    media_type = "application/x-ndjson" if fmt == "ndjson" else "application/json"
+    return StreamingResponse(iter_json(stmt, dto, fmt, bind), media_type=media_type)
+
+
+def items_response(
+        items: Sequence,
+        dto: Type[BaseModel],
+        fmt: Literal["json", "ndjson"]
+) -> Response:
+    """Ответ в формате stream для списка, который уже в памяти (например, каталог)."""
+    serialize = serializer(dto)
+    if fmt == "ndjson":
+        body = b"".join(to_json(serialize(item)) + b"\n" for item in items)
+        return Response(body, media_type="application/x-ndjson")
+    return Response(to_json([serialize(item) for item in items]), media_type="application/json")
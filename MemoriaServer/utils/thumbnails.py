@@ -0,0 +1,152 @@
+# utils/thumbnails.py
+"""
+Превью аватаров: декодирование, поворот по EXIF, квадратная обрезка и набор
+размеров AVATAR_SIZES в форматах AVATAR_FORMATS без метаданных исходника.
+
+Работа с картинками упирается в CPU и держит GIL, поэтому выполняется в пуле
+процессов, а не в потоках. Модуль намеренно не импортирует ничего из database:
+дочерние процессы запускаются через spawn и импортируют только его.
+"""
+import asyncio
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from fastapi import HTTPException, status
+from PIL import Image, ImageOps
+
+from config import config
+
+EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+SAVE_OPTIONS = {
+    "webp": {"format": "WEBP", "method": 4},
+    "jpeg": {"format": "JPEG", "optimize": True, "progressive": True},
+}
+# Ошибки декодирования: не картинка, обрезанный файл, слишком много пикселей
+DECODE_ERRORS = (OSError, SyntaxError, ValueError, Image.DecompressionBombError)
+
+
+def variant_names(stem: str, sizes: tuple, formats: tuple) -> dict[str, dict[str, str]]:
+    return {str(size): {fmt: f"{stem}-{size}.{EXTENSIONS[fmt]}" for fmt in formats} for size in sizes}
+
+
+def _save(image: Image.Image, path: str, fmt: str, quality: int) -> None:
+    if fmt == "jpeg" and image.mode != "RGB":
+        # У JPEG нет прозрачности: подкладываем белый фон
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".thumb-")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            # exif/icc_profile не передаются — метаданные исходника не попадают в превью
+            image.save(file, quality=quality, **SAVE_OPTIONS[fmt])
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def render_variants(
+        source: str,
+        stem: str,
+        sizes: tuple,
+        formats: tuple,
+        quality: int,
+        max_pixels: int
+) -> dict[str, dict[str, str]]:
+    """
+    Рендерит превью source рядом с ним под именами <stem>-<size>.<ext> и возвращает
+    их имена по размеру и формату. Уже существующие превью (тот же хэш исходника)
+    не пересчитываются. Выполняется в дочернем процессе.
+    """
+    directory = os.path.dirname(source)
+    names = variant_names(stem, sizes, formats)
+    if all(os.path.exists(os.path.join(directory, name)) for by_format in names.values() for name in by_format.values()):
+        return names
+
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    largest = max(sizes)
+    with Image.open(source) as image:
+        # Pillow сам бросает DecompressionBombError только начиная с 2 * MAX_IMAGE_PIXELS,
+        # между пределом и удвоенным пределом лишь предупреждает
+        width, height = image.size
+        if width * height > max_pixels:
+            raise Image.DecompressionBombError(f"Image size ({width * height} pixels) exceeds limit of {max_pixels}")
+        # JPEG декодируется сразу в уменьшенном масштабе (не меньше largest по каждой стороне)
+        image.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+    # Меньшие размеры считаются из уже уменьшенного, а не из исходника
+    current = image
+    for size in sorted(sizes, reverse=True):
+        if current.size != (size, size):
+            current = ImageOps.fit(current, (size, size), Image.Resampling.LANCZOS)
+        for fmt, name in names[str(size)].items():
+            _save(current, os.path.join(directory, name), fmt, quality)
+    return names
+
+
+class ThumbnailPool:
+    """
+    Пул процессов для превью. Процессы стартуют при первой задаче (spawn: без копии
+    event loop и соединений родителя). Если в работе и в очереди уже
+    workers + queue_limit задач, сразу отвечаем 503.
+
+    Если дочерний процесс погиб (OOM killer, segfault в декодере), executor
+    становится непригодным навсегда: такой пул выбрасываем, текущие задачи
+    получают 503, следующая задача создаёт новый.
+    """
+
+    def __init__(self, workers: int, queue_limit: int):
+        self._workers = workers
+        self._capacity = workers + queue_limit
+        self._pending = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    async def run(self, func, *args):
+        if self._pending >= self._capacity:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Image processing is overloaded, try again later",
+                headers={"Retry-After": "1"}
+            )
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        executor = self._executor
+        # Счётчик меняется только из потока event loop, блокировка не нужна
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        except BrokenProcessPool:
+            # Пул могли уже заменить по ошибке другой задачи из того же пула
+            if self._executor is executor:
+                self._executor = None
+                executor.shutdown(wait=False, cancel_futures=True)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Image processing worker crashed, try again later",
+                headers={"Retry-After": "1"}
+            )
+        finally:
+            self._pending -= 1
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+thumbnail_pool = ThumbnailPool(
+    workers=config.thumbnails.workers,
+    queue_limit=config.thumbnails.queue_limit
+)
@@ -0,0 +1,119 @@
+# utils/warmup.py
+"""
+Прогрев воркера в lifespan до того, как readiness начнёт отвечать 200.
+
+Без него первые запросы после деплоя платят за:
+- установку соединений asyncpg (TCP, TLS, аутентификация);
+- интроспекцию типов (json, uuid) на каждом новом соединении;
+- подготовку выражений, у asyncpg кэш prepared statements свой у каждого соединения;
+- компиляцию SQLAlchemy, кэш которой общий на движок и ключ которого — структура
+  выражения, а не объект.
+
+Поэтому открываются сразу DB_WARMUP_CONNECTIONS соединений пула, и на каждом
+выполняются горячие запросы той же формы, что в маршрутах, с заведомо пустым
+результатом. То же делается для движков здоровых реплик, на которые уходят
+чтения. Каждый движок прогревается независимо со своим таймаутом: недоступная
+реплика не отменяет прогрев primary, её ошибка попадает в отчёт по имени движка.
+Ошибки БД старт не прерывают: readiness сама проверит базу, а соединения
+откроются по требованию.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from uuid import UUID
+
+from sqlalchemy import exc, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from config import EngineConfig
+from database.models import User, UserAchievement, UserGameStat
+from database.profile import profile_statement
+from database.row_versions import rows_version
+from utils.catalog import VERSION_QUERY
+from utils.pagination import ListParams
+
+# Ни одной строки с таким ключом нет — запросы проходят весь путь и ничего не читают
+NO_USER = UUID(int=0)
+
+
+def hot_statements() -> list:
+    """Запросы горячих маршрутов; форма должна совпадать с маршрутами, значения — нет."""
+    return [
+        # Вход и get_current_user
+        select(User).where(User.email == ""),
+        # GET /user/get/{id}
+        select(User, literal_column("users.xmin")).where(User.id == NO_USER),
+        # GET /user/{id}/stats: версия для ETag и страница по умолчанию (LIMIT DEFAULT_LIMIT)
+        select(rows_version(UserGameStat, UserGameStat.game_id)).where(UserGameStat.user_id == NO_USER),
+        ListParams(limit=None, cursor=None, stream=None).apply(
+            select(UserGameStat).where(UserGameStat.user_id == NO_USER),
+            UserGameStat.game_id
+        ),
+        # GET /user/{id}/stats/{game_id}
+        select(UserGameStat).where(UserGameStat.user_id == NO_USER, UserGameStat.game_id == 0),
+        # GET /user/{id}/achievements
+        select(rows_version(UserAchievement, UserAchievement.achievement_id))
+        .where(UserAchievement.user_id == NO_USER),
+        # GET /user/{id}/profile
+        profile_statement(NO_USER),
+        # Сверка версии каталога (фоновая задача utils.catalog)
+        VERSION_QUERY,
+    ]
+
+
+@dataclass
+class WarmupReport:
+    duration_ms: float = 0.0
+    connections: int = 0
+    statements: int = 0
+    # Имя движка -> ошибка его прогрева
+    errors: dict[str, str] = field(default_factory=dict)
+
+
+async def _warm_connection(conn, statements: list) -> int:
+    async with AsyncSession(bind=conn) as session:
+        for stmt in statements:
+            await session.execute(stmt)
+        await session.rollback()
+    return len(statements)
+
+
+async def warm_engine(engine: AsyncEngine, connections: int, report: WarmupReport) -> None:
+    """Открывает connections соединений одновременно (иначе пул отдавал бы одно и то же) и прогревает каждое."""
+    opened = await asyncio.gather(*(engine.connect() for _ in range(connections)), return_exceptions=True)
+    conns = [conn for conn in opened if not isinstance(conn, BaseException)]
+    try:
+        errors = [error for error in opened if isinstance(error, BaseException)]
+        if errors:
+            raise errors[0]
+        statements = hot_statements()
+        for done in await asyncio.gather(*(_warm_connection(conn, statements) for conn in conns)):
+            report.statements += done
+        report.connections += len(conns)
+    finally:
+        # Соединения возвращаются в пул открытыми
+        for conn in conns:
+            await conn.close()
+
+
+async def _warm_target(name: str, engine: AsyncEngine, connections: int, timeout: float,
+                       report: WarmupReport) -> None:
+    try:
+        async with asyncio.timeout(timeout):
+            await warm_engine(engine, connections, report)
+    except (exc.DBAPIError, OSError, TimeoutError) as error:
+        report.errors[name] = repr(error)
+
+
+async def warm_up(engines: list[tuple[str, AsyncEngine]], profile: EngineConfig) -> WarmupReport:
+    """Прогревает движки (имя, движок) параллельно; ошибка одного не мешает остальным."""
+    report = WarmupReport()
+    started = time.perf_counter()
+    if profile.warmup_connections > 0:
+        connections = min(profile.warmup_connections, profile.pool_size)
+        await asyncio.gather(*(
+            _warm_target(name, engine, connections, profile.warmup_timeout, report)
+            for name, engine in engines
+        ))
+    report.duration_ms = (time.perf_counter() - started) * 1000
+    return report